@@ -0,0 +1,94 @@
+"""
+Typed envelope for copilot audit payloads.
+
+A copilot request is parsed and validated once (pydantic-core's JSON parser
+through a TypeAdapter) and the resulting CopilotEnvelope is passed through
+evaluation, run metadata and export instead of re-parsing the raw JSON at
+every step. Only the fields the API reads are typed; everything else in the
+payload is preserved as extra data.
+"""
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+
+class CopilotUser(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    email: Optional[str] = None
+    name: Optional[str] = None
+    department: Optional[str] = None
+    role: Optional[str] = None
+
+
+class CopilotAction(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    type: Optional[str] = None
+    request: Optional[str] = None
+    context: Optional[Dict[str, Any]] = None
+
+
+class CopilotEnvelope(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    platform: Optional[str] = None
+    user: Optional[CopilotUser] = None
+    workload: Optional[str] = None
+    sensitivity_label: Optional[str] = None
+    action: Optional[CopilotAction] = None
+    compliance_flags: Optional[List[str]] = None
+    content_preview: Optional[str] = None
+
+
+_envelope_adapter = TypeAdapter(CopilotEnvelope)
+
+
+def parse_copilot_payload(json_content: str) -> CopilotEnvelope:
+    """
+    Parse and validate a copilot payload in one pass.
+
+    Raises:
+        ValidationError: If the content is not valid JSON or does not match the envelope
+    """
+    return _envelope_adapter.validate_json(json_content)
+
+
+def describe_payload_error(error: ValidationError) -> str:
+    """Summarize a parse/validation error for an API error message"""
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+def copilot_platform_metadata(envelope: CopilotEnvelope) -> dict:
+    """
+    Extract the platform metadata reported in SIEM exports for a copilot run.
+
+    Args:
+        envelope: Parsed copilot payload
+
+    Returns:
+        Dict with platform, workload, sensitivity label, user, action and compliance flag details
+    """
+    user = envelope.user or CopilotUser()
+    action = envelope.action or CopilotAction()
+    context = action.context
+    return {
+        "platform": envelope.platform if "platform" in envelope.model_fields_set else "Unknown",
+        "workload": envelope.workload,
+        "sensitivity_label": envelope.sensitivity_label,
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "department": user.department,
+            "role": user.role,
+        },
+        "action_type": action.type,
+        "compliance_flags": envelope.compliance_flags if "compliance_flags" in envelope.model_fields_set else [],
+        "action_context": {
+            "conversation_id": context.get("conversation_id"),
+            "topic": context.get("topic"),
+        } if context else None,
+    }
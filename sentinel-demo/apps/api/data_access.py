@@ -0,0 +1,89 @@
+"""
+Non-blocking access to Supabase from async handlers.
+
+The supabase client is synchronous: calling .execute() inside an `async def`
+handler blocks the event loop for the whole PostgREST round trip, so only one
+request makes progress at a time. QueryExecutor runs .execute() on a bounded
+thread pool instead. All threads share the client's PostgREST session, an
+httpx client with HTTP/2 and keep-alive connection pooling, so concurrent
+queries reuse pooled connections (multiplexed streams) rather than opening
+new ones.
+
+Usage: build the query as before and await its execution:
+
+    result = await db.execute(supabase.table("runs").select("*").eq("id", run_id))
+    pack = await db.run(policy_pack_cache.get, "v1")  # or any other blocking callable
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class QueryExecutor:
+    """
+    Bounded thread pool for blocking Supabase queries.
+
+    Args:
+        max_workers: Maximum number of queries in flight at the same time
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats = {"queries": 0, "errors": 0, "max_in_flight": 0, "seconds": 0.0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="supabase")
+            return self._executor
+
+    def _timed(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.stats["queries"] += 1
+                self.stats["seconds"] += time.perf_counter() - started
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a blocking callable on the query pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self._timed, fn, *args)
+
+    async def execute(self, query) -> Any:
+        """Execute a supabase query builder (anything with .execute()) on the query pool"""
+        return await self.run(query.execute)
+
+    def shutdown(self):
+        """Stop the query threads (called on application shutdown)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def status(self) -> dict:
+        """Describe pool configuration and load for debugging"""
+        with self._lock:
+            queries = self.stats["queries"]
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.stats["max_in_flight"],
+                "queries": queries,
+                "errors": self.stats["errors"],
+                "mean_ms": round(self.stats["seconds"] * 1000 / queries, 3) if queries else None,
+            }
@@ -0,0 +1,707 @@
+"""
+Policy evaluation of run inputs.
+
+Everything needed to turn an input and a compiled policy pack into a run
+result (verdict, governed output, annotations, events, meta) lives here rather
+than in main.py, so evaluation pool workers can import it without importing
+the API application (FastAPI app, Supabase client, queues).
+"""
+import json
+import os
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from copilot import CopilotEnvelope, parse_copilot_payload
+from json_spans import index_json_spans
+from policy_engine import CompiledPolicyPack, resolve_overlaps
+from policy_stats import PolicyStats
+from redaction import build_redacted_output, extract_value_span, splice_replacements
+from streaming import scan_in_chunks
+from verdict_mapping import get_user_message_for_verdict, policy_action_to_verdict
+
+# Opt-in: stop evaluating remaining policies once a BLOCK policy fires
+short_circuit_on_block = os.getenv("POLICY_SHORT_CIRCUIT_ON_BLOCK", "false").lower() == "true"
+
+# Runtime per-policy/per-pattern statistics used to order evaluation (per process)
+policy_stats = PolicyStats(sample_every=int(os.getenv("POLICY_STATS_SAMPLE_EVERY", "50")))
+
+# File inputs longer than this are scanned in windows of this many characters
+chunk_scan_chars = int(os.getenv("POLICY_CHUNK_CHARS", "1048576"))
+
+
+class Annotation(BaseModel):
+    span: str
+    policy_name: str
+    action: str = Field(..., pattern="^(REDACT|BLOCK|REVIEW)$")
+    start: int
+    end: int
+
+
+def evaluate_copilot_policies(json_content: str, policies: List[dict], pack: Optional[CompiledPolicyPack] = None, envelope: Optional[CopilotEnvelope] = None) -> tuple:
+    """
+    Evaluate policies against structured copilot JSON fields.
+    
+    Args:
+        json_content: The JSON string content
+        policies: List of policy dictionaries from Supabase
+        pack: Compiled policy pack containing the policies (compiled ad hoc if omitted)
+        envelope: The already parsed payload (parsed here if omitted)
+    
+    Returns:
+        Tuple of (annotations, evaluated_policies, matches) where:
+        - annotations: List of Annotation objects
+        - evaluated_policies: List of policy names that were evaluated
+        - matches: List of match tuples for redaction
+    """
+    if envelope is None:
+        try:
+            envelope = parse_copilot_payload(json_content)
+        except ValidationError:
+            # Invalid payload - return empty results
+            return ([], [], [])
+    
+    # Offsets of values in the original string, indexed in one pass once a condition fires
+    value_spans = None
+    
+    def value_span_of(field_path: str) -> Optional[tuple]:
+        nonlocal value_spans
+        if value_spans is None:
+            value_spans = index_json_spans(json_content)
+        return value_spans.get(field_path)
+    
+    annotations = []
+    evaluated_policies = []
+    matches = []  # (match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action)
+    
+    # Extract structured fields from copilot data
+    user = envelope.user
+    action = envelope.action
+    sensitivity_label = envelope.sensitivity_label or ""
+    workload = envelope.workload or ""
+    compliance_flags = envelope.compliance_flags or []
+    user_department = (user.department if user else None) or ""
+    user_role = (user.role if user else None) or ""
+    action_request = (action.request if action else None) or ""
+    content_preview = envelope.content_preview or ""
+    
+    if pack is None:
+        pack = CompiledPolicyPack(None, policies)
+    
+    # Look up the policies whose structured conditions fire (inverted indexes, built once per pack)
+    fired = pack.structured_index(policies).evaluate(
+        sensitivity_label, workload, compliance_flags,
+        user_department, user_role, action_request, content_preview,
+    )
+    for compiled, field_paths in fired:
+        policy_matched = False
+        for field_path in field_paths:
+            pos = value_span_of(field_path)
+            if not pos:
+                continue
+            match_start, match_end = pos
+            matched_text = json_content[match_start:match_end]
+            # For JSON string values, extract just the value portion (without quotes)
+            if matched_text.startswith('"') and matched_text.endswith('"'):
+                value_start = match_start + 1
+                value_end = match_end - 1
+                value_span = matched_text[1:-1]
+            else:
+                value_start = match_start
+                value_end = match_end
+                value_span = matched_text
+            
+            matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, compiled.name, compiled.action))
+            policy_matched = True
+        
+        if policy_matched:
+            evaluated_policies.append(compiled.name)
+    
+    # Debug logging
+    debug_info = {
+        "matching_method": "structured_fields",
+        "input_type": "copilot",
+        "input_length": len(json_content),
+        "policies": len(policies),
+        "matched_policies": evaluated_policies,
+        "sensitivity_label": sensitivity_label,
+        "workload": workload,
+        "compliance_flags": compliance_flags
+    }
+    print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
+    
+    # Build annotations from matches
+    annotations = [
+        Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end)
+        for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches
+    ]
+    
+    return (annotations, evaluated_policies, matches)
+
+
+def split_evaluation_stages(policies: List[dict], short_circuit: bool) -> List[List[dict]]:
+    """
+    Split applicable policies into evaluation stages.
+    Normally all policies are evaluated in one stage; in short-circuit mode each BLOCK policy
+    is its own stage, cheapest expected cost per hit first (see PolicyStats.order), so the
+    rest can be skipped as soon as a BLOCK verdict is certain. The final stage holds the rest.
+    """
+    if not short_circuit:
+        return [policies]
+    block_policies = policy_stats.order([p for p in policies if p["action"] == "BLOCK"])
+    other_policies = [p for p in policies if p["action"] != "BLOCK"]
+    return [[p] for p in block_policies] + [other_policies]
+
+
+def summarize_text_evaluation(input_content: str, matches: list, evaluated_policies: List[str], applicable_policies: List[dict], short_circuited: bool = False) -> dict:
+    """
+    Build the run result (annotations, verdict, governed output, events, meta) for
+    de-overlapped text matches. Shared by the scenario, free-text and streaming paths.
+    """
+    baseline_output = input_content
+    governed_output = input_content
+    
+    # Build annotations using VALUE portion only (for UI highlighting and SIEM export)
+    # Each annotation records: policy_name, action, start, end, span (all for VALUE portion)
+    annotations = [
+        Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end)
+        for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches
+    ]
+    
+    # Determine verdict based on actions using shared mapping utility
+    actions = [a.action for a in annotations]
+    verdict = policy_action_to_verdict(actions)
+    user_message = get_user_message_for_verdict(verdict)
+    
+    if verdict == "BLOCKED":
+        governed_output = "I cannot fulfill this request. It appears to be attempting to bypass safeguards, override internal policies, or reveal system prompts."
+    elif verdict == "HELD_FOR_REVIEW":
+        # Replace governed_output with quarantine placeholder (do not echo original content)
+        review_policies = [a.policy_name for a in annotations if a.action == "REVIEW"]
+        unique_review_policies = list(set(review_policies))
+        # Determine queue name based on policy
+        queue_name = "IP Review" if any("Jaguar" in p or "IP" in p for p in unique_review_policies) else "General Review"
+        governed_output = f"This content has been quarantined and held for review due to policy: {', '.join(unique_review_policies)}."
+    elif verdict == "REDACTED":
+        # Build redacted output in a single pass over the sorted, de-overlapped matches
+        # Use full match info (match_start, match_end, matched_text) for redaction (preserves key name)
+        governed_output = build_redacted_output(input_content, matches)
+    
+    # Generate events
+    policy_evaluated_payload = {"policies": evaluated_policies}
+    if short_circuited:
+        policy_evaluated_payload["short_circuit"] = "BLOCK"
+    events = [
+        {"event_type": "Input Sanitized", "payload": {"input_length": len(input_content)}},
+        {"event_type": "Policy Evaluated", "payload": policy_evaluated_payload},
+    ]
+    
+    # Track review reasons for meta field
+    review_reasons = []
+    review_queue_name = None
+    recommended_route = None
+    
+    if annotations:
+        violations = {}
+        for ann in annotations:
+            if ann.policy_name not in violations:
+                violations[ann.policy_name] = 0
+            violations[ann.policy_name] += 1
+            
+            # Track review reasons
+            if ann.action == "REVIEW":
+                # Find policy ID from applicable_policies list
+                policy_id = None
+                for p in applicable_policies:
+                    if p["name"] == ann.policy_name:
+                        policy_id = p["id"]
+                        break
+                review_reasons.append({
+                    "policy_id": policy_id or "unknown",
+                    "policy_name": ann.policy_name,
+                    "matches": 1  # Will be aggregated below
+                })
+                
+                # Set queue name and recommended route for REVIEW
+                if not review_queue_name:
+                    review_queue_name = "IP Review" if ("Jaguar" in ann.policy_name or "IP" in ann.policy_name) else "General Review"
+                if not recommended_route:
+                    # Determine route reason based on policy
+                    route_reason = f"Bespoke IP policy triggered ({ann.policy_name})" if "Jaguar" in ann.policy_name or "IP" in ann.policy_name else f"Policy triggered ({ann.policy_name})"
+                    recommended_route = {
+                        "destination": "private_llm",
+                        "name": "Contoso Internal LLM",
+                        "reason": route_reason
+                    }
+        
+        for policy_name, count in violations.items():
+            events.append({
+                "event_type": "Violation Detected",
+                "payload": {"policy": policy_name, "matches": count}
+            })
+        
+        redact_count = sum(1 for a in annotations if a.action == "REDACT")
+        if redact_count > 0:
+            events.append({
+                "event_type": "Action Applied",
+                "payload": {"action": "REDACT", "redactions": redact_count}
+            })
+        
+        review_count = sum(1 for a in annotations if a.action == "REVIEW")
+        if review_count > 0:
+            events.append({
+                "event_type": "Action Applied",
+                "payload": {"action": "REVIEW", "reviews": review_count}
+            })
+            # Add Quarantined event
+            events.append({
+                "event_type": "Quarantined",
+                "payload": {"reason": "REVIEW action", "queue": review_queue_name or "General Review"}
+            })
+            # Add Routing Recommended event (simulated)
+            if recommended_route:
+                events.append({
+                    "event_type": "Routing Recommended",
+                    "payload": {
+                        "destination": recommended_route["destination"],
+                        "name": recommended_route["name"],
+                        "simulated": True
+                    }
+                })
+        
+        if any(a.action == "BLOCK" for a in annotations):
+            events.append({
+                "event_type": "Action Applied",
+                "payload": {"action": "BLOCK"}
+            })
+    
+    events.append({
+        "event_type": "Final Output Released",
+        "payload": {"verdict": verdict}
+    })
+    
+    # Build meta with review information
+    review_reasons_aggregated = {}
+    for reason in review_reasons:
+        key = reason["policy_id"]
+        if key not in review_reasons_aggregated:
+            review_reasons_aggregated[key] = {
+                "policy_id": reason["policy_id"],
+                "policy_name": reason["policy_name"],
+                "matches": 0
+            }
+        review_reasons_aggregated[key]["matches"] += 1
+    
+    meta = {
+        "annotations": [a.dict() for a in annotations],
+        "review_required": verdict == "HELD_FOR_REVIEW",
+    }
+    if review_reasons_aggregated:
+        meta["review_reasons"] = list(review_reasons_aggregated.values())
+    if verdict == "HELD_FOR_REVIEW":
+        meta["review_queue"] = review_queue_name or "General Review"
+        if recommended_route:
+            meta["recommended_route"] = recommended_route
+    
+    return {
+        "baseline_output": baseline_output,
+        "governed_output": governed_output,
+        "verdict": verdict,
+        "user_message": user_message,
+        "annotations": annotations,
+        "events": events,
+        "meta": meta,
+    }
+
+
+def evaluate_input(input_type: str, input_content: str, scenario_id: Optional[str], pack: CompiledPolicyPack, short_circuit: Optional[bool] = None, copilot: Optional[CopilotEnvelope] = None) -> dict:
+    """
+    Evaluate an input against a compiled policy pack (deterministic demo run results).
+    short_circuit (default from POLICY_SHORT_CIRCUIT_ON_BLOCK) stops evaluating once a BLOCK policy fires.
+    copilot is the already parsed payload for copilot inputs.
+    """
+    if short_circuit is None:
+        short_circuit = short_circuit_on_block
+    annotations = []
+    events = []
+    baseline_output = input_content
+    governed_output = input_content
+    verdict = "ALLOWED"
+    user_message = "Output approved."
+    
+    # Special handling for copilot input type - evaluate structured fields
+    if input_type == "copilot":
+        # Policies scoped to copilot (precomputed per input type in the pack)
+        copilot_policies = pack.policies_for(input_type)
+        
+        # Evaluate policies against structured fields
+        annotations, evaluated_policies, matches = evaluate_copilot_policies(input_content, copilot_policies, pack, copilot)
+        
+        # Determine verdict based on actions using shared mapping utility
+        actions = [a.action for a in annotations]
+        verdict = policy_action_to_verdict(actions)
+        user_message = get_user_message_for_verdict(verdict)
+        
+        if verdict == "BLOCKED":
+            governed_output = json.dumps({"error": "Request blocked by policy", "reason": "Policy violation detected"})
+        elif verdict == "HELD_FOR_REVIEW":
+            # Replace governed_output with quarantine placeholder (do not echo original content)
+            review_policies = [a.policy_name for a in annotations if a.action == "REVIEW"]
+            unique_review_policies = list(set(review_policies))
+            # Determine queue name based on policy
+            queue_name = "IP Review" if any("Jaguar" in p or "IP" in p for p in unique_review_policies) else "General Review"
+            governed_output = f"This content has been quarantined and held for review due to policy: {', '.join(unique_review_policies)}."
+        elif verdict == "REDACTED":
+            # Apply all redactions in a single pass (one join, no per-match string rebuilds)
+            edits = []
+            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches:
+                if action == "REDACT":
+                    # For JSON, check if the value is a string (has quotes) and maintain JSON structure
+                    if matched_text.startswith('"') and matched_text.endswith('"'):
+                        # String value - replace with "[REDACTED]" to maintain valid JSON
+                        edits.append((match_start, match_end, '"[REDACTED]"'))
+                    else:
+                        # Non-string value - replace value portion only
+                        edits.append((value_start, value_end, "[REDACTED]"))
+            # Several policies can flag the same field; the duplicate spans are applied once
+            governed_output = splice_replacements(input_content, edits)
+        
+        # Generate events (same structure as other input types)
+        events = [
+            {"event_type": "Input Sanitized", "payload": {"input_length": len(input_content)}},
+            {"event_type": "Policy Evaluated", "payload": {"policies": evaluated_policies}},
+        ]
+        
+        # Track review reasons for meta field
+        review_reasons = []
+        review_queue_name = None
+        recommended_route = None
+        
+        if annotations:
+            violations = {}
+            violation_reasons = {}  # Track why each policy triggered
+            
+            for ann in annotations:
+                if ann.policy_name not in violations:
+                    violations[ann.policy_name] = 0
+                    violation_reasons[ann.policy_name] = []
+                violations[ann.policy_name] += 1
+                
+                # Track review reasons
+                if ann.action == "REVIEW":
+                    # Find policy ID from copilot_policies list
+                    policy_id = None
+                    for p in copilot_policies:
+                        if p["name"] == ann.policy_name:
+                            policy_id = p["id"]
+                            break
+                    review_reasons.append({
+                        "policy_id": policy_id or "unknown",
+                        "policy_name": ann.policy_name,
+                        "matches": 1  # Will be aggregated below
+                    })
+                    
+                    # Set queue name and recommended route for REVIEW
+                    if not review_queue_name:
+                        review_queue_name = "IP Review" if ("Jaguar" in ann.policy_name or "IP" in ann.policy_name) else "General Review"
+                    if not recommended_route:
+                        # Determine route reason based on policy
+                        route_reason = f"Bespoke IP policy triggered ({ann.policy_name})" if "Jaguar" in ann.policy_name or "IP" in ann.policy_name else f"Policy triggered ({ann.policy_name})"
+                        recommended_route = {
+                            "destination": "private_llm",
+                            "name": "Contoso Internal LLM",
+                            "reason": route_reason
+                        }
+                
+                # For Sensitivity Label Guard, add reason to payload
+                if ann.policy_name == "Sensitivity Label Guard":
+                    # Try to determine why it triggered from the annotation span
+                    if "Confidential" in ann.span:
+                        violation_reasons[ann.policy_name].append("sensitivity_label_contains_confidential")
+                    elif ann.span in ["financial_data", "executive_discussion"]:
+                        violation_reasons[ann.policy_name].append(f"compliance_flag_{ann.span}")
+            
+            # Aggregate review reasons by policy
+            review_reasons_aggregated = {}
+            for reason in review_reasons:
+                key = reason["policy_id"]
+                if key not in review_reasons_aggregated:
+                    review_reasons_aggregated[key] = {
+                        "policy_id": reason["policy_id"],
+                        "policy_name": reason["policy_name"],
+                        "matches": 0
+                    }
+                review_reasons_aggregated[key]["matches"] += 1
+            
+            for policy_name, count in violations.items():
+                payload = {"policy": policy_name, "matches": count}
+                # Add reason for Sensitivity Label Guard
+                if policy_name == "Sensitivity Label Guard" and violation_reasons[policy_name]:
+                    payload["triggered_by"] = list(set(violation_reasons[policy_name]))
+                events.append({
+                    "event_type": "Violation Detected",
+                    "payload": payload
+                })
+            
+            redact_count = sum(1 for a in annotations if a.action == "REDACT")
+            if redact_count > 0:
+                events.append({
+                    "event_type": "Action Applied",
+                    "payload": {"action": "REDACT", "redactions": redact_count}
+                })
+            
+            review_count = sum(1 for a in annotations if a.action == "REVIEW")
+            if review_count > 0:
+                events.append({
+                    "event_type": "Action Applied",
+                    "payload": {"action": "REVIEW", "reviews": review_count}
+                })
+                # Add Quarantined event
+                events.append({
+                    "event_type": "Quarantined",
+                    "payload": {"reason": "REVIEW action", "queue": review_queue_name or "General Review"}
+                })
+                # Add Routing Recommended event (simulated)
+                if recommended_route:
+                    events.append({
+                        "event_type": "Routing Recommended",
+                        "payload": {
+                            "destination": recommended_route["destination"],
+                            "name": recommended_route["name"],
+                            "simulated": True
+                        }
+                    })
+            
+            if any(a.action == "BLOCK" for a in annotations):
+                events.append({
+                    "event_type": "Action Applied",
+                    "payload": {"action": "BLOCK"}
+                })
+        
+        events.append({
+            "event_type": "Final Output Released",
+            "payload": {"verdict": verdict}
+        })
+        
+        # Build meta with review information
+        meta = {
+            "annotations": [a.dict() for a in annotations],
+            "review_required": verdict == "HELD_FOR_REVIEW",
+        }
+        if review_reasons_aggregated:
+            meta["review_reasons"] = list(review_reasons_aggregated.values())
+        if verdict == "HELD_FOR_REVIEW":
+            meta["review_queue"] = review_queue_name or "General Review"
+            if recommended_route:
+                meta["recommended_route"] = recommended_route
+        
+        return {
+            "baseline_output": baseline_output,
+            "governed_output": governed_output,
+            "verdict": verdict,
+            "user_message": user_message,
+            "annotations": annotations,
+            "events": events,
+            "meta": meta,
+        }
+    
+    # If no scenario_id provided, evaluate all policies from Supabase based on their patterns
+    if not scenario_id:
+        # Policies scoped to this input type (precomputed per input type in the pack)
+        applicable_policies = pack.policies_for(input_type)
+        
+        if input_type == "file" and len(input_content) > chunk_scan_chars:
+            # Scan large documents in fixed-size windows to bound working memory
+            # (no lowercased copy of the whole input; identical matches to a whole-string scan)
+            print(f"[POLICY_EVAL] chunked scan: input_length={len(input_content)}, chunk_chars={chunk_scan_chars}")
+            matches, short_circuited = scan_in_chunks(
+                pack, applicable_policies, input_content, False, chunk_scan_chars, stop_on_block=short_circuit
+            )
+            evaluated_policies = [p["name"] for p in applicable_policies]
+            return summarize_text_evaluation(input_content, matches, evaluated_policies, applicable_policies, short_circuited)
+        
+        evaluated_policies = []
+        all_matches = []
+        input_lower = input_content.lower()
+        
+        # Short-circuit mode evaluates BLOCK policies first and stops once one fires
+        evaluation_stages = split_evaluation_stages(applicable_policies, short_circuit)
+        short_circuited = False
+        sampled = policy_stats.should_sample()
+        
+        for stage_index, stage_policies in enumerate(evaluation_stages):
+            # Single-policy BLOCK stages and sampled runs scan per pattern and record timings
+            timed = sampled or (short_circuit and stage_index < len(evaluation_stages) - 1)
+            # Scan the input for the regex patterns of every policy in this stage
+            # (patterns whose required literals do not occur in the input are skipped)
+            pattern_hits = pack.scan_patterns(stage_policies, input_content, input_lower, policy_stats if timed else None)
+            # Scan the lowercased input once for the keywords/phrases of every policy in this stage
+            keyword_hits = {}
+            if input_type in ["chat", "copilot"]:
+                keyword_hits = pack.scan_keywords(stage_policies, input_lower)
+            
+            # Evaluate each enabled policy that matches the input_type scope
+            for policy in stage_policies:
+                
+                policy_id = policy["id"]
+                policy_name = policy["name"]
+                policy_action = policy["action"]
+                conditions = policy.get("conditions", {})
+                matches_before = len(all_matches)
+                
+                # Track that this policy is being evaluated (add to list before matching)
+                evaluated_policies.append(policy_name)
+                
+                # Get regex patterns from conditions.patterns (list of regex strings)
+                regex_patterns = conditions.get("patterns", [])
+                # Get keywords from conditions.keywords (for keyword-based matching)
+                keywords = conditions.get("keywords", [])
+                # Get phrases from conditions.phrases (treated same as keywords for phrase-based matching)
+                phrases = conditions.get("phrases", [])
+                # Combine keywords and phrases for matching
+                if phrases:
+                    keywords = list(keywords) + list(phrases)
+                
+                # Debug: Log policy evaluation details before matching
+                conditions_keys = list(conditions.keys())
+                patterns_preview = regex_patterns[:3] if len(regex_patterns) > 0 else []
+                matching_method = "regex" if regex_patterns else ("keywords" if keywords else "none")
+                
+                debug_info = {
+                    "policy_id": policy_id,
+                    "policy_name": policy_name,
+                    "conditions_keys": conditions_keys,
+                    "patterns_preview": patterns_preview,
+                    "patterns_count": len(regex_patterns),
+                    "keywords_count": len(keywords),
+                    "matching_method": matching_method,
+                    "input_type": input_type,
+                    "input_length": len(input_content)
+                }
+                print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
+                
+                # Evaluate keywords first (for chat/copilot inputs that use keyword matching)
+                if keywords and input_type in ["chat", "copilot"]:
+                    # All occurrences of each keyword, found by the single automaton pass above
+                    for keyword, keyword_starts in zip(keywords, keyword_hits[policy_id]):
+                        for match_start in keyword_starts:
+                            match_end = match_start + len(keyword)
+                            matched_text = input_content[match_start:match_end]
+                            # For keyword matches, the entire keyword is the value
+                            value_start, value_end, value_span = match_start, match_end, matched_text
+                            all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
+                
+                # Collect regex hits for this policy from the stage scan above
+                # Invalid patterns were logged and skipped when the pack was compiled
+                for pattern_spans in pattern_hits[policy_id]:
+                    for match_start, match_end in pattern_spans:
+                        matched_text = input_content[match_start:match_end]
+                        
+                        # Extract value portion for annotation (records only the value, not the key)
+                        value_start, value_end, value_span = extract_value_span(matched_text, match_start, match_end)
+                        
+                        # Store: (match_start, match_end, matched_text_full, value_start, value_end, value_span, policy_name, policy_action)
+                        # match_start/end and matched_text needed for redaction (preserves key name)
+                        # value_start/end/span needed for annotation (records only value for UI highlighting)
+                        all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
+                
+                policy_stats.record_outcome(policy_id, len(all_matches) > matches_before)
+                
+            # A BLOCK verdict is certain - skip the remaining policies
+            if short_circuit and stage_index < len(evaluation_stages) - 1 and all_matches:
+                short_circuited = True
+                break
+        
+        # Resolve overlaps on the value portion: higher-priority actions win (BLOCK > REVIEW > REDACT),
+        # overlapping/adjacent REDACT spans are merged
+        matches = resolve_overlaps(all_matches, input_content)
+        
+        return summarize_text_evaluation(input_content, matches, evaluated_policies, applicable_policies, short_circuited)
+    
+    # Explicit scenario handling (only when scenario_id is provided)
+    # Even for explicit scenarios, use policies from Supabase (no hardcoded policy names)
+    if scenario_id:
+        # Policies scoped to this input type (precomputed per input type in the pack)
+        applicable_policies = pack.policies_for(input_type)
+        
+        evaluated_policies = []
+        all_matches = []
+        
+        # Short-circuit mode evaluates BLOCK policies first and stops once one fires
+        evaluation_stages = split_evaluation_stages(applicable_policies, short_circuit)
+        short_circuited = False
+        sampled = policy_stats.should_sample()
+        
+        for stage_index, stage_policies in enumerate(evaluation_stages):
+            # Single-policy BLOCK stages and sampled runs scan per pattern and record timings
+            timed = sampled or (short_circuit and stage_index < len(evaluation_stages) - 1)
+            # Scan the input for the regex patterns of every policy in this stage
+            pattern_hits = pack.scan_patterns(stage_policies, input_content, None, policy_stats if timed else None)
+            
+            # Evaluate each enabled policy that matches the input_type scope
+            for policy in stage_policies:
+                
+                policy_id = policy["id"]
+                policy_name = policy["name"]
+                policy_action = policy["action"]
+                conditions = policy.get("conditions", {})
+                matches_before = len(all_matches)
+                
+                # Get regex patterns from conditions.patterns (list of regex strings)
+                regex_patterns = conditions.get("patterns", [])
+                
+                # Debug: Log policy evaluation details before matching
+                conditions_keys = list(conditions.keys())
+                patterns_preview = regex_patterns[:3] if len(regex_patterns) > 0 else []
+                matching_method = "regex"  # Always using regex for patterns
+                
+                debug_info = {
+                    "policy_id": policy_id,
+                    "policy_name": policy_name,
+                    "conditions_keys": conditions_keys,
+                    "patterns_preview": patterns_preview,
+                    "patterns_count": len(regex_patterns),
+                    "matching_method": matching_method,
+                    "input_type": input_type,
+                    "input_length": len(input_content),
+                    "scenario_id": scenario_id
+                }
+                print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
+                
+                # Collect regex hits for this policy from the stage scan above
+                # Invalid patterns were logged and skipped when the pack was compiled
+                for pattern_spans in pattern_hits[policy_id]:
+                    for match_start, match_end in pattern_spans:
+                        matched_text = input_content[match_start:match_end]
+                        
+                        # Extract value portion for annotation (records only the value, not the key)
+                        value_start, value_end, value_span = extract_value_span(matched_text, match_start, match_end)
+                        
+                        # Store: (match_start, match_end, matched_text_full, value_start, value_end, value_span, policy_name, policy_action)
+                        # match_start/end and matched_text needed for redaction (preserves key name)
+                        # value_start/end/span needed for annotation (records only value for UI highlighting)
+                        all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
+                
+                # Check if this policy had any matches
+                if any(p[6] == policy_name for p in all_matches):
+                    evaluated_policies.append(policy_name)
+                
+                policy_stats.record_outcome(policy_id, len(all_matches) > matches_before)
+                
+            # A BLOCK verdict is certain - skip the remaining policies
+            if short_circuit and stage_index < len(evaluation_stages) - 1 and all_matches:
+                short_circuited = True
+                break
+        
+        # Resolve overlaps on the value portion: higher-priority actions win (BLOCK > REVIEW > REDACT),
+        # overlapping/adjacent REDACT spans are merged
+        matches = resolve_overlaps(all_matches, input_content)
+        
+        result = summarize_text_evaluation(input_content, matches, evaluated_policies, applicable_policies, short_circuited)
+    
+    # Runtime assertion: ensure verdict is always canonical
+    canonical_verdicts = {"ALLOWED", "REDACTED", "HELD_FOR_REVIEW", "BLOCKED"}
+    if result["verdict"] not in canonical_verdicts:
+        raise ValueError(f"Invalid verdict '{result['verdict']}'. Must be one of: {canonical_verdicts}")
+    
+    return result
@@ -0,0 +1,171 @@
+"""
+Process pool for CPU-bound policy evaluation.
+
+Scanning a multi-megabyte input holds the GIL for the whole evaluation, so
+running it inline in an async handler stalls every other request (including
+/health). Inputs above a size threshold are evaluated in worker processes;
+small inputs stay inline where the IPC round trip would cost more than the scan.
+
+Workers are started with the "spawn" method and only import the evaluation
+modules (not the API application). They keep their own compiled policy packs,
+keyed by policy pack version and fingerprint, so a pack is only recompiled in a
+worker when the policies change. The policy dictionaries are only pickled into
+a call until every worker is expected to hold the current fingerprint; a
+worker that does not (the executor picks the worker, not the caller) raises
+StalePolicyPack and the call is repeated with the policies.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from copilot import CopilotEnvelope
+from evaluation import evaluate_input
+from policy_engine import CompiledPolicyPack
+from uploads import read_spooled_text
+
+# Compiled packs held by this worker process: policy_pack_version -> CompiledPolicyPack
+_worker_packs = {}
+
+
+class StalePolicyPack(Exception):
+    """Raised in a worker asked to use a pack snapshot without its policies when it does not hold that snapshot"""
+
+
+def worker_pack(policy_pack_version: str, fingerprint, policies: Optional[list]) -> CompiledPolicyPack:
+    """
+    Get this worker's compiled pack for a snapshot sent by the parent process.
+
+    Args:
+        policy_pack_version: Policy pack version of the snapshot
+        fingerprint: Fingerprint of the snapshot (a new fingerprint triggers a recompile)
+        policies: Policy dictionaries of the snapshot, or None if the parent expects the worker to hold it
+
+    Returns:
+        The cached CompiledPolicyPack, recompiled only if the fingerprint changed
+
+    Raises:
+        StalePolicyPack: If policies is None and this worker holds no pack with this fingerprint
+    """
+    pack = _worker_packs.get(policy_pack_version)
+    if pack is None or pack.fingerprint != fingerprint:
+        if policies is None:
+            raise StalePolicyPack(f"worker has no policy pack {policy_pack_version} with fingerprint {fingerprint}")
+        pack = CompiledPolicyPack(policy_pack_version, policies, fingerprint)
+        _worker_packs[policy_pack_version] = pack
+    return pack
+
+
+def evaluate_in_worker(policy_pack_version: str, fingerprint, policies: Optional[list], input_type: str, input_content: str, scenario_id: Optional[str], copilot: Optional[CopilotEnvelope] = None) -> dict:
+    """Evaluate a run in a worker, using the worker's warm copy of the policy pack"""
+    pack = worker_pack(policy_pack_version, fingerprint, policies)
+    return evaluate_input(input_type, input_content, scenario_id, pack, copilot=copilot)
+
+
+def evaluate_upload_in_worker(policy_pack_version: str, fingerprint, policies: Optional[list], input_type: str, path: str) -> dict:
+    """Evaluate a spooled upload in a worker (the worker maps the file itself instead of receiving the text)"""
+    pack = worker_pack(policy_pack_version, fingerprint, policies)
+    return evaluate_input(input_type, read_spooled_text(path), None, pack)
+
+
+class EvaluationPool:
+    """
+    Lazily started process pool for large evaluations.
+
+    Args:
+        workers: Number of worker processes (0 disables offloading)
+        min_chars: Inputs at least this many characters long are evaluated in the pool
+    """
+
+    def __init__(self, workers: int = 1, min_chars: int = 262144):
+        self.workers = workers
+        self.min_chars = min_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # policy_pack_version -> (fingerprint, number of calls that carried its policies) for the current workers
+        self._pack_sends: Dict[str, Tuple[object, int]] = {}
+        self.stats = {"offloaded": 0, "inline": 0, "restarts": 0, "pack_sends": 0, "stale_packs": 0}
+
+    def should_offload(self, content: str) -> bool:
+        """Return True if content is large enough to be evaluated in a worker process"""
+        return self.should_offload_size(len(content))
+
+    def should_offload_size(self, size: int) -> bool:
+        """Return True if an input of size characters (or an upper bound, e.g. a file's byte size) is offloaded"""
+        offload = self.workers > 0 and size >= self.min_chars
+        self.stats["offloaded" if offload else "inline"] += 1
+        return offload
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                print(f"[EVAL_POOL] started {self.workers} worker process(es), min_chars={self.min_chars}")
+            return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """
+        Run fn(*args) in a worker process without blocking the event loop.
+        A crashed pool (e.g. a worker killed by the OOM killer) is replaced once and the call retried.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                # Concurrent callers may see the same broken pool; only the first replaces it
+                if self._executor is executor:
+                    print("[EVAL_POOL] worker pool broken, restarting")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                    self._pack_sends.clear()
+                    self.stats["restarts"] += 1
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    async def run_with_pack(self, fn: Callable, pack: CompiledPolicyPack, *args):
+        """
+        Run fn(policy_pack_version, fingerprint, policies, *args) in a worker process.
+
+        The pack's policies are sent with the first `workers` calls for a fingerprint
+        (one per worker if the executor spreads them) and None afterwards; a worker
+        that still misses the pack raises StalePolicyPack and the call is repeated
+        with the policies.
+        """
+        version, fingerprint = pack.policy_pack_version, pack.fingerprint
+        with self._lock:
+            sent_fingerprint, sends = self._pack_sends.get(version, (None, 0))
+            if sent_fingerprint != fingerprint:
+                sends = 0
+            send = sends < self.workers
+            if send:
+                self._pack_sends[version] = (fingerprint, sends + 1)
+                self.stats["pack_sends"] += 1
+        try:
+            return await self.run(fn, version, fingerprint, pack.policies if send else None, *args)
+        except StalePolicyPack:
+            with self._lock:
+                self.stats["stale_packs"] += 1
+            return await self.run(fn, version, fingerprint, pack.policies, *args)
+
+    def shutdown(self):
+        """Stop the worker processes (called on application shutdown)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+                self._pack_sends.clear()
+
+    def status(self) -> dict:
+        """Describe pool configuration for debugging"""
+        return {
+            "workers": self.workers,
+            "min_chars": self.min_chars,
+            "started": self._executor is not None,
+            "stats": dict(self.stats),
+        }
@@ -0,0 +1,197 @@
+"""
+In-process queue for asynchronous evaluation jobs.
+
+Large scans (repositories, exports, log bundles) can outlive HTTP and proxy
+timeouts, so they are accepted as jobs and processed by background workers:
+- The queue is bounded; submitting to a full queue fails instead of piling up work
+- At most `concurrency` jobs run at the same time
+- Queued jobs can be cancelled before they start; cancelling a running job
+  stops waiting for it (work already handed to a worker process finishes
+  there, but its result is discarded and nothing is persisted)
+- A handler clears job.cancellable before it starts persisting; from then on
+  the job runs to completion, even on cancel or shutdown
+- Finished jobs are kept for lookup up to `retain` entries, oldest first out
+
+Job state lives in this process only; jobs do not survive a restart.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """
+    A submitted job.
+
+    Attributes:
+        id: Job id returned to the client
+        payload: Work description passed to the handler
+        status: One of queued, running, succeeded, failed, cancelled
+        progress: Fraction of the work done (0.0 - 1.0), updated by the handler
+        result: Handler return value once succeeded (e.g. the run id)
+        error: Error message once failed
+        cancellable: Whether cancel() may still interrupt the handler
+    """
+
+    def __init__(self, payload: Any):
+        self.id = str(uuid.uuid4())
+        self.payload = payload
+        self.status = QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancellable = True
+        self._task: Optional[asyncio.Task] = None
+
+
+class JobQueue:
+    """
+    Bounded job queue processed by a fixed number of asyncio workers.
+
+    Args:
+        handler: Coroutine function processing a Job and returning its result
+        max_queued: Maximum number of jobs waiting to start
+        concurrency: Maximum number of jobs running at the same time
+        retain: Maximum number of finished jobs kept for status lookups
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[Any]], max_queued: int = 100, concurrency: int = 2, retain: int = 1000):
+        self._handler = handler
+        self.max_queued = max_queued
+        self.concurrency = concurrency
+        self.retain = retain
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+
+    def _start(self):
+        # Workers are bound to the running event loop, so they start with the first submission
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+            print(f"[JOBS] started {self.concurrency} worker(s), max_queued={self.max_queued}")
+
+    def submit(self, payload: Any) -> Job:
+        """
+        Queue a job.
+
+        Raises:
+            QueueFull: If max_queued jobs are already waiting
+        """
+        self._start()
+        job = Job(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+        self._jobs[job.id] = job
+        self.stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by id (None if unknown or evicted)"""
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job. Finished jobs, and running jobs that are no
+        longer cancellable, are returned unchanged.
+
+        Returns:
+            The job, or None if unknown
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        if job.status == RUNNING and job._task is not None:
+            if job.cancellable:
+                job._task.cancel()
+        else:
+            # Still queued: the worker that dequeues it skips it
+            self._finish(job, CANCELLED)
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job._task = asyncio.create_task(self._handler(job))
+        try:
+            job.result = await job._task
+        except asyncio.CancelledError:
+            if not job._task.cancelled():
+                raise  # the worker itself is being stopped
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            print(f"[JOBS] job {job.id} failed: {e}")
+            self._finish(job, FAILED)
+        else:
+            job.progress = 1.0
+            self._finish(job, SUCCEEDED)
+        finally:
+            job._task = None
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        self.stats[status] += 1
+        # Evict the oldest finished jobs beyond the retention limit
+        finished = [job_id for job_id, j in self._jobs.items() if j.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.retain)]:
+            del self._jobs[job_id]
+
+    async def shutdown(self):
+        """Stop the workers and cancel running jobs (called on application shutdown)"""
+        running = [job._task for job in self._jobs.values() if job.status == RUNNING and job._task is not None]
+        for job in list(self._jobs.values()):
+            if job.status == RUNNING and job._task is not None and job.cancellable:
+                job._task.cancel()
+        # Let jobs that are persisting finish before their workers are stopped
+        await asyncio.gather(*running, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def status(self) -> Dict[str, Any]:
+        """Describe queue configuration and load for debugging"""
+        counts = {state: 0 for state in (QUEUED, RUNNING)}
+        for job in self._jobs.values():
+            if job.status in counts:
+                counts[job.status] += 1
+        return {
+            "max_queued": self.max_queued,
+            "concurrency": self.concurrency,
+            "queued": counts[QUEUED],
+            "running": counts[RUNNING],
+            "stats": dict(self.stats),
+        }
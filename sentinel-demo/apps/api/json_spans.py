@@ -0,0 +1,98 @@
+"""
+Single-pass span index over a JSON document.
+
+Structured (copilot) evaluation annotates the raw JSON string, so every
+matched field needs the offsets of its value in the original text.
+index_json_spans tokenizes the document once and records the (start, end)
+offsets of every value under a dot-separated path ("sensitivity_label",
+"user.department", "compliance_flags.0"), so each lookup is a dict access
+instead of a rescan of the whole payload.
+"""
+import json
+import re
+from typing import Dict, Tuple
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null|NaN|-?Infinity")
+_CLOSING = {"{": "}", "[": "]"}
+
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def index_json_spans(json_str: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Map the path of every value in a JSON document to its (start, end) offsets.
+
+    String values include their quotes; objects and arrays include their brackets.
+    The root value is indexed under "". Duplicate keys keep the last occurrence,
+    like json.loads.
+
+    Args:
+        json_str: The JSON document
+
+    Returns:
+        Dict of path -> (start, end)
+
+    Raises:
+        ValueError: If json_str is not valid JSON
+    """
+    spans = {}
+    stack = []  # [opening char, path, start offset, array index]
+    path = ""
+    pos = _WHITESPACE.match(json_str, 0).end()
+
+    def read_key(pos: int) -> Tuple[str, int]:
+        match = _STRING.match(json_str, pos)
+        if match is None:
+            raise ValueError(f"Expected an object key at offset {pos}")
+        raw = match.group(0)
+        key = json.loads(raw) if "\\" in raw else raw[1:-1]
+        pos = _WHITESPACE.match(json_str, match.end()).end()
+        if json_str[pos:pos + 1] != ":":
+            raise ValueError(f"Expected ':' at offset {pos}")
+        return key, _WHITESPACE.match(json_str, pos + 1).end()
+
+    while True:
+        # Parse the value at pos under `path`
+        char = json_str[pos:pos + 1]
+        if char in ("{", "["):
+            stack.append([char, path, pos, 0])
+            pos = _WHITESPACE.match(json_str, pos + 1).end()
+            if json_str[pos:pos + 1] != _CLOSING[char]:
+                if char == "[":
+                    path = _join(path, "0")
+                else:
+                    key, pos = read_key(pos)
+                    path = _join(path, key)
+                continue
+        else:
+            match = (_STRING if char == '"' else _SCALAR).match(json_str, pos)
+            if match is None:
+                raise ValueError(f"Expected a JSON value at offset {pos}")
+            spans[path] = (pos, match.end())
+            pos = _WHITESPACE.match(json_str, match.end()).end()
+
+        # Close finished containers, or move on to the next element
+        while stack:
+            opening, container_path, start, index = stack[-1]
+            char = json_str[pos:pos + 1]
+            if char == _CLOSING[opening]:
+                spans[container_path] = (start, pos + 1)
+                stack.pop()
+                pos = _WHITESPACE.match(json_str, pos + 1).end()
+            elif char == ",":
+                pos = _WHITESPACE.match(json_str, pos + 1).end()
+                if opening == "[":
+                    stack[-1][3] = index + 1
+                    path = _join(container_path, str(index + 1))
+                else:
+                    key, pos = read_key(pos)
+                    path = _join(container_path, key)
+                break
+            else:
+                raise ValueError(f"Expected ',' or '{_CLOSING[opening]}' at offset {pos}")
+        else:
+            return spans
@@ -1,18 +1,39 @@
 """
 Sentinel Demo API - FastAPI Backend
 """
+import asyncio
+import base64
+import binascii
+import codecs
+import hashlib
 import os
 import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from postgrest.exceptions import APIError
 import json
-from verdict_mapping import policy_action_to_verdict, get_user_message_for_verdict
+from policy_engine import INPUT_TYPES, CompiledPolicyPack, resolve_overlaps
+from policy_cache import PolicyPackCache
+from evaluation import Annotation, evaluate_input, policy_stats, summarize_text_evaluation
+from evaluation_pool import EvaluationPool, evaluate_in_worker, evaluate_upload_in_worker
+from data_access import QueryExecutor
+from write_behind import WriteBehindFull, WriteBehindQueue
+from result_cache import ResultCache
+from run_cache import RunCache, etag_matches, make_etag
+from redaction import build_redacted_output
+from streaming import StreamScanner
+from copilot import CopilotEnvelope, copilot_platform_metadata, describe_payload_error, parse_copilot_payload
+from uploads import MULTIPART_OVERHEAD_BYTES, UploadTooLarge, limit_body, read_spooled_text, spool_to_tempfile
+from jobs import Job, JobQueue, QueueFull
 
 load_dotenv()
 
@@ -64,92 +85,88 @@ def load_policies(policy_pack_version: str = "v1") -> List[dict]:
             "version": p["version"],
             "conditions": p["conditions"],
             "action": p["action"],
+            "updated_at": p["updated_at"],
+            "updated_by": p["updated_by"],
         })
     return policies
 
 
-def extract_value_span(matched_text: str, match_start: int, match_end: int):
+def probe_policy_pack_fingerprint(policy_pack_version: str = "v1") -> tuple:
     """
-    Extract the value portion span from a KEY=VALUE or Header: Value match.
-    Annotations should record only the VALUE portion, not the key name.
-    
-    Args:
-        matched_text: The full matched text
-        match_start: Start position of the full match
-        match_end: End position of the full match
-    
-    Returns:
-        Tuple of (value_start, value_end, value_span) representing just the value portion.
-        If no delimiter found, returns original (match_start, match_end, matched_text).
+    Cheap change-detection query for the policies table (a few narrow columns of a small table).
+    Returns (row count, enabled row count, latest updated_at, digest of every row's id/status/version/updated_at).
+    Status is part of the digest, so enabling or disabling a policy is picked up even when
+    updated_at was not bumped; migration 010 also bumps updated_at on every other edit.
     """
-    # Check if matched text contains '=' (preferred) or ':' delimiter
-    if '=' in matched_text:
-        delimiter_idx = matched_text.find('=')
-        value_start_in_match = delimiter_idx + 1
-        # Skip any whitespace after '='
-        while value_start_in_match < len(matched_text) and matched_text[value_start_in_match] in ' \t':
-            value_start_in_match += 1
-        value_span = matched_text[value_start_in_match:]
-        value_start = match_start + value_start_in_match
-        value_end = match_end
-        return (value_start, value_end, value_span)
-    elif ':' in matched_text:
-        delimiter_idx = matched_text.find(':')
-        value_start_in_match = delimiter_idx + 1
-        # Skip any whitespace after ':'
-        while value_start_in_match < len(matched_text) and matched_text[value_start_in_match] in ' \t':
-            value_start_in_match += 1
-        value_span = matched_text[value_start_in_match:]
-        value_start = match_start + value_start_in_match
-        value_end = match_end
-        return (value_start, value_end, value_span)
-    else:
-        # No delimiter found, entire match is the value
-        return (match_start, match_end, matched_text)
+    result = supabase.table("policies").select("id, status, version, updated_at").execute()
+    rows = sorted((r["id"], r["status"], r["version"], r["updated_at"]) for r in result.data)
+    digest = hashlib.sha256(json.dumps(rows, default=str).encode("utf-8")).hexdigest()[:16]
+    enabled = sum(1 for row in rows if row[1] == "ENABLED")
+    latest = max((row[3] for row in rows if row[3]), default=None)
+    return (len(rows), enabled, latest, digest)
+
+
+# Process-wide compiled policy pack cache (revalidated against the fingerprint above)
+policy_pack_cache = PolicyPackCache(
+    load_policies=load_policies,
+    probe_fingerprint=probe_policy_pack_fingerprint,
+    ttl_seconds=float(os.getenv("POLICY_CACHE_TTL_SECONDS", "30")),
+    stale_seconds=float(os.getenv("POLICY_CACHE_STALE_SECONDS", "300")),
+)
+
+
+# Maximum number of items accepted by POST /v1/runs:batch
+runs_batch_max_items = int(os.getenv("RUNS_BATCH_MAX_ITEMS", "100"))
+
+# Longest match attempt POST /v1/runs:stream holds back before aborting the stream (0: no limit)
+stream_max_carry_chars = int(os.getenv("STREAM_MAX_CARRY_CHARS", "4096"))
+
+# Maximum size of a document accepted by POST /v1/runs:upload
+upload_max_bytes = int(os.getenv("UPLOAD_MAX_BYTES", "52428800"))
+
+# Worker processes for large evaluations (POLICY_POOL_WORKERS=0 evaluates everything inline)
+evaluation_pool = EvaluationPool(
+    workers=int(os.getenv("POLICY_POOL_WORKERS", "1")),
+    min_chars=int(os.getenv("POLICY_POOL_MIN_CHARS", "262144")),
+)
 
 
-def apply_redaction(content: str, start: int, end: int, matched_text: str) -> str:
+# Results for repeated inputs, keyed by content hash and policy pack content hash
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+    max_input_chars=int(os.getenv("RESULT_CACHE_MAX_CHARS", "65536")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", "33554432")),
+)
+
+
+# Supabase queries from async handlers run on this bounded pool instead of blocking the event loop
+db = QueryExecutor(max_workers=int(os.getenv("SUPABASE_MAX_CONCURRENCY", "16")))
+
+# Persist a run and its events through one RPC call (migration 008); per-table inserts if disabled or not deployed
+atomic_run_writes = os.getenv("SUPABASE_ATOMIC_WRITES", "true").lower() == "true"
+
+
+# Recently created and recently read runs (runs are immutable), bounded by serialized size
+run_cache = RunCache(max_bytes=int(os.getenv("RUN_CACHE_MAX_BYTES", "67108864")))
+
+# Cache-Control for run reads: a run never changes, while an export embeds the current policy snapshot
+RUN_CACHE_CONTROL = "private, max-age=31536000, immutable"
+EXPORT_CACHE_CONTROL = "private, no-cache"
+
+
+async def get_policy_pack(policy_pack_version: str = "v1") -> CompiledPolicyPack:
     """
-    Apply redaction to content, preserving variable names for KEY=VALUE or KEY: VALUE formats.
-    
-    Args:
-        content: The full content string
-        start: Start position of the match (full match including key)
-        end: End position of the match (full match including key)
-        matched_text: The matched text span (full match including key)
-    
-    Returns:
-        The content with redaction applied (preserves key name, redacts value)
+    Get the compiled policy pack for the given version from the process-wide cache.
+    A missing or expired pack is loaded/revalidated on the query pool, not on the event loop.
     """
-    # Check if matched text contains '=' (preferred) or ':' delimiter
-    if '=' in matched_text:
-        delimiter_idx = matched_text.find('=')
-        # Keep variable name and delimiter, replace value
-        replacement = matched_text[:delimiter_idx + 1] + "[REDACTED]"
-    elif ':' in matched_text:
-        delimiter_idx = matched_text.find(':')
-        # Keep variable name and delimiter, replace value
-        # Handle optional space after colon
-        space_after_colon = 0
-        if delimiter_idx + 1 < len(matched_text) and matched_text[delimiter_idx + 1] == ' ':
-            space_after_colon = 1
-        replacement = matched_text[:delimiter_idx + 1 + space_after_colon] + "[REDACTED]"
-    else:
-        # No delimiter found, replace entire span
-        replacement = "[REDACTED]"
-    
-    return content[:start] + replacement + content[end:]
+    pack = policy_pack_cache.get_cached(policy_pack_version)
+    if pack is None:
+        pack = await db.run(policy_pack_cache.get, policy_pack_version)
+    return pack
 
 
 # Pydantic models (matching TypeScript types)
-class Annotation(BaseModel):
-    span: str
-    policy_name: str
-    action: str = Field(..., pattern="^(REDACT|BLOCK|REVIEW)$")
-    start: int
-    end: int
-
-
 class CreateRunRequest(BaseModel):
     input_type: str = Field(..., pattern="^(chat|file|code|copilot)$")
     input_content: str
@@ -165,6 +182,30 @@ class CreateRunResponse(BaseModel):
     annotations: List[Annotation]
 
 
+class CreateJobResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., pattern="^(queued|running|succeeded|failed|cancelled)$")
+    progress: float
+    run_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+class CreateRunBatchRequest(BaseModel):
+    items: List[CreateRunRequest]
+
+
+class CreateRunBatchResponse(BaseModel):
+    results: List[CreateRunResponse]
+
+
 class RunEvent(BaseModel):
     id: str
     run_id: str
@@ -219,1151 +260,124 @@ class GetPoliciesResponse(BaseModel):
     policies: List[Policy]
 
 
-# Helper function to find JSON value position in original string
-def find_json_value_position(json_str: str, json_obj: dict, field_path: str) -> Optional[tuple]:
+# Stub logic for demo scenarios
+def generate_demo_run(input_type: str, input_content: str, scenario_id: Optional[str] = None, policy_pack_version: str = "v1", short_circuit: Optional[bool] = None, pack: Optional[CompiledPolicyPack] = None, copilot: Optional[CopilotEnvelope] = None):
     """
-    Find the start and end position of a JSON value in the original JSON string.
-    
-    Args:
-        json_str: The original JSON string
-        json_obj: The parsed JSON object
-        field_path: Dot-separated path to the field (e.g., "sensitivity_label", "user.department", "compliance_flags.0")
-    
-    Returns:
-        Tuple of (start, end) positions, or None if not found
+    Generate deterministic demo run results based on scenario or policy evaluation.
+    short_circuit (default from POLICY_SHORT_CIRCUIT_ON_BLOCK) stops evaluating once a BLOCK policy fires.
+    pack overrides the cached policy pack (a snapshot taken by the caller).
+    copilot is the already parsed payload for copilot inputs.
     """
-    import re
-    try:
-        # Navigate to the field value to verify it exists
-        parts = field_path.split('.')
-        value = json_obj
-        for part in parts:
-            if isinstance(value, list):
-                value = value[int(part)]
-            else:
-                value = value[part]
-        
-        # Build regex pattern to find the field path in JSON
-        # For nested paths like "user.department", we need to find "user": {... "department": ...}
-        if len(parts) == 1:
-            # Simple case: top-level field
-            field_name = parts[0]
-            pattern = f'"{re.escape(field_name)}"\\s*:\\s*'
-            match = re.search(pattern, json_str)
-            if not match:
-                return None
-            match_start_pos = match.start()
-            match_end_pos = match.end()
-        else:
-            # Nested case: find parent object, then field
-            # For "user.department", search for "user": {... "department": ...}
-            parent_field = parts[0]
-            field_name = parts[-1]
-            # Find parent object, then search within it for the field
-            parent_pattern = f'"{re.escape(parent_field)}"\\s*:\\s*\\{{'
-            parent_match = re.search(parent_pattern, json_str)
-            if not parent_match:
-                return None
-            # Search for the field within the parent object
-            parent_start = parent_match.end() - 1  # Include the opening brace
-            # Find the matching closing brace for the parent object
-            brace_count = 1
-            parent_end = parent_start + 1
-            while parent_end < len(json_str) and brace_count > 0:
-                if json_str[parent_end] == '{':
-                    brace_count += 1
-                elif json_str[parent_end] == '}':
-                    brace_count -= 1
-                parent_end += 1
-            # Search for field within parent object bounds
-            pattern = f'"{re.escape(field_name)}"\\s*:\\s*'
-            match = re.search(pattern, json_str[parent_start:parent_end])
-            if not match:
-                return None
-            match_start_pos = parent_start + match.start()
-            match_end_pos = parent_start + match.end()
-        
-        # Find the value after the colon
-        value_start = match_end_pos
-        # Skip whitespace
-        while value_start < len(json_str) and json_str[value_start] in ' \t\n\r':
-            value_start += 1
-        
-        if value_start >= len(json_str):
-            return None
-        
-        # Parse forward to find the end of the value
-        if json_str[value_start] == '"':
-            # String value - find closing quote (handling escapes)
-            end_quote = value_start + 1
-            while end_quote < len(json_str):
-                if json_str[end_quote] == '"' and json_str[end_quote - 1] != '\\':
-                    return (value_start, end_quote + 1)
-                elif json_str[end_quote] == '"' and json_str[end_quote - 1] == '\\' and json_str[end_quote - 2] == '\\':
-                    # Double backslash before quote - this is the end
-                    return (value_start, end_quote + 1)
-                end_quote += 1
-            return None
-        elif json_str[value_start] == '[':
-            # Array value - find matching bracket
-            bracket_count = 1
-            pos = value_start + 1
-            while pos < len(json_str) and bracket_count > 0:
-                if json_str[pos] == '[':
-                    bracket_count += 1
-                elif json_str[pos] == ']':
-                    bracket_count -= 1
-                pos += 1
-            return (value_start, pos) if bracket_count == 0 else None
-        elif json_str[value_start] == '{':
-            # Object value - find matching brace
-            brace_count = 1
-            pos = value_start + 1
-            while pos < len(json_str) and brace_count > 0:
-                if json_str[pos] == '{':
-                    brace_count += 1
-                elif json_str[pos] == '}':
-                    brace_count -= 1
-                pos += 1
-            return (value_start, pos) if brace_count == 0 else None
-        else:
-            # Primitive value (number, boolean, null) - find next comma, }, or ]
-            pos = value_start
-            while pos < len(json_str):
-                if json_str[pos] in ',}]':
-                    return (value_start, pos)
-                pos += 1
-            return (value_start, len(json_str))
-    except (KeyError, IndexError, ValueError, TypeError) as e:
-        return None
-
-
-def evaluate_copilot_policies(json_content: str, policies: List[dict]) -> tuple:
+    if pack is None:
+        # Load compiled policies (cached per policy pack version; blocks on a cold cache, so handlers pass pack)
+        pack = policy_pack_cache.get(policy_pack_version)
+    return evaluate_input(input_type, input_content, scenario_id, pack, short_circuit, copilot)
+
+
+def validate_run_request(request: CreateRunRequest) -> Optional[CopilotEnvelope]:
     """
-    Evaluate policies against structured copilot JSON fields.
-    
-    Args:
-        json_content: The JSON string content
-        policies: List of policy dictionaries from Supabase
+    Validate request content that the model pattern checks cannot express.
     
     Returns:
-        Tuple of (annotations, evaluated_policies, matches) where:
-        - annotations: List of Annotation objects
-        - evaluated_policies: List of policy names that were evaluated
-        - matches: List of match tuples for redaction
+        The parsed copilot payload for input_type='copilot' (passed on to evaluation
+        and build_run_records so it is parsed only once), otherwise None
     """
-    try:
-        copilot_data = json.loads(json_content)
-    except json.JSONDecodeError:
-        # Invalid JSON - return empty results
-        return ([], [], [])
-    
-    annotations = []
-    evaluated_policies = []
-    matches = []  # (match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action)
-    
-    # Extract structured fields from copilot data
-    sensitivity_label = copilot_data.get("sensitivity_label", "")
-    workload = copilot_data.get("workload", "")
-    compliance_flags = copilot_data.get("compliance_flags", [])
-    user_department = copilot_data.get("user", {}).get("department", "")
-    user_role = copilot_data.get("user", {}).get("role", "")
-    action_type = copilot_data.get("action", {}).get("type", "")
-    
-    # Evaluate each policy
-    for policy in policies:
-        policy_id = policy["id"]
-        policy_name = policy["name"]
-        policy_action = policy["action"]
-        conditions = policy.get("conditions", {})
-        
-        # Get structured field conditions
-        labels = conditions.get("labels", [])  # List of sensitivity labels to match
-        workloads = conditions.get("workloads", [])  # List of workloads to match
-        keywords = conditions.get("keywords", [])  # List of keywords to match against compliance_flags or other fields
-        sensitivity_label_contains = conditions.get("sensitivity_label_contains", [])  # List of strings to check in sensitivity_label
-        compliance_flags_include = conditions.get("compliance_flags_include", [])  # List of flags to check in compliance_flags
-        
-        policy_matched = False
-        
-        # Debug logging
-        debug_info = {
-            "policy_id": policy_id,
-            "policy_name": policy_name,
-            "conditions_keys": list(conditions.keys()),
-            "matching_method": "structured_fields",
-            "input_type": "copilot",
-            "input_length": len(json_content),
-            "sensitivity_label": sensitivity_label,
-            "workload": workload,
-            "compliance_flags": compliance_flags
-        }
-        print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
-        
-        # Check sensitivity label match (using labels condition)
-        if labels and sensitivity_label:
-            for label_pattern in labels:
-                if label_pattern.lower() in sensitivity_label.lower():
-                    # Find position of sensitivity_label value
-                    pos = find_json_value_position(json_content, copilot_data, "sensitivity_label")
-                    if pos:
-                        match_start, match_end = pos
-                        matched_text = json_content[match_start:match_end]
-                        # For JSON string values, extract just the value portion (without quotes)
-                        if matched_text.startswith('"') and matched_text.endswith('"'):
-                            value_start = match_start + 1
-                            value_end = match_end - 1
-                            value_span = matched_text[1:-1]
-                        else:
-                            value_start = match_start
-                            value_end = match_end
-                            value_span = matched_text
-                        
-                        matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                        policy_matched = True
-                    break
-        
-        # Check sensitivity_label_contains condition (for policies like Sensitivity Label Guard)
-        if sensitivity_label_contains and sensitivity_label:
-            for pattern in sensitivity_label_contains:
-                if pattern.lower() in sensitivity_label.lower():
-                    # Find position of sensitivity_label value
-                    pos = find_json_value_position(json_content, copilot_data, "sensitivity_label")
-                    if pos:
-                        match_start, match_end = pos
-                        matched_text = json_content[match_start:match_end]
-                        if matched_text.startswith('"') and matched_text.endswith('"'):
-                            value_start = match_start + 1
-                            value_end = match_end - 1
-                            value_span = matched_text[1:-1]
-                        else:
-                            value_start = match_start
-                            value_end = match_end
-                            value_span = matched_text
-                        
-                        matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                        policy_matched = True
-                        break
-        
-        # Check compliance_flags_include condition (for policies like Sensitivity Label Guard)
-        if compliance_flags_include and compliance_flags:
-            for required_flag in compliance_flags_include:
-                if required_flag.lower() in [flag.lower() for flag in compliance_flags]:
-                    # Find the matching flag in the array
-                    matching_flag = next((f for f in compliance_flags if required_flag.lower() in f.lower()), None)
-                    if matching_flag:
-                        flag_index = compliance_flags.index(matching_flag)
-                        field_path = f"compliance_flags.{flag_index}"
-                        pos = find_json_value_position(json_content, copilot_data, field_path)
-                        if pos:
-                            match_start, match_end = pos
-                            matched_text = json_content[match_start:match_end]
-                            if matched_text.startswith('"') and matched_text.endswith('"'):
-                                value_start = match_start + 1
-                                value_end = match_end - 1
-                                value_span = matched_text[1:-1]
-                            else:
-                                value_start = match_start
-                                value_end = match_end
-                                value_span = matched_text
-                            
-                            matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                            policy_matched = True
-                            break
-        
-        # Check workload match
-        if workloads and workload:
-            for workload_pattern in workloads:
-                if workload_pattern.lower() in workload.lower():
-                    pos = find_json_value_position(json_content, copilot_data, "workload")
-                    if pos:
-                        match_start, match_end = pos
-                        matched_text = json_content[match_start:match_end]
-                        if matched_text.startswith('"') and matched_text.endswith('"'):
-                            value_start = match_start + 1
-                            value_end = match_end - 1
-                            value_span = matched_text[1:-1]
-                        else:
-                            value_start = match_start
-                            value_end = match_end
-                            value_span = matched_text
-                        
-                        matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                        policy_matched = True
-                    break
-        
-        # Check keyword matches in compliance_flags
-        if keywords and compliance_flags:
-            for keyword in keywords:
-                if keyword.lower() in [flag.lower() for flag in compliance_flags]:
-                    # Find the matching flag in the array
-                    matching_flag = next((f for f in compliance_flags if keyword.lower() in f.lower()), None)
-                    if matching_flag:
-                        # Find position in compliance_flags array
-                        flag_index = compliance_flags.index(matching_flag)
-                        field_path = f"compliance_flags.{flag_index}"
-                        pos = find_json_value_position(json_content, copilot_data, field_path)
-                        if pos:
-                            match_start, match_end = pos
-                            matched_text = json_content[match_start:match_end]
-                            if matched_text.startswith('"') and matched_text.endswith('"'):
-                                value_start = match_start + 1
-                                value_end = match_end - 1
-                                value_span = matched_text[1:-1]
-                            else:
-                                value_start = match_start
-                                value_end = match_end
-                                value_span = matched_text
-                            
-                            matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                            policy_matched = True
-        
-        # Check keyword matches in other fields (user.department, user.role, action.type)
-        if keywords:
-            # Check user.department
-            if user_department and any(kw.lower() in user_department.lower() for kw in keywords):
-                pos = find_json_value_position(json_content, copilot_data, "user.department")
-                if pos:
-                    match_start, match_end = pos
-                    matched_text = json_content[match_start:match_end]
-                    if matched_text.startswith('"') and matched_text.endswith('"'):
-                        value_start = match_start + 1
-                        value_end = match_end - 1
-                        value_span = matched_text[1:-1]
-                    else:
-                        value_start = match_start
-                        value_end = match_end
-                        value_span = matched_text
-                    
-                    matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                    policy_matched = True
-            
-            # Check user.role
-            if user_role and any(kw.lower() in user_role.lower() for kw in keywords):
-                pos = find_json_value_position(json_content, copilot_data, "user.role")
-                if pos:
-                    match_start, match_end = pos
-                    matched_text = json_content[match_start:match_end]
-                    if matched_text.startswith('"') and matched_text.endswith('"'):
-                        value_start = match_start + 1
-                        value_end = match_end - 1
-                        value_span = matched_text[1:-1]
-                    else:
-                        value_start = match_start
-                        value_end = match_end
-                        value_span = matched_text
-                    
-                    matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                    policy_matched = True
-            
-            # Check action.request (for copilot interactions)
-            action_request = copilot_data.get("action", {}).get("request", "")
-            if action_request and any(kw.lower() in action_request.lower() for kw in keywords):
-                pos = find_json_value_position(json_content, copilot_data, "action.request")
-                if pos:
-                    match_start, match_end = pos
-                    matched_text = json_content[match_start:match_end]
-                    if matched_text.startswith('"') and matched_text.endswith('"'):
-                        value_start = match_start + 1
-                        value_end = match_end - 1
-                        value_span = matched_text[1:-1]
-                    else:
-                        value_start = match_start
-                        value_end = match_end
-                        value_span = matched_text
-                    
-                    matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                    policy_matched = True
-            
-            # Check content_preview
-            content_preview = copilot_data.get("content_preview", "")
-            if content_preview and any(kw.lower() in content_preview.lower() for kw in keywords):
-                pos = find_json_value_position(json_content, copilot_data, "content_preview")
-                if pos:
-                    match_start, match_end = pos
-                    matched_text = json_content[match_start:match_end]
-                    if matched_text.startswith('"') and matched_text.endswith('"'):
-                        value_start = match_start + 1
-                        value_end = match_end - 1
-                        value_span = matched_text[1:-1]
-                    else:
-                        value_start = match_start
-                        value_end = match_end
-                        value_span = matched_text
-                    
-                    matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                    policy_matched = True
-        
-        if policy_matched:
-            evaluated_policies.append(policy_name)
-    
-    # Build annotations from matches
-    annotations = [
-        Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end)
-        for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches
-    ]
-    
-    return (annotations, evaluated_policies, matches)
-
-
-# Stub logic for demo scenarios
-def generate_demo_run(input_type: str, input_content: str, scenario_id: Optional[str] = None, policy_pack_version: str = "v1"):
-    """Generate deterministic demo run results based on scenario or policy evaluation"""
-    import re
-    
-    annotations = []
-    events = []
-    baseline_output = input_content
-    governed_output = input_content
-    verdict = "ALLOWED"
-    user_message = "Output approved."
-    
-    # Special handling for copilot input type - evaluate structured fields
-    if input_type == "copilot":
-        # Load policies from Supabase
-        policies = load_policies(policy_pack_version)
-        
-        # Filter policies that apply to copilot input type
-        # Ensure scope is treated as a list (handle both list and string formats)
-        copilot_policies = []
-        for p in policies:
-            scope = p.get("scope", [])
-            # Handle case where scope might be stored as a string or list
-            if isinstance(scope, str):
-                scope = [scope]
-            if input_type in scope:
-                copilot_policies.append(p)
-        
-        # Log policy filtering for debugging
-        print(f"[POLICY_FILTER] input_type='{input_type}', total_policies={len(policies)}, applicable_policies={len(copilot_policies)}")
-        if copilot_policies:
-            print(f"[POLICY_FILTER] applicable_policy_names={[p['name'] for p in copilot_policies]}")
-        
-        # Evaluate policies against structured fields
-        annotations, evaluated_policies, matches = evaluate_copilot_policies(input_content, copilot_policies)
-        
-        # Determine verdict based on actions using shared mapping utility
-        actions = [a.action for a in annotations]
-        verdict = policy_action_to_verdict(actions)
-        user_message = get_user_message_for_verdict(verdict)
-        
-        if verdict == "BLOCKED":
-            governed_output = json.dumps({"error": "Request blocked by policy", "reason": "Policy violation detected"})
-        elif verdict == "HELD_FOR_REVIEW":
-            # Replace governed_output with quarantine placeholder (do not echo original content)
-            review_policies = [a.policy_name for a in annotations if a.action == "REVIEW"]
-            unique_review_policies = list(set(review_policies))
-            # Determine queue name based on policy
-            queue_name = "IP Review" if any("Jaguar" in p or "IP" in p for p in unique_review_policies) else "General Review"
-            governed_output = f"This content has been quarantined and held for review due to policy: {', '.join(unique_review_policies)}."
-        elif verdict == "REDACTED":
-            # Apply redactions from end -> start to avoid index drift
-            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in sorted(matches, key=lambda x: x[0], reverse=True):
-                if action == "REDACT":
-                    # For JSON, check if the value is a string (has quotes) and maintain JSON structure
-                    if matched_text.startswith('"') and matched_text.endswith('"'):
-                        # String value - replace with "[REDACTED]" to maintain valid JSON
-                        governed_output = governed_output[:match_start] + '"[REDACTED]"' + governed_output[match_end:]
-                    else:
-                        # Non-string value - replace value portion only
-                        governed_output = governed_output[:value_start] + "[REDACTED]" + governed_output[value_end:]
-        
-        # Generate events (same structure as other input types)
-        events = [
-            {"event_type": "Input Sanitized", "payload": {"input_length": len(input_content)}},
-            {"event_type": "Policy Evaluated", "payload": {"policies": evaluated_policies}},
-        ]
-        
-        # Track review reasons for meta field
-        review_reasons = []
-        review_queue_name = None
-        recommended_route = None
-        
-        if annotations:
-            violations = {}
-            violation_reasons = {}  # Track why each policy triggered
-            
-            for ann in annotations:
-                if ann.policy_name not in violations:
-                    violations[ann.policy_name] = 0
-                    violation_reasons[ann.policy_name] = []
-                violations[ann.policy_name] += 1
-                
-                # Track review reasons
-                if ann.action == "REVIEW":
-                    # Find policy ID from copilot_policies list
-                    policy_id = None
-                    for p in copilot_policies:
-                        if p["name"] == ann.policy_name:
-                            policy_id = p["id"]
-                            break
-                    review_reasons.append({
-                        "policy_id": policy_id or "unknown",
-                        "policy_name": ann.policy_name,
-                        "matches": 1  # Will be aggregated below
-                    })
-                    
-                    # Set queue name and recommended route for REVIEW
-                    if not review_queue_name:
-                        review_queue_name = "IP Review" if ("Jaguar" in ann.policy_name or "IP" in ann.policy_name) else "General Review"
-                    if not recommended_route:
-                        # Determine route reason based on policy
-                        route_reason = f"Bespoke IP policy triggered ({ann.policy_name})" if "Jaguar" in ann.policy_name or "IP" in ann.policy_name else f"Policy triggered ({ann.policy_name})"
-                        recommended_route = {
-                            "destination": "private_llm",
-                            "name": "Contoso Internal LLM",
-                            "reason": route_reason
-                        }
-                
-                # For Sensitivity Label Guard, add reason to payload
-                if ann.policy_name == "Sensitivity Label Guard":
-                    # Try to determine why it triggered from the annotation span
-                    if "Confidential" in ann.span:
-                        violation_reasons[ann.policy_name].append("sensitivity_label_contains_confidential")
-                    elif ann.span in ["financial_data", "executive_discussion"]:
-                        violation_reasons[ann.policy_name].append(f"compliance_flag_{ann.span}")
-            
-            # Aggregate review reasons by policy
-            review_reasons_aggregated = {}
-            for reason in review_reasons:
-                key = reason["policy_id"]
-                if key not in review_reasons_aggregated:
-                    review_reasons_aggregated[key] = {
-                        "policy_id": reason["policy_id"],
-                        "policy_name": reason["policy_name"],
-                        "matches": 0
-                    }
-                review_reasons_aggregated[key]["matches"] += 1
-            
-            for policy_name, count in violations.items():
-                payload = {"policy": policy_name, "matches": count}
-                # Add reason for Sensitivity Label Guard
-                if policy_name == "Sensitivity Label Guard" and violation_reasons[policy_name]:
-                    payload["triggered_by"] = list(set(violation_reasons[policy_name]))
-                events.append({
-                    "event_type": "Violation Detected",
-                    "payload": payload
-                })
-            
-            redact_count = sum(1 for a in annotations if a.action == "REDACT")
-            if redact_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REDACT", "redactions": redact_count}
-                })
-            
-            review_count = sum(1 for a in annotations if a.action == "REVIEW")
-            if review_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REVIEW", "reviews": review_count}
-                })
-                # Add Quarantined event
-                events.append({
-                    "event_type": "Quarantined",
-                    "payload": {"reason": "REVIEW action", "queue": review_queue_name or "General Review"}
-                })
-                # Add Routing Recommended event (simulated)
-                if recommended_route:
-                    events.append({
-                        "event_type": "Routing Recommended",
-                        "payload": {
-                            "destination": recommended_route["destination"],
-                            "name": recommended_route["name"],
-                            "simulated": True
-                        }
-                    })
-            
-            if any(a.action == "BLOCK" for a in annotations):
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "BLOCK"}
-                })
-        
-        events.append({
-            "event_type": "Final Output Released",
-            "payload": {"verdict": verdict}
-        })
-        
-        # Build meta with review information
-        meta = {
-            "annotations": [a.dict() for a in annotations],
-            "review_required": verdict == "HELD_FOR_REVIEW",
-        }
-        if review_reasons_aggregated:
-            meta["review_reasons"] = list(review_reasons_aggregated.values())
-        if verdict == "HELD_FOR_REVIEW":
-            meta["review_queue"] = review_queue_name or "General Review"
-            if recommended_route:
-                meta["recommended_route"] = recommended_route
-        
-        return {
-            "baseline_output": baseline_output,
-            "governed_output": governed_output,
-            "verdict": verdict,
-            "user_message": user_message,
-            "annotations": annotations,
-            "events": events,
-            "meta": meta,
-        }
-    
-    # If no scenario_id provided, evaluate all policies from Supabase based on their patterns
-    if not scenario_id:
-        # Load policies from Supabase (no caching - fresh on each run)
-        policies = load_policies(policy_pack_version)
-        
-        # Filter policies by scope - ensure copilot is treated as first-class input type
-        applicable_policies = []
-        for policy in policies:
-            scope = policy.get("scope", [])
-            # Handle case where scope might be stored as a string or list
-            if isinstance(scope, str):
-                scope = [scope]
-            if input_type in scope:
-                applicable_policies.append(policy)
-        
-        # Log policy filtering for debugging
-        print(f"[POLICY_FILTER] input_type='{input_type}', total_policies={len(policies)}, applicable_policies={len(applicable_policies)}")
-        if applicable_policies:
-            print(f"[POLICY_FILTER] applicable_policy_names={[p['name'] for p in applicable_policies]}")
-        
-        evaluated_policies = []
-        all_matches = []
-        
-        # Evaluate each enabled policy that matches the input_type scope
-        for policy in applicable_policies:
-            
-            policy_id = policy["id"]
-            policy_name = policy["name"]
-            policy_action = policy["action"]
-            conditions = policy.get("conditions", {})
-            
-            # Track that this policy is being evaluated (add to list before matching)
-            evaluated_policies.append(policy_name)
-            
-            # Get regex patterns from conditions.patterns (list of regex strings)
-            regex_patterns = conditions.get("patterns", [])
-            # Get keywords from conditions.keywords (for keyword-based matching)
-            keywords = conditions.get("keywords", [])
-            # Get phrases from conditions.phrases (treated same as keywords for phrase-based matching)
-            phrases = conditions.get("phrases", [])
-            # Combine keywords and phrases for matching
-            if phrases:
-                keywords = list(keywords) + list(phrases)
-            
-            # Debug: Log policy evaluation details before matching
-            conditions_keys = list(conditions.keys())
-            patterns_preview = regex_patterns[:3] if len(regex_patterns) > 0 else []
-            matching_method = "regex" if regex_patterns else ("keywords" if keywords else "none")
-            
-            debug_info = {
-                "policy_id": policy_id,
-                "policy_name": policy_name,
-                "conditions_keys": conditions_keys,
-                "patterns_preview": patterns_preview,
-                "patterns_count": len(regex_patterns),
-                "keywords_count": len(keywords),
-                "matching_method": matching_method,
-                "input_type": input_type,
-                "input_length": len(input_content)
-            }
-            print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
-            
-            # Evaluate keywords first (for chat/copilot inputs that use keyword matching)
-            if keywords and input_type in ["chat", "copilot"]:
-                input_lower = input_content.lower()
-                for keyword in keywords:
-                    keyword_lower = keyword.lower()
-                    if keyword_lower in input_lower:
-                        # Find all occurrences of the keyword
-                        start_pos = 0
-                        while True:
-                            idx = input_lower.find(keyword_lower, start_pos)
-                            if idx == -1:
-                                break
-                            match_start = idx
-                            match_end = idx + len(keyword)
-                            matched_text = input_content[match_start:match_end]
-                            # For keyword matches, the entire keyword is the value
-                            value_start, value_end, value_span = match_start, match_end, matched_text
-                            all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                            start_pos = idx + 1
-            
-            # Evaluate each pattern for this policy using regex (re.finditer)
-            for pattern_str in regex_patterns:
-                try:
-                    # Use re.finditer for regex pattern matching (not substring matching)
-                    for match in re.finditer(pattern_str, input_content, re.IGNORECASE):
-                        match_start, match_end = match.span()
-                        matched_text = match.group()
-                        
-                        # Extract value portion for annotation (records only the value, not the key)
-                        value_start, value_end, value_span = extract_value_span(matched_text, match_start, match_end)
-                        
-                        # Store: (match_start, match_end, matched_text_full, value_start, value_end, value_span, policy_name, policy_action)
-                        # match_start/end and matched_text needed for redaction (preserves key name)
-                        # value_start/end/span needed for annotation (records only value for UI highlighting)
-                        all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                except re.error as e:
-                    # Log pattern errors but continue
-                    print(f"Warning: Invalid regex pattern in policy {policy_name}: {pattern_str} - {e}")
-        
-        # Sort + de-dupe overlaps (based on value portion to avoid overlapping annotations)
-        all_matches.sort(key=lambda x: (x[3], x[4]))  # Sort by value_start, value_end
-        matches = []
-        last_value_end = -1
-        for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in all_matches:
-            if value_start >= last_value_end:
-                matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy, action))
-                last_value_end = value_end
-        
-        # Build annotations using VALUE portion only (for UI highlighting and SIEM export)
-        # Each annotation records: policy_name, action, start, end, span (all for VALUE portion)
-        annotations = [
-            Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end)
-            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches
-        ]
-        
-        # Determine verdict based on actions using shared mapping utility
-        actions = [a.action for a in annotations]
-        verdict = policy_action_to_verdict(actions)
-        user_message = get_user_message_for_verdict(verdict)
-        
-        if verdict == "BLOCKED":
-            governed_output = "I cannot fulfill this request. It appears to be attempting to bypass safeguards, override internal policies, or reveal system prompts."
-        elif verdict == "HELD_FOR_REVIEW":
-            # Replace governed_output with quarantine placeholder (do not echo original content)
-            review_policies = [a.policy_name for a in annotations if a.action == "REVIEW"]
-            unique_review_policies = list(set(review_policies))
-            # Determine queue name based on policy
-            queue_name = "IP Review" if any("Jaguar" in p or "IP" in p for p in unique_review_policies) else "General Review"
-            governed_output = f"This content has been quarantined and held for review due to policy: {', '.join(unique_review_policies)}."
-        elif verdict == "REDACTED":
-            # Apply redactions from end -> start to avoid index drift
-            # Use full match info (match_start, match_end, matched_text) for redaction (preserves key name)
-            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in sorted(matches, key=lambda x: x[0], reverse=True):
-                if action == "REDACT":
-                    # Preserve variable names for KEY=VALUE or KEY: VALUE formats
-                    governed_output = apply_redaction(governed_output, match_start, match_end, matched_text)
-        
-        # Generate events
-        events = [
-            {"event_type": "Input Sanitized", "payload": {"input_length": len(input_content)}},
-            {"event_type": "Policy Evaluated", "payload": {"policies": evaluated_policies}},
-        ]
-        
-        # Track review reasons for meta field
-        review_reasons = []
-        review_queue_name = None
-        recommended_route = None
-        
-        if annotations:
-            violations = {}
-            for ann in annotations:
-                if ann.policy_name not in violations:
-                    violations[ann.policy_name] = 0
-                violations[ann.policy_name] += 1
-                
-                # Track review reasons
-                if ann.action == "REVIEW":
-                    # Find policy ID from applicable_policies list
-                    policy_id = None
-                    for p in applicable_policies:
-                        if p["name"] == ann.policy_name:
-                            policy_id = p["id"]
-                            break
-                    review_reasons.append({
-                        "policy_id": policy_id or "unknown",
-                        "policy_name": ann.policy_name,
-                        "matches": 1  # Will be aggregated below
-                    })
-                    
-                    # Set queue name and recommended route for REVIEW
-                    if not review_queue_name:
-                        review_queue_name = "IP Review" if ("Jaguar" in ann.policy_name or "IP" in ann.policy_name) else "General Review"
-                    if not recommended_route:
-                        # Determine route reason based on policy
-                        route_reason = f"Bespoke IP policy triggered ({ann.policy_name})" if "Jaguar" in ann.policy_name or "IP" in ann.policy_name else f"Policy triggered ({ann.policy_name})"
-                        recommended_route = {
-                            "destination": "private_llm",
-                            "name": "Contoso Internal LLM",
-                            "reason": route_reason
-                        }
-            
-            for policy_name, count in violations.items():
-                events.append({
-                    "event_type": "Violation Detected",
-                    "payload": {"policy": policy_name, "matches": count}
-                })
-            
-            redact_count = sum(1 for a in annotations if a.action == "REDACT")
-            if redact_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REDACT", "redactions": redact_count}
-                })
-            
-            review_count = sum(1 for a in annotations if a.action == "REVIEW")
-            if review_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REVIEW", "reviews": review_count}
-                })
-                # Add Quarantined event
-                events.append({
-                    "event_type": "Quarantined",
-                    "payload": {"reason": "REVIEW action", "queue": review_queue_name or "General Review"}
-                })
-                # Add Routing Recommended event (simulated)
-                if recommended_route:
-                    events.append({
-                        "event_type": "Routing Recommended",
-                        "payload": {
-                            "destination": recommended_route["destination"],
-                            "name": recommended_route["name"],
-                            "simulated": True
-                        }
-                    })
-            
-            if any(a.action == "BLOCK" for a in annotations):
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "BLOCK"}
-                })
-        
-        events.append({
-            "event_type": "Final Output Released",
-            "payload": {"verdict": verdict}
-        })
-        
-        # Build meta with review information
-        review_reasons_aggregated = {}
-        for reason in review_reasons:
-            key = reason["policy_id"]
-            if key not in review_reasons_aggregated:
-                review_reasons_aggregated[key] = {
-                    "policy_id": reason["policy_id"],
-                    "policy_name": reason["policy_name"],
-                    "matches": 0
-                }
-            review_reasons_aggregated[key]["matches"] += 1
-        
-        meta = {
-            "annotations": [a.dict() for a in annotations],
-            "review_required": verdict == "HELD_FOR_REVIEW",
-        }
-        if review_reasons_aggregated:
-            meta["review_reasons"] = list(review_reasons_aggregated.values())
-        if verdict == "HELD_FOR_REVIEW":
-            meta["review_queue"] = review_queue_name or "General Review"
-            if recommended_route:
-                meta["recommended_route"] = recommended_route
-        
-        return {
-            "baseline_output": baseline_output,
-            "governed_output": governed_output,
-            "verdict": verdict,
-            "user_message": user_message,
-            "annotations": annotations,
-            "events": events,
-            "meta": meta,
-        }
-    
-    # Explicit scenario handling (only when scenario_id is provided)
-    # Even for explicit scenarios, use policies from Supabase (no hardcoded policy names)
-    if scenario_id:
-        # Load policies from Supabase (no caching - fresh on each run)
-        policies = load_policies(policy_pack_version)
-        
-        # Filter policies by scope - ensure copilot is treated as first-class input type
-        applicable_policies = []
-        for policy in policies:
-            scope = policy.get("scope", [])
-            # Handle case where scope might be stored as a string or list
-            if isinstance(scope, str):
-                scope = [scope]
-            if input_type in scope:
-                applicable_policies.append(policy)
-        
-        # Log policy filtering for debugging
-        print(f"[POLICY_FILTER] input_type='{input_type}', scenario_id='{scenario_id}', total_policies={len(policies)}, applicable_policies={len(applicable_policies)}")
-        if applicable_policies:
-            print(f"[POLICY_FILTER] applicable_policy_names={[p['name'] for p in applicable_policies]}")
-        
-        evaluated_policies = []
-        all_matches = []
-        
-        # Evaluate each enabled policy that matches the input_type scope
-        for policy in applicable_policies:
-            
-            policy_id = policy["id"]
-            policy_name = policy["name"]
-            policy_action = policy["action"]
-            conditions = policy.get("conditions", {})
-            
-            # Get regex patterns from conditions.patterns (list of regex strings)
-            regex_patterns = conditions.get("patterns", [])
-            
-            # Debug: Log policy evaluation details before matching
-            conditions_keys = list(conditions.keys())
-            patterns_preview = regex_patterns[:3] if len(regex_patterns) > 0 else []
-            matching_method = "regex"  # Always using regex for patterns
-            
-            debug_info = {
-                "policy_id": policy_id,
-                "policy_name": policy_name,
-                "conditions_keys": conditions_keys,
-                "patterns_preview": patterns_preview,
-                "patterns_count": len(regex_patterns),
-                "matching_method": matching_method,
-                "input_type": input_type,
-                "input_length": len(input_content),
-                "scenario_id": scenario_id
-            }
-            print(f"[POLICY_EVAL] {json.dumps(debug_info)}")
-            
-            # Evaluate each pattern for this policy using regex (re.finditer)
-            for pattern_str in regex_patterns:
-                try:
-                    # Use re.finditer for regex pattern matching (not substring matching)
-                    for match in re.finditer(pattern_str, input_content, re.IGNORECASE):
-                        match_start, match_end = match.span()
-                        matched_text = match.group()
-                        
-                        # Extract value portion for annotation (records only the value, not the key)
-                        value_start, value_end, value_span = extract_value_span(matched_text, match_start, match_end)
-                        
-                        # Store: (match_start, match_end, matched_text_full, value_start, value_end, value_span, policy_name, policy_action)
-                        # match_start/end and matched_text needed for redaction (preserves key name)
-                        # value_start/end/span needed for annotation (records only value for UI highlighting)
-                        all_matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy_name, policy_action))
-                except re.error as e:
-                    # Log pattern errors but continue
-                    print(f"Warning: Invalid regex pattern in policy {policy_name}: {pattern_str} - {e}")
-            
-            # Check if this policy had any matches
-            if any(p[6] == policy_name for p in all_matches):
-                evaluated_policies.append(policy_name)
-        
-        # Sort + de-dupe overlaps (based on value portion to avoid overlapping annotations)
-        all_matches.sort(key=lambda x: (x[3], x[4]))  # Sort by value_start, value_end
-        matches = []
-        last_value_end = -1
-        for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in all_matches:
-            if value_start >= last_value_end:
-                matches.append((match_start, match_end, matched_text, value_start, value_end, value_span, policy, action))
-                last_value_end = value_end
-        
-        # Build annotations using VALUE portion only (for UI highlighting and SIEM export)
-        # Each annotation records: policy_name, action, start, end, span (all for VALUE portion)
-        annotations = [
-            Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end)
-            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in matches
-        ]
-        
-        # Determine verdict based on actions using shared mapping utility
-        actions = [a.action for a in annotations]
-        verdict = policy_action_to_verdict(actions)
-        user_message = get_user_message_for_verdict(verdict)
-        
-        if verdict == "BLOCKED":
-            governed_output = "I cannot fulfill this request. It appears to be attempting to bypass safeguards, override internal policies, or reveal system prompts."
-        elif verdict == "HELD_FOR_REVIEW":
-            # Replace governed_output with quarantine placeholder (do not echo original content)
-            review_policies = [a.policy_name for a in annotations if a.action == "REVIEW"]
-            unique_review_policies = list(set(review_policies))
-            # Determine queue name based on policy
-            queue_name = "IP Review" if any("Jaguar" in p or "IP" in p for p in unique_review_policies) else "General Review"
-            governed_output = f"This content has been quarantined and held for review due to policy: {', '.join(unique_review_policies)}."
-        elif verdict == "REDACTED":
-            # Apply redactions from end -> start to avoid index drift
-            # Use full match info (match_start, match_end, matched_text) for redaction (preserves key name)
-            for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in sorted(matches, key=lambda x: x[0], reverse=True):
-                if action == "REDACT":
-                    # Preserve variable names for KEY=VALUE or KEY: VALUE formats
-                    governed_output = apply_redaction(governed_output, match_start, match_end, matched_text)
-        
-        # Generate events using policy names from DB
-        events = [
-            {"event_type": "Input Sanitized", "payload": {"input_length": len(input_content)}},
-            {"event_type": "Policy Evaluated", "payload": {"policies": evaluated_policies}},
-        ]
-        
-        # Track review reasons for meta field
-        review_reasons = []
-        review_queue_name = None
-        recommended_route = None
-        
-        if annotations:
-            violations = {}
-            for ann in annotations:
-                if ann.policy_name not in violations:
-                    violations[ann.policy_name] = 0
-                violations[ann.policy_name] += 1
-                
-                # Track review reasons
-                if ann.action == "REVIEW":
-                    # Find policy ID from applicable_policies list
-                    policy_id = None
-                    for p in applicable_policies:
-                        if p["name"] == ann.policy_name:
-                            policy_id = p["id"]
-                            break
-                    review_reasons.append({
-                        "policy_id": policy_id or "unknown",
-                        "policy_name": ann.policy_name,
-                        "matches": 1  # Will be aggregated below
-                    })
-                    
-                    # Set queue name and recommended route for REVIEW
-                    if not review_queue_name:
-                        review_queue_name = "IP Review" if ("Jaguar" in ann.policy_name or "IP" in ann.policy_name) else "General Review"
-                    if not recommended_route:
-                        # Determine route reason based on policy
-                        route_reason = f"Bespoke IP policy triggered ({ann.policy_name})" if "Jaguar" in ann.policy_name or "IP" in ann.policy_name else f"Policy triggered ({ann.policy_name})"
-                        recommended_route = {
-                            "destination": "private_llm",
-                            "name": "Contoso Internal LLM",
-                            "reason": route_reason
-                        }
-            
-            for policy_name, count in violations.items():
-                events.append({
-                    "event_type": "Violation Detected",
-                    "payload": {"policy": policy_name, "matches": count}
-                })
-            
-            redact_count = sum(1 for a in annotations if a.action == "REDACT")
-            if redact_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REDACT", "redactions": redact_count}
-                })
-            
-            review_count = sum(1 for a in annotations if a.action == "REVIEW")
-            if review_count > 0:
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "REVIEW", "reviews": review_count}
-                })
-                # Add Quarantined event
-                events.append({
-                    "event_type": "Quarantined",
-                    "payload": {"reason": "REVIEW action", "queue": review_queue_name or "General Review"}
-                })
-                # Add Routing Recommended event (simulated)
-                if recommended_route:
-                    events.append({
-                        "event_type": "Routing Recommended",
-                        "payload": {
-                            "destination": recommended_route["destination"],
-                            "name": recommended_route["name"],
-                            "simulated": True
-                        }
-                    })
-            
-            if any(a.action == "BLOCK" for a in annotations):
-                events.append({
-                    "event_type": "Action Applied",
-                    "payload": {"action": "BLOCK"}
-                })
-        
-        events.append({
-            "event_type": "Final Output Released",
-            "payload": {"verdict": verdict}
-        })
-        
-        # Build meta with review information
-        review_reasons_aggregated = {}
-        for reason in review_reasons:
-            key = reason["policy_id"]
-            if key not in review_reasons_aggregated:
-                review_reasons_aggregated[key] = {
-                    "policy_id": reason["policy_id"],
-                    "policy_name": reason["policy_name"],
-                    "matches": 0
-                }
-            review_reasons_aggregated[key]["matches"] += 1
-        
-        meta = {
-            "annotations": [a.dict() for a in annotations],
-            "review_required": verdict == "HELD_FOR_REVIEW",
-        }
-        if review_reasons_aggregated:
-            meta["review_reasons"] = list(review_reasons_aggregated.values())
-        if verdict == "HELD_FOR_REVIEW":
-            meta["review_queue"] = review_queue_name or "General Review"
-            if recommended_route:
-                meta["recommended_route"] = recommended_route
-    
-    # Runtime assertion: ensure verdict is always canonical
-    canonical_verdicts = {"ALLOWED", "REDACTED", "HELD_FOR_REVIEW", "BLOCKED"}
-    if verdict not in canonical_verdicts:
-        raise ValueError(f"Invalid verdict '{verdict}'. Must be one of: {canonical_verdicts}")
-    
-    return {
-        "baseline_output": baseline_output,
-        "governed_output": governed_output,
-        "verdict": verdict,
-        "user_message": user_message,
-        "annotations": annotations,
-        "events": events,
-        "meta": meta,
-    }
-
-
-@app.post("/v1/runs", response_model=CreateRunResponse)
-async def create_run(request: CreateRunRequest):
-    """Create a new run and generate stub results"""
-    # Validate JSON content for copilot input type
+    # Parse and validate the copilot payload
     if request.input_type == "copilot":
         try:
-            json.loads(request.input_content)
-        except json.JSONDecodeError as e:
+            return parse_copilot_payload(request.input_content)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"input_content must be valid JSON for input_type='copilot': {describe_payload_error(e)}"
+                )
             raise HTTPException(
                 status_code=400,
-                detail=f"input_content must be valid JSON for input_type='copilot': {str(e)}"
+                detail=f"input_content is not a valid copilot payload: {describe_payload_error(e)}"
             )
+    return None
+
+
+async def evaluate_run_request(request: CreateRunRequest, pack: CompiledPolicyPack, copilot: Optional[CopilotEnvelope] = None) -> dict:
+    """
+    Evaluate a run request against a policy pack snapshot, offloading large inputs to the worker pool.
+    Results for content already evaluated against the same pack contents are served from the result cache.
+    """
+    cache_key = result_cache.key(
+        request.input_content, request.input_type, request.scenario_id, pack.policy_pack_version, pack.content_hash
+    )
+    result = result_cache.get(cache_key)
+    if result is not None:
+        return result
     
-    run_id = str(uuid.uuid4())
-    created_at = datetime.utcnow().isoformat()
-    policy_pack_version = "v1"
-    
-    # Generate demo results (loads policies from Supabase when scenario_id is None)
-    result = generate_demo_run(request.input_type, request.input_content, request.scenario_id, policy_pack_version)
-    
+    if evaluation_pool.should_offload(request.input_content):
+        # Large inputs are evaluated in a worker process so the event loop keeps serving other requests
+        result = await evaluation_pool.run_with_pack(
+            evaluate_in_worker, pack,
+            request.input_type, request.input_content, request.scenario_id, copilot,
+        )
+    else:
+        result = generate_demo_run(request.input_type, request.input_content, request.scenario_id, pack.policy_pack_version, pack=pack, copilot=copilot)
+    result_cache.put(cache_key, result)
+    return result
+
+
+def run_timestamp() -> str:
+    """
+    Current UTC time in the form PostgREST returns timestamptz values (e.g. 2026-01-01T09:30:00.12+00:00),
+    so a run built here is identical to the same run read back from Supabase (one ETag for both).
+    """
+    now = datetime.now(timezone.utc)
+    stamp = now.strftime("%Y-%m-%dT%H:%M:%S")
+    if now.microsecond:
+        stamp += f".{now.microsecond:06d}".rstrip("0")
+    return stamp + "+00:00"
+
+
+def build_run_records(request: CreateRunRequest, result: dict, run_id: str, created_at: str, copilot: Optional[CopilotEnvelope] = None) -> tuple:
+    """
+    Build the runs row and run_events rows for an evaluated request, in their stored form
+    (created_at from run_timestamp, event ids assigned here) so they can be cached as read.
+    For copilot runs the platform metadata is stored in meta so exports need not re-parse the payload.
+
+    Returns:
+        Tuple of (run_data, events_data)
+    """
     # Create input preview (first 100 chars)
     input_preview = request.input_content[:100] + ("..." if len(request.input_content) > 100 else "")
     
-    # Insert run
     # Build meta field with annotations and review information
     meta = {"annotations": [a.dict() for a in result["annotations"]]}
     if "meta" in result:
         meta.update(result["meta"])
     
+    if request.input_type == "copilot" and copilot is None:
+        try:
+            copilot = parse_copilot_payload(request.input_content)
+        except ValidationError:
+            pass
+    if copilot is not None:
+        meta["platform_metadata"] = copilot_platform_metadata(copilot)
+    
     # Always ensure actor and source metadata exist
     if "actor" not in meta:
         # Extract actor from copilot payload if available
         actor = None
         source = None
-        if request.input_type == "copilot":
-            try:
-                copilot_data = json.loads(request.input_content)
-                user_data = copilot_data.get("user", {})
-                platform = copilot_data.get("platform", "Unknown")
-                if user_data:
-                    actor = {
-                        "id": user_data.get("id", "u_demo_001"),
-                        "display": user_data.get("email") or user_data.get("name") or "Demo User",
-                        "role": user_data.get("role", "Employee"),
-                        "dept": user_data.get("department", "N/A")
-                    }
-                source = {
-                    "surface": "copilot",
-                    "platform": platform
+        if copilot is not None:
+            user_data = copilot.user
+            if user_data and (user_data.model_fields_set or user_data.model_extra):
+                actor = {
+                    "id": user_data.id or "u_demo_001",
+                    "display": user_data.email or user_data.name or "Demo User",
+                    "role": user_data.role or "Employee",
+                    "dept": user_data.department or "N/A"
                 }
-            except (json.JSONDecodeError, KeyError, TypeError):
-                pass
+            source = {
+                "surface": "copilot",
+                "platform": meta["platform_metadata"]["platform"]
+            }
         
         # Default actor/source for demo
         if not actor:
@@ -1397,12 +411,10 @@ async def create_run(request: CreateRunRequest):
         "meta": meta
     }
     
-    supabase.table("runs").insert(run_data).execute()
-    
-    # Insert events
     events_data = []
     for seq, event in enumerate(result["events"], start=1):
         events_data.append({
+            "id": str(uuid.uuid4()),
             "run_id": run_id,
             "ts": created_at,
             "seq": seq,
@@ -1410,9 +422,11 @@ async def create_run(request: CreateRunRequest):
             "payload": event["payload"]
         })
     
-    if events_data:
-        supabase.table("run_events").insert(events_data).execute()
-    
+    return (run_data, events_data)
+
+
+def build_run_response(run_id: str, result: dict) -> CreateRunResponse:
+    """Build the API response for an evaluated run"""
     return CreateRunResponse(
         run_id=run_id,
         verdict=result["verdict"],
@@ -1423,20 +437,482 @@ async def create_run(request: CreateRunRequest):
     )
 
 
+async def insert_run_records(run_data, events_data: list, idempotent: bool = False):
+    """
+    Insert run row(s) and their events.
+
+    With atomic writes, create_run_with_events / create_runs_with_events insert
+    runs and events in one transaction and one round trip, skipping runs that
+    already exist. Otherwise runs are inserted first, then the events that
+    reference them.
+
+    Args:
+        run_data: One run row, or a list of rows for a bulk insert
+        events_data: Event rows for those runs
+        idempotent: Skip rows whose id already exists, so a retried write is harmless
+    """
+    global atomic_run_writes
+    if atomic_run_writes:
+        try:
+            if isinstance(run_data, list):
+                await db.execute(supabase.rpc("create_runs_with_events", {"p_runs": run_data, "p_events": events_data}))
+            else:
+                await db.execute(supabase.rpc("create_run_with_events", {"p_run": run_data, "p_events": events_data}))
+            return
+        except APIError as e:
+            if e.code != "PGRST202":  # function not found: migration 008 has not been applied
+                raise
+            atomic_run_writes = False
+            print("[PERSIST] create_run_with_events not found (apply migration 008); using per-table inserts")
+    if idempotent:
+        await db.execute(supabase.table("runs").upsert(run_data, on_conflict="id", ignore_duplicates=True))
+        if events_data:
+            await db.execute(supabase.table("run_events").upsert(events_data, on_conflict="id", ignore_duplicates=True))
+        return
+    await db.execute(supabase.table("runs").insert(run_data))
+    if events_data:
+        await db.execute(supabase.table("run_events").insert(events_data))
+
+
+# Optional write-behind mode: runs are persisted by a background task after the response
+write_behind = WriteBehindQueue(
+    lambda runs, events: insert_run_records(runs, events, idempotent=True),
+    spool_path=os.getenv("WRITE_BEHIND_SPOOL_PATH", "write_behind_spool.jsonl"),
+    max_queued=int(os.getenv("WRITE_BEHIND_MAX_QUEUED", "10000")),
+    batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "0.2")),
+    fsync=os.getenv("WRITE_BEHIND_FSYNC", "false").lower() == "true",
+) if os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true" else None
+
+
+async def persist_run_records(run_data, events_data: list):
+    """
+    Persist run row(s) and their events: queued for the background writer in
+    write-behind mode (falling back to a direct write when its queue is full),
+    otherwise inserted before returning. The runs are then cached, so the first
+    read (or conditional read) of a new run does not go to Supabase.
+
+    Args:
+        run_data: One run row, or a list of rows
+        events_data: Event rows for those runs
+    """
+    runs = run_data if isinstance(run_data, list) else [run_data]
+    queued = False
+    if write_behind is not None:
+        try:
+            write_behind.submit(runs, events_data)
+            queued = True
+        except WriteBehindFull as e:
+            print(f"[WRITE_BEHIND] {e}; writing directly")
+    if not queued:
+        await insert_run_records(run_data, events_data)
+    
+    events_by_run = {run["id"]: [] for run in runs}
+    for event in events_data:
+        events_by_run[event["run_id"]].append(event)
+    for run in runs:
+        # Skip serializing runs whose content alone exceeds the cache budget
+        if len(run["input_content"]) <= run_cache.max_bytes:
+            run_cache.put(run["id"], run, events_by_run[run["id"]])
+
+
+async def load_run(run_id: str) -> tuple:
+    """
+    Load a run and its events: from the run cache, else in one round trip from
+    Supabase (runs with embedded run_events, then cached), else from the
+    write-behind queue.
+
+    Returns:
+        (run row, event rows ordered by seq, ETag), or (None, [], None) if the run does not exist.
+        Runs still waiting in the write-behind queue have no ETag.
+    """
+    cached = run_cache.get(run_id)
+    if cached is not None:
+        return cached.run, cached.events, cached.etag
+    result = await db.execute(supabase.table("runs").select("*, run_events(*)").eq("id", run_id))
+    if not result.data:
+        run_data, events_data = lookup_queued_run(run_id)
+        return run_data, events_data, None
+    run_data = dict(result.data[0])
+    # Embedded rows come back in no guaranteed order
+    events_data = sorted(run_data.pop("run_events") or [], key=lambda e: e["seq"])
+    return run_data, events_data, run_cache.put(run_id, run_data, events_data).etag
+
+
+def set_cache_headers(response: Response, etag: Optional[str], cache_control: str):
+    """Set validators for a run read; runs not yet persisted must not be cached by clients"""
+    if etag is None:
+        response.headers["Cache-Control"] = "no-store"
+        return
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def lookup_queued_run(run_id: str) -> tuple:
+    """Return (run, events) for a run still waiting in the write-behind queue, or (None, [])"""
+    queued = write_behind.lookup(run_id) if write_behind is not None else None
+    return queued or (None, [])
+
+
+@app.post("/v1/runs", response_model=CreateRunResponse)
+async def create_run(request: CreateRunRequest):
+    """Create a new run and generate stub results"""
+    copilot = validate_run_request(request)
+    
+    run_id = str(uuid.uuid4())
+    created_at = run_timestamp()
+    policy_pack_version = "v1"
+    
+    # Generate demo results against the cached policy pack
+    result = await evaluate_run_request(request, await get_policy_pack(policy_pack_version), copilot)
+    
+    # Insert run and events
+    run_data, events_data = build_run_records(request, result, run_id, created_at, copilot)
+    await persist_run_records(run_data, events_data)
+    
+    return build_run_response(run_id, result)
+
+
+@app.post("/v1/runs:batch", response_model=CreateRunBatchResponse)
+async def create_runs_batch(request: CreateRunBatchRequest):
+    """
+    Create many runs in one request.
+    All items are evaluated against one snapshot of the policy pack (large items
+    concurrently in the worker pool) and persisted with one bulk insert per table.
+    Results are returned in request order.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(request.items) > runs_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch contains {len(request.items)} items; the maximum is {runs_batch_max_items}"
+        )
+    envelopes = []
+    for index, item in enumerate(request.items):
+        try:
+            envelopes.append(validate_run_request(item))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"items[{index}]: {e.detail}")
+    
+    created_at = run_timestamp()
+    policy_pack_version = "v1"
+    pack = await get_policy_pack(policy_pack_version)
+    
+    results = await asyncio.gather(*(
+        evaluate_run_request(item, pack, copilot) for item, copilot in zip(request.items, envelopes)
+    ))
+    
+    run_ids = [str(uuid.uuid4()) for _ in request.items]
+    runs_data = []
+    events_data = []
+    for run_id, item, result, copilot in zip(run_ids, request.items, results, envelopes):
+        run_data, run_events = build_run_records(item, result, run_id, created_at, copilot)
+        runs_data.append(run_data)
+        events_data.extend(run_events)
+    
+    await persist_run_records(runs_data, events_data)
+    
+    return CreateRunBatchResponse(
+        results=[build_run_response(run_id, result) for run_id, result in zip(run_ids, results)]
+    )
+
+
+async def spool_upload_request(request: Request) -> str:
+    """
+    Spool a multipart (field "file") or raw upload body to a temporary file.
+
+    Returns:
+        Path of the temporary file (the caller removes it)
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > upload_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the maximum of {upload_max_bytes} bytes")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        # Parse the form from a size-limited body, so an oversized upload is rejected while it arrives
+        body = limit_body(request.stream(), upload_max_bytes + MULTIPART_OVERHEAD_BYTES)
+        try:
+            form = await MultiPartParser(request.headers, body, max_files=1).parse()
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        try:
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=400, detail="multipart upload must include a 'file' field")
+            
+            async def file_chunks():
+                while chunk := await upload.read(1024 * 1024):
+                    yield chunk
+            
+            return await spool_to_tempfile(file_chunks(), upload_max_bytes)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            await form.close()
+    if content_type not in ("application/octet-stream", "text/plain"):
+        raise HTTPException(
+            status_code=415,
+            detail="Upload must be multipart/form-data, application/octet-stream or text/plain"
+        )
+    try:
+        return await spool_to_tempfile(request.stream(), upload_max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.post("/v1/runs:upload", response_model=CreateRunResponse)
+async def create_run_upload(request: Request, input_type: str = Query("file", pattern="^(chat|file|code)$")):
+    """
+    Create a run from an uploaded document without a JSON round trip.
+
+    Accepts multipart/form-data (field "file") or a raw application/octet-stream /
+    text body containing UTF-8 text. The body is spooled to a temporary file and
+    read through a memory-mapped buffer; it is evaluated with the same policy engine as
+    POST /v1/runs, so annotation offsets are character offsets into the decoded text.
+    The file is decoded off the event loop: large files are evaluated in a worker that maps
+    and decodes the file itself, while the text for the run record is decoded concurrently.
+    """
+    path = await spool_upload_request(request)
+    try:
+        run_id = str(uuid.uuid4())
+        created_at = run_timestamp()
+        policy_pack_version = "v1"
+        pack = await get_policy_pack(policy_pack_version)
+        
+        try:
+            # A UTF-8 file has at most as many characters as bytes, so its size bounds the text length
+            if evaluation_pool.should_offload_size(os.path.getsize(path)):
+                outcomes = await asyncio.gather(
+                    asyncio.to_thread(read_spooled_text, path),
+                    evaluation_pool.run_with_pack(evaluate_upload_in_worker, pack, input_type, path),
+                    return_exceptions=True,
+                )
+                for outcome in outcomes:
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                input_content, result = outcomes
+            else:
+                input_content = await asyncio.to_thread(read_spooled_text, path)
+                result = generate_demo_run(input_type, input_content, None, policy_pack_version, pack=pack)
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Upload must be UTF-8 text: {str(e)}")
+    finally:
+        os.unlink(path)
+    
+    print(f"[UPLOAD] run_id={run_id} input_type={input_type} chars={len(input_content)} verdict={result['verdict']}")
+    run_request = CreateRunRequest(input_type=input_type, input_content=input_content)
+    run_data, events_data = build_run_records(run_request, result, run_id, created_at)
+    await persist_run_records(run_data, events_data)
+    
+    return build_run_response(run_id, result)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while responding.
+    The default disconnect listener would consume (and drop) request body messages;
+    a client disconnect surfaces as ClientDisconnect from request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/v1/runs:stream")
+async def create_run_stream(request: Request, input_type: str = Query("chat", pattern="^(chat|file|code)$")):
+    """
+    Evaluate a streamed request body (e.g. an LLM completion piped through the gateway)
+    and stream governed output back as NDJSON while the input is still arriving.
+
+    Emits {"type": "chunk", "offset", "governed", "annotations"} lines as soon as each
+    part of the text is final, and one {"type": "final", "run_id", "verdict", "user_message",
+    "aborted"} line at the end. The stream is aborted as soon as a BLOCK or REVIEW policy
+    matches; the final line then carries the replacement governed_output.
+    It is also aborted (fail closed) when a possible match runs longer than
+    STREAM_MAX_CARRY_CHARS, since text held back for it could otherwise only be released
+    unscanned; the text received so far is then evaluated as a whole for the final line.
+    The run is persisted like POST /v1/runs once the stream ends.
+    """
+    policy_pack_version = "v1"
+    pack = await get_policy_pack(policy_pack_version)
+    applicable_policies = pack.policies_for(input_type)
+    scanner = StreamScanner(
+        pack, applicable_policies, match_keywords=input_type == "chat", max_carry_chars=stream_max_carry_chars or None
+    )
+    
+    def ndjson(payload: dict) -> str:
+        return json.dumps(payload) + "\n"
+    
+    def chunk_line(segment) -> str:
+        return ndjson({
+            "type": "chunk",
+            "offset": segment.start,
+            "governed": build_redacted_output(segment.text, segment.relative_matches()),
+            "annotations": [
+                Annotation(span=value_span, policy_name=policy, action=action, start=value_start, end=value_end).dict()
+                for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in segment.matches
+            ],
+        })
+    
+    async def input_texts():
+        # Decode the body incrementally (multi-byte characters may span chunks); None marks the end
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for raw in request.stream():
+            yield decoder.decode(raw)
+        yield decoder.decode(b"", final=True)
+        yield None
+    
+    async def governed_stream():
+        received = []
+        aborted = False
+        async for text in input_texts():
+            if text is None:
+                segments, found = scanner.finish()
+            elif text:
+                received.append(text)
+                segments, found = scanner.feed(text)
+            else:
+                continue
+            # BLOCK/REVIEW outcomes are certain as soon as such a match is found - stop releasing text
+            # A match attempt was given up on: its segment would leak unscanned text, so stop here
+            if scanner.abandoned or any(match[7] in ("BLOCK", "REVIEW") for match in found):
+                aborted = True
+                break
+            for segment in segments:
+                yield chunk_line(segment)
+        
+        # Persist the run from everything that was received and matched
+        input_content = "".join(received)
+        run_request = CreateRunRequest(input_type=input_type, input_content=input_content)
+        if scanner.abandoned:
+            print(f"[STREAM] match attempt longer than {stream_max_carry_chars} chars; evaluating {len(input_content)} received chars as a whole")
+            result = await evaluate_run_request(run_request, pack)
+        else:
+            matches = resolve_overlaps(scanner.resolved + scanner.unreleased_matches(), input_content)
+            evaluated_policies = [p["name"] for p in applicable_policies]
+            result = summarize_text_evaluation(input_content, matches, evaluated_policies, applicable_policies)
+        run_id = str(uuid.uuid4())
+        created_at = run_timestamp()
+        run_data, events_data = build_run_records(run_request, result, run_id, created_at)
+        await persist_run_records(run_data, events_data)
+        
+        final = {
+            "type": "final",
+            "run_id": run_id,
+            "verdict": result["verdict"],
+            "user_message": result["user_message"],
+            "aborted": aborted,
+        }
+        if aborted:
+            final["governed_output"] = result["governed_output"]
+        yield ndjson(final)
+    
+    return DuplexStreamingResponse(governed_stream(), media_type="application/x-ndjson")
+
+
+async def process_run_job(job: Job) -> str:
+    """
+    Evaluate and persist the run for a queued job.
+
+    Returns:
+        The id of the persisted run
+    """
+    request, copilot = job.payload
+    pack = await get_policy_pack("v1")
+    job.progress = 0.1
+    result = await evaluate_run_request(request, pack, copilot)
+    
+    # Past this point the job can no longer be cancelled, so it never leaves a partial run behind
+    job.cancellable = False
+    job.progress = 0.9
+    run_id = str(uuid.uuid4())
+    created_at = run_timestamp()
+    run_data, events_data = build_run_records(request, result, run_id, created_at, copilot)
+    await persist_run_records(run_data, events_data)
+    print(f"[JOBS] job {job.id} persisted run_id={run_id} verdict={result['verdict']}")
+    return run_id
+
+
+# Background evaluation jobs (POST /v1/jobs)
+job_queue = JobQueue(
+    process_run_job,
+    max_queued=int(os.getenv("JOBS_MAX_QUEUED", "100")),
+    concurrency=int(os.getenv("JOBS_CONCURRENCY", "2")),
+    retain=int(os.getenv("JOBS_RETAIN", "1000")),
+)
+
+
+def build_job_status(job: Job) -> JobStatusResponse:
+    """Build the API response describing a job"""
+    def iso(ts: Optional[float]) -> Optional[str]:
+        return datetime.utcfromtimestamp(ts).isoformat() if ts is not None else None
+    
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        run_id=job.result,
+        error=job.error,
+        created_at=iso(job.created_at),
+        started_at=iso(job.started_at),
+        finished_at=iso(job.finished_at),
+    )
+
+
+@app.post("/v1/jobs", response_model=CreateJobResponse, status_code=202)
+async def create_job(request: CreateRunRequest):
+    """
+    Queue a run for background evaluation and return a job id immediately.
+    Poll GET /v1/jobs/{job_id} for status, progress and the resulting run_id.
+    """
+    copilot = validate_run_request(request)
+    try:
+        job = job_queue.submit((request, copilot))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return CreateJobResponse(job_id=job.id, status=job.status)
+
+
+@app.get("/v1/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Get the status, progress and (once succeeded) run_id of a job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return build_job_status(job)
+
+
+@app.delete("/v1/jobs/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job (finished jobs are returned unchanged)"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return build_job_status(job)
+
+
 @app.get("/v1/runs/{run_id}", response_model=GetRunResponse)
-async def get_run(run_id: str):
-    """Get run details with events and annotations"""
-    # Fetch run
-    run_result = supabase.table("runs").select("*").eq("id", run_id).execute()
-    if not run_result.data:
+async def get_run(run_id: str, request: Request, response: Response):
+    """
+    Get run details with events and annotations.
+    Responses carry a strong ETag; a matching If-None-Match gets 304 (from memory for cached runs).
+    """
+    # Fetch run with its events
+    run_data, events_data, etag = await load_run(run_id)
+    if run_data is None:
         raise HTTPException(status_code=404, detail="Run not found")
+    if etag is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": RUN_CACHE_CONTROL})
+    set_cache_headers(response, etag, RUN_CACHE_CONTROL)
     
-    run_data = run_result.data[0]
     run = Run(**run_data)
-    
-    # Fetch events
-    events_result = supabase.table("run_events").select("*").eq("run_id", run_id).order("seq").execute()
-    events = [RunEvent(**e) for e in events_result.data]
+    events = [RunEvent(**e) for e in events_data]
     
     # Load stored annotations from run.meta (immutability)
     meta = run.meta or {}
@@ -1448,22 +924,31 @@ async def get_run(run_id: str):
 
 
 @app.get("/v1/runs/{run_id}/export", response_model=ExportResponse)
-async def export_run(run_id: str):
-    """Export full run data with policy snapshot"""
-    # Get run and events
-    run_result = supabase.table("runs").select("*").eq("id", run_id).execute()
-    if not run_result.data:
+async def export_run(run_id: str, request: Request, response: Response):
+    """
+    Export full run data with policy snapshot.
+    The snapshot reads the whole policies table (disabled policies included, unlike the
+    evaluation pack); the ETag covers the run and those rows, so clients revalidate after
+    any policy change.
+    """
+    # Get run with its events
+    run_data, events_data, run_etag = await load_run(run_id)
+    if run_data is None:
         raise HTTPException(status_code=404, detail="Run not found")
+    policies_result = await db.execute(supabase.table("policies").select("*"))
+    policies_json = json.dumps(policies_result.data, sort_keys=True, default=str)
+    etag = make_etag("export", run_etag, policies_json) if run_etag is not None else None
+    if etag is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": EXPORT_CACHE_CONTROL})
+    set_cache_headers(response, etag, EXPORT_CACHE_CONTROL)
     
-    run_data = run_result.data[0]
     run = Run(**run_data)
     # Load stored annotations from run.meta
     meta = run.meta or {}
     annotations = meta.get("annotations", [])
 
     
-    events_result = supabase.table("run_events").select("*").eq("run_id", run_id).order("seq").execute()
-    events = [RunEvent(**e) for e in events_result.data]
+    events = [RunEvent(**e) for e in events_data]
     
     # Extract evaluated policy names from events
     evaluated_policy_names = set()
@@ -1473,7 +958,6 @@ async def export_run(run_id: str):
             evaluated_policy_names.update(policy_list)
     
     # Get all policies, but filter to only those that were actually evaluated
-    policies_result = supabase.table("policies").select("*").execute()
     all_policies = [Policy(**p) for p in policies_result.data]
     
     # Filter to only policies that were evaluated (match by name)
@@ -1496,35 +980,20 @@ async def export_run(run_id: str):
     
     # Extract platform metadata for copilot runs to distinguish from API/portal-based AI usage
     if run.input_type == "copilot":
-        try:
-            copilot_data = json.loads(run.input_content)
-            platform_metadata = {
-                "platform": copilot_data.get("platform", "Unknown"),
-                "workload": copilot_data.get("workload", None),
-                "sensitivity_label": copilot_data.get("sensitivity_label", None),
-                "user": {
-                    "id": copilot_data.get("user", {}).get("id", None),
-                    "email": copilot_data.get("user", {}).get("email", None),
-                    "department": copilot_data.get("user", {}).get("department", None),
-                    "role": copilot_data.get("user", {}).get("role", None),
-                },
-                "action_type": copilot_data.get("action", {}).get("type", None),
-                "compliance_flags": copilot_data.get("compliance_flags", []),
-                "action_context": {
-                    "conversation_id": copilot_data.get("action", {}).get("context", {}).get("conversation_id", None),
-                    "topic": copilot_data.get("action", {}).get("context", {}).get("topic", None),
-                } if copilot_data.get("action", {}).get("context") else None
-            }
-            siem_payload["platform_metadata"] = platform_metadata
-            # Add source field to clearly distinguish Copilot activity
-            siem_payload["source"] = "copilot"
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            # If JSON parsing fails, still mark as copilot but without detailed metadata
-            siem_payload["source"] = "copilot"
-            siem_payload["platform_metadata"] = {
-                "error": "Failed to parse copilot metadata",
-                "error_details": str(e)
-            }
+        # Stored at creation time; runs created before it was persisted are parsed here
+        platform_metadata = meta.get("platform_metadata")
+        if platform_metadata is None:
+            try:
+                platform_metadata = copilot_platform_metadata(parse_copilot_payload(run.input_content))
+            except ValidationError as e:
+                # If parsing fails, still mark as copilot but without detailed metadata
+                platform_metadata = {
+                    "error": "Failed to parse copilot metadata",
+                    "error_details": describe_payload_error(e)
+                }
+        siem_payload["platform_metadata"] = platform_metadata
+        # Add source field to clearly distinguish Copilot activity
+        siem_payload["source"] = "copilot"
     
     return ExportResponse(
         run=run,
@@ -1550,20 +1019,78 @@ class InvestigateRunListItem(BaseModel):
 
 class GetInvestigateRunsResponse(BaseModel):
     runs: List[InvestigateRunListItem]
+    next_cursor: Optional[str] = None
+
+
+# Page size limits for GET /v1/investigate/runs
+INVESTIGATE_DEFAULT_LIMIT = 50
+INVESTIGATE_MAX_LIMIT = 200
+INVESTIGATE_VERDICTS = ("BLOCKED", "HELD_FOR_REVIEW")
+
+
+def encode_investigate_cursor(row: dict) -> str:
+    """Encode the (created_at, id) position of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps([row["created_at"], row["id"]]).encode("utf-8")).decode("ascii")
+
+
+def decode_investigate_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor from encode_investigate_cursor into (created_at, id).
+    Both values are parsed and re-serialized, so a client-made cursor cannot inject PostgREST filter syntax.
+    """
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(run_id))
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @app.get("/v1/investigate/runs", response_model=GetInvestigateRunsResponse)
-async def get_investigate_runs():
-    """Get high-signal runs (BLOCKED and HELD_FOR_REVIEW) for investigation"""
-    from datetime import datetime, timedelta
+async def get_investigate_runs(
+    verdict: Optional[List[str]] = Query(None),
+    input_type: Optional[str] = Query(None, pattern="^(chat|file|code|copilot)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    actor: Optional[str] = None,
+    limit: int = Query(INVESTIGATE_DEFAULT_LIMIT, ge=1, le=INVESTIGATE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Get high-signal runs (BLOCKED and HELD_FOR_REVIEW) for investigation, newest first.
+
+    Pages are keyset-paginated on (created_at, id): pass next_cursor from the previous
+    page as cursor to continue. Optional filters: verdict (repeatable), input_type,
+    since/until (created_at range, until exclusive) and actor (meta.actor.id).
+    Items carry a slim meta with only actor and source; annotations are left out.
+    """
+    verdicts = verdict or list(INVESTIGATE_VERDICTS)
+    invalid = [v for v in verdicts if v not in INVESTIGATE_VERDICTS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"verdict must be one of {', '.join(INVESTIGATE_VERDICTS)}")
+    
+    # Slim projection: only the meta fields the list shows
+    query = supabase.table("runs").select(
+        "id, created_at, verdict, input_type, input_preview, policy_pack_version, actor:meta->actor, source:meta->source"
+    ).in_("verdict", verdicts)
+    if input_type:
+        query = query.eq("input_type", input_type)
+    if since:
+        query = query.gte("created_at", since.isoformat())
+    if until:
+        query = query.lt("created_at", until.isoformat())
+    if actor:
+        query = query.eq("meta->actor->>id", actor)
+    if cursor:
+        # Rows strictly after the cursor in (created_at DESC, id DESC) order
+        cursor_created_at, cursor_id = decode_investigate_cursor(cursor)
+        query = query.or_(f'created_at.lt."{cursor_created_at}",and(created_at.eq."{cursor_created_at}",id.lt.{cursor_id})')
     
-    # Query runs with BLOCKED or HELD_FOR_REVIEW verdict, sorted by newest first
-    result = supabase.table("runs").select(
-        "id, created_at, verdict, input_type, input_preview, policy_pack_version, meta"
-    ).in_("verdict", ["BLOCKED", "HELD_FOR_REVIEW"]).order("created_at", desc=True).execute()
+    # One extra row tells whether another page follows
+    result = await db.execute(query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1))
+    rows = result.data[:limit]
     
     runs = []
-    for r in result.data:
+    for r in rows:
         runs.append(InvestigateRunListItem(
             id=r["id"],
             created_at=r["created_at"],
@@ -1571,10 +1098,11 @@ async def get_investigate_runs():
             input_type=r["input_type"],
             input_preview=r.get("input_preview"),
             policy_pack_version=r["policy_pack_version"],
-            meta=r.get("meta") or {}
+            meta={"actor": r.get("actor"), "source": r.get("source")}
         ))
     
-    return GetInvestigateRunsResponse(runs=runs)
+    next_cursor = encode_investigate_cursor(rows[-1]) if len(result.data) > limit else None
+    return GetInvestigateRunsResponse(runs=runs, next_cursor=next_cursor)
 
 
 class ExceptionsCountResponse(BaseModel):
@@ -1585,7 +1113,7 @@ class ExceptionsCountResponse(BaseModel):
 async def get_exceptions_count():
     """Get count of runs requiring investigation (BLOCKED or HELD_FOR_REVIEW)"""
     # Use count query for efficiency
-    result = supabase.table("runs").select("id", count="exact").in_("verdict", ["BLOCKED", "HELD_FOR_REVIEW"]).execute()
+    result = await db.execute(supabase.table("runs").select("id", count="exact").in_("verdict", ["BLOCKED", "HELD_FOR_REVIEW"]))
     # Supabase returns count in the response
     count = getattr(result, 'count', len(result.data) if result.data else 0)
     return ExceptionsCountResponse(count=count)
@@ -1602,7 +1130,7 @@ async def get_similar_runs_count(run_id: str):
     from datetime import datetime, timedelta
     
     # Get the run to check its verdict and metadata
-    run_result = supabase.table("runs").select("*").eq("id", run_id).execute()
+    run_result = await db.execute(supabase.table("runs").select("*").eq("id", run_id))
     if not run_result.data:
         raise HTTPException(status_code=404, detail="Run not found")
     
@@ -1617,7 +1145,7 @@ async def get_similar_runs_count(run_id: str):
     thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).isoformat()
     
     # Query for BLOCKED runs in last 30 days
-    result = supabase.table("runs").select("id, meta").eq("verdict", "BLOCKED").gte("created_at", thirty_days_ago).execute()
+    result = await db.execute(supabase.table("runs").select("id, meta").eq("verdict", "BLOCKED").gte("created_at", thirty_days_ago))
     
     total_count = len(result.data)
     
@@ -1657,7 +1185,7 @@ async def get_similar_runs_count(run_id: str):
 @app.get("/v1/policies", response_model=GetPoliciesResponse)
 async def get_policies():
     """Get all policies"""
-    policies_result = supabase.table("policies").select("*").execute()
+    policies_result = await db.execute(supabase.table("policies").select("*"))
     policies = [Policy(**p) for p in policies_result.data]
     
     return GetPoliciesResponse(
@@ -1737,11 +1265,26 @@ async def get_insights():
 @app.get("/v1/debug/policy-pack")
 async def debug_policy_pack(policy_pack_version: str = "v1"):
     """Debug endpoint to show exact policy pack used for evaluation"""
-    policies = load_policies(policy_pack_version)
+    pack = await get_policy_pack(policy_pack_version)
+    policies = pack.policies
     
     # Format for debugging
     debug_info = {
         "policy_pack_version": policy_pack_version,
+        "fingerprint": pack.fingerprint,
+        "content_hash": pack.content_hash,
+        "cache": policy_pack_cache.status(),
+        "stats": policy_stats.status(),
+        "evaluation_pool": evaluation_pool.status(),
+        "result_cache": result_cache.status(),
+        "jobs": job_queue.status(),
+        "supabase_queries": db.status(),
+        "write_behind": write_behind.status() if write_behind is not None else None,
+        "run_cache": run_cache.status(),
+        "policies_by_input_type": {
+            input_type: [p["name"] for p in pack.policies_for(input_type)] for input_type in INPUT_TYPES
+        },
+        "block_evaluation_order": [p["name"] for p in policy_stats.order([p for p in policies if p["action"] == "BLOCK"])],
         "policies": []
     }
     
@@ -1756,11 +1299,29 @@ async def debug_policy_pack(policy_pack_version: str = "v1"):
             "conditions": policy["conditions"],
             "patterns": policy["conditions"].get("patterns", []),
             "keywords": policy["conditions"].get("keywords", []),
+            "stats": policy_stats.policy_summary(policy["id"]),
         })
     
     return debug_info
 
 
+@app.on_event("startup")
+async def start_write_behind():
+    """Replay spooled runs and start the write-behind flusher (write-behind mode only)"""
+    if write_behind is not None:
+        await write_behind.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop background job workers, flush queued runs, then stop evaluation pool workers and Supabase query threads"""
+    await job_queue.shutdown()
+    if write_behind is not None:
+        await write_behind.shutdown()
+    evaluation_pool.shutdown()
+    db.shutdown()
+
+
 @app.get("/health")
 async def health():
     """Health check"""
@@ -0,0 +1,158 @@
+"""
+Process-wide cache of compiled policy packs.
+
+Entries are keyed by policy_pack_version and revalidated against a cheap
+fingerprint of the policies table (row count, enabled count, latest updated_at
+and a digest of every row's id/status/version/updated_at)
+instead of re-reading every policy on each run:
+- Fresh (age < ttl): served from memory
+- Stale (age < ttl + stale): served from memory, revalidated in the background
+- Expired: revalidated synchronously; if Supabase is unavailable the last
+  known pack is served (stale-if-error) rather than failing the evaluation
+
+get() may block on Supabase. Async callers try get_cached() first (never
+blocks) and only run get() off the event loop when it returns None.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from policy_engine import CompiledPolicyPack
+
+
+class _CacheEntry:
+    def __init__(self, pack: CompiledPolicyPack, fingerprint: Any):
+        self.pack = pack
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        self.refreshing = False
+
+
+class PolicyPackCache:
+    """
+    Cache of CompiledPolicyPack instances with version-based invalidation.
+
+    Args:
+        load_policies: Callable returning the list of enabled policies for a pack version
+        probe_fingerprint: Callable returning a cheap fingerprint of the policies table
+        ttl_seconds: How long an entry is served without revalidation
+        stale_seconds: How long past the TTL an entry may be served while revalidating in the background
+    """
+
+    def __init__(
+        self,
+        load_policies: Callable[[str], list],
+        probe_fingerprint: Callable[[str], Any],
+        ttl_seconds: float = 30.0,
+        stale_seconds: float = 300.0,
+    ):
+        self._load_policies = load_policies
+        self._probe_fingerprint = probe_fingerprint
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "revalidations": 0, "reloads": 0, "errors": 0}
+
+    def get_cached(self, policy_pack_version: str = "v1") -> Optional[CompiledPolicyPack]:
+        """
+        Get a fresh or stale pack from memory without blocking (a stale pack is refreshed in the background).
+
+        Returns:
+            The cached pack, or None if it is missing or expired and get() must revalidate it
+        """
+        with self._lock:
+            entry = self._entries.get(policy_pack_version)
+            if entry is not None:
+                age = time.monotonic() - entry.checked_at
+                if age < self.ttl_seconds:
+                    self.stats["hits"] += 1
+                    return entry.pack
+                if age < self.ttl_seconds + self.stale_seconds:
+                    # Stale-while-revalidate: serve the current pack, refresh in the background
+                    self.stats["stale_hits"] += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(
+                            target=self._refresh_in_background,
+                            args=(policy_pack_version,),
+                            daemon=True,
+                        ).start()
+                    return entry.pack
+        return None
+
+    def get(self, policy_pack_version: str = "v1") -> CompiledPolicyPack:
+        """Get the compiled policy pack for a version, loading or revalidating as needed"""
+        pack = self.get_cached(policy_pack_version)
+        if pack is not None:
+            return pack
+        with self._lock:
+            entry = self._entries.get(policy_pack_version)
+
+        try:
+            return self._revalidate(policy_pack_version)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            if entry is None:
+                raise
+            # Stale-if-error: keep evaluating with the last known pack
+            print(f"[POLICY_CACHE] revalidation failed for '{policy_pack_version}', serving stale pack: {e}")
+            return entry.pack
+
+    def invalidate(self, policy_pack_version: Optional[str] = None):
+        """Drop cached packs so the next get() reloads from Supabase"""
+        with self._lock:
+            if policy_pack_version is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(policy_pack_version, None)
+
+    def status(self) -> dict:
+        """Describe cached entries for debugging"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "stats": dict(self.stats),
+                "entries": {
+                    version: {
+                        "fingerprint": entry.fingerprint,
+                        "policies": len(entry.pack.policies),
+                        "age_seconds": round(now - entry.checked_at, 3),
+                    }
+                    for version, entry in self._entries.items()
+                },
+            }
+
+    def _refresh_in_background(self, policy_pack_version: str):
+        try:
+            self._revalidate(policy_pack_version)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            print(f"[POLICY_CACHE] background revalidation failed for '{policy_pack_version}': {e}")
+        finally:
+            with self._lock:
+                entry = self._entries.get(policy_pack_version)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def _revalidate(self, policy_pack_version: str) -> CompiledPolicyPack:
+        fingerprint = self._probe_fingerprint(policy_pack_version)
+        with self._lock:
+            self.stats["revalidations"] += 1
+            entry = self._entries.get(policy_pack_version)
+            if entry is not None and entry.fingerprint == fingerprint:
+                entry.checked_at = time.monotonic()
+                return entry.pack
+
+        # Policies changed (or first load) - reload and compile outside the lock
+        policies = self._load_policies(policy_pack_version)
+        pack = CompiledPolicyPack(policy_pack_version, policies, fingerprint)
+        print(f"[POLICY_CACHE] loaded policy pack '{policy_pack_version}': {len(policies)} policies, fingerprint={fingerprint}")
+        with self._lock:
+            self.stats["reloads"] += 1
+            self._entries[policy_pack_version] = _CacheEntry(pack, fingerprint)
+        return pack
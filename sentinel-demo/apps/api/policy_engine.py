@@ -0,0 +1,813 @@
+"""
+Compiled policy pack for the Sentinel policy engine.
+Policies are loaded from Supabase once per pack version and compiled here so
+that request-time evaluation never re-parses conditions or regex patterns.
+"""
+import hashlib
+import heapq
+import json
+import re
+import time
+from array import array
+from collections import deque
+from typing import Any, Iterator, List, Optional, Tuple, Pattern
+from verdict_mapping import ACTION_PRIORITY
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+    import sre_constants
+
+# Input types runs are evaluated for; each gets a precomputed policy list and matchers
+INPUT_TYPES = ("chat", "file", "code", "copilot")
+
+def max_match_width(regex: Pattern) -> Optional[int]:
+    """Longest possible match of a pattern in characters, or None if unbounded"""
+    try:
+        width = sre_parse.parse(regex.pattern, regex.flags).getwidth()[1]
+    except Exception:
+        return None
+    return width if width < sre_constants.MAXREPEAT else None
+
+
+_CATEGORY_SOURCE = {
+    sre_constants.CATEGORY_DIGIT: "\\d", sre_constants.CATEGORY_NOT_DIGIT: "\\D",
+    sre_constants.CATEGORY_SPACE: "\\s", sre_constants.CATEGORY_NOT_SPACE: "\\S",
+    sre_constants.CATEGORY_WORD: "\\w", sre_constants.CATEGORY_NOT_WORD: "\\W",
+}
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.ASCII, "a"))
+_ANY_TEXT = "(?s:.)*"
+
+
+def _class_source(items) -> str:
+    parts = []
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            parts.insert(0, "^")
+        elif op is sre_constants.LITERAL:
+            parts.append(re.escape(chr(av)))
+        elif op is sre_constants.RANGE:
+            parts.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op is sre_constants.CATEGORY:
+            parts.append(_CATEGORY_SOURCE[av])
+        else:
+            raise ValueError(f"unsupported class item {op}")
+    return "[" + "".join(parts) + "]"
+
+
+def _full_source(items) -> str:
+    """Regex for the text a parsed sub-pattern consumes, with assertions treated as always true (a superset)"""
+    out = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            out.append(re.escape(chr(av)))
+        elif op is sre_constants.NOT_LITERAL:
+            out.append(f"[^{re.escape(chr(av))}]")
+        elif op is sre_constants.ANY:
+            out.append(".")
+        elif op is sre_constants.IN:
+            out.append(_class_source(av))
+        elif op is sre_constants.BRANCH:
+            out.append("(?:" + "|".join(_full_source(branch) for branch in av[1]) + ")")
+        elif op is sre_constants.SUBPATTERN:
+            out.append(_with_flags(av[1], av[2], _full_source(av[3])))
+        elif op is sre_constants.ATOMIC_GROUP:
+            out.append(f"(?:{_full_source(av)})")
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT):
+            low, high, body = av
+            upper = "" if high == sre_constants.MAXREPEAT else str(high)
+            out.append(f"(?:{_full_source(body)}){{{low},{upper}}}")
+        elif op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue
+        elif op is sre_constants.GROUPREF:
+            out.append(_ANY_TEXT)
+        elif op is sre_constants.GROUPREF_EXISTS:
+            out.append(f"(?:{_full_source(av[1])}|{_full_source(av[2] or [])})")
+        else:
+            raise ValueError(f"unsupported opcode {op}")
+    return "".join(out)
+
+
+def _with_flags(add_flags: int, del_flags: int, source: str) -> str:
+    added = "".join(letter for flag, letter in _INLINE_FLAGS if add_flags & flag)
+    removed = "".join(letter for flag, letter in _INLINE_FLAGS if del_flags & flag and flag != re.ASCII)
+    if not added and not removed:
+        return f"(?:{source})"
+    return f"(?{added}{'-' + removed if removed else ''}:{source})"
+
+
+def _prefix_source(items) -> str:
+    """
+    Regex for every text a match attempt of a parsed sub-pattern can have consumed (or peeked
+    at with a lookahead) when the input ends: the prefixes of its matches, as a superset.
+    """
+    if not items:
+        return ""
+    op, av = items[0]
+    rest = items[1:]
+    if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+        head = ""
+    elif op is sre_constants.BRANCH:
+        head = "|".join(_prefix_source(branch) for branch in av[1])
+    elif op is sre_constants.SUBPATTERN:
+        head = _with_flags(av[1], av[2], _prefix_source(av[3]))
+    elif op is sre_constants.ATOMIC_GROUP:
+        head = _prefix_source(av)
+    elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT):
+        low, high, body = av
+        if high == 0:
+            head = ""
+        else:
+            upper = "" if high == sre_constants.MAXREPEAT else str(high - 1)
+            head = f"(?:{_full_source(body)}){{0,{upper}}}(?:{_prefix_source(body)})"
+    elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        # A lookahead peeks at the text after the current position; a lookbehind never reaches the end
+        head = _prefix_source(av[1]) if av[0] == 1 else ""
+    elif op is sre_constants.AT:
+        # $ peeks at a final newline to decide whether it holds
+        head = "\\n" if av is sre_constants.AT_END else ""
+    elif op is sre_constants.GROUPREF:
+        head = _ANY_TEXT
+    elif op is sre_constants.GROUPREF_EXISTS:
+        head = f"{_prefix_source(av[1])}|{_prefix_source(av[2] or [])}"
+    else:
+        raise ValueError(f"unsupported opcode {op}")
+    # Either the input ended inside this item, or the item is complete and the input ended later
+    return f"(?:{_full_source([items[0]])}{_prefix_source(rest)}|{head})"
+
+
+def partial_match_regex(regex: Pattern) -> Optional[Pattern]:
+    """
+    Regex that matches (up to the end of a text) every suffix from which a match attempt of
+    regex reaches the end of the text, i.e. where more text could still produce or change a
+    match (a superset: assertions are assumed to hold).
+
+    Returns:
+        The compiled regex (search it from a position to find the leftmost such start),
+        or None if the pattern uses constructs this analysis does not support
+    """
+    try:
+        source = _prefix_source(list(sre_parse.parse(regex.pattern, regex.flags)))
+        return re.compile(f"(?:{source})\\Z", regex.flags)
+    except (ValueError, KeyError, re.error, RecursionError):
+        return None
+
+
+# Upper bound on alternatives tracked for one required literal (e.g. sk_live_|sk_test_)
+_MAX_LITERAL_ALTERNATIVES = 16
+
+
+def _pure_literals(items) -> Optional[set]:
+    """Return the set of strings a parsed sub-pattern matches if it is only literals/branches of literals"""
+    alternatives = {""}
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            alternatives = {prefix + chr(av) for prefix in alternatives}
+        elif op == sre_constants.SUBPATTERN:
+            inner = _pure_literals(av[-1])
+            if inner is None:
+                return None
+            alternatives = {prefix + suffix for prefix in alternatives for suffix in inner}
+        elif op == sre_constants.BRANCH:
+            inner = set()
+            for branch in av[1]:
+                branch_literals = _pure_literals(branch)
+                if branch_literals is None:
+                    return None
+                inner |= branch_literals
+            alternatives = {prefix + suffix for prefix in alternatives for suffix in inner}
+        else:
+            return None
+        if len(alternatives) > _MAX_LITERAL_ALTERNATIVES:
+            return None
+    return alternatives
+
+
+def _literal_candidates(items, candidates: list):
+    """Collect runs of adjacent required literals (as sets of alternatives) from a parsed sequence"""
+    current = {""}
+
+    def close_run():
+        nonlocal current
+        if all(current):
+            candidates.append(current)
+        current = {""}
+
+    for op, av in items:
+        if op == sre_constants.AT:
+            # Zero-width assertions (\b, ^, $) do not break literal adjacency
+            continue
+        if op == sre_constants.LITERAL:
+            current = {prefix + chr(av) for prefix in current}
+            continue
+        if op in (sre_constants.SUBPATTERN, sre_constants.BRANCH):
+            inner = _pure_literals([(op, av)])
+            if inner is not None and len(current) * len(inner) <= _MAX_LITERAL_ALTERNATIVES:
+                current = {prefix + suffix for prefix in current for suffix in inner}
+                continue
+            close_run()
+            if op == sre_constants.SUBPATTERN:
+                _literal_candidates(av[-1], candidates)
+            continue
+        close_run()
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            # The repeated body must appear at least once
+            _literal_candidates(av[2], candidates)
+    close_run()
+
+
+def extract_required_literals(regex: Pattern) -> Optional[frozenset]:
+    """
+    Extract literals that must appear in any text the pattern matches.
+
+    Args:
+        regex: Compiled regex pattern
+
+    Returns:
+        Frozenset of lowercased ASCII alternatives (at least one must occur in the
+        text for the pattern to match), or None if no required literal was found
+    """
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return None
+    candidates = []
+    _literal_candidates(parsed.data, candidates)
+    best = None
+    for alternatives in candidates:
+        # Only ASCII literals are safe to test on ASCII text under IGNORECASE
+        if not all(alt.isascii() for alt in alternatives):
+            continue
+        if best is None or min(map(len, alternatives)) > min(map(len, best)):
+            best = alternatives
+    return frozenset(alt.lower() for alt in best) if best else None
+
+
+class PatternScanner:
+    """
+    Scanner over a set of precompiled regex patterns.
+
+    Patterns with required literals are prefiltered: they are only run when one
+    of their literals occurs in the (lowercased) input, which is what skips the
+    bulk of the work on ordinary text. Every remaining pattern is run with its
+    own finditer. (Folding the patterns into one alternation with a capturing
+    lookahead per pattern was measured slower with the backtracking re engine:
+    every position tries the guard alternation and then re-runs each pattern.)
+
+    Args:
+        patterns: List of compiled regex patterns (compiled with re.IGNORECASE)
+        literals: Optional list (parallel to patterns) of required literal sets
+    """
+
+    def __init__(self, patterns: List[Pattern], literals: Optional[List[Optional[frozenset]]] = None):
+        self.patterns = patterns
+        self.literals = literals if literals is not None else [None] * len(patterns)
+
+    def active_patterns(self, text: str, text_lower: Optional[str] = None) -> List[int]:
+        """
+        Indexes of patterns that can match text according to their required literals.
+        Non-ASCII text is not prefiltered (case-insensitive matching can map
+        non-ASCII characters onto ASCII literals).
+        """
+        if not text.isascii():
+            return list(range(len(self.patterns)))
+        if text_lower is None:
+            text_lower = text.lower()
+        active = []
+        for i, literals in enumerate(self.literals):
+            if literals is None or any(literal in text_lower for literal in literals):
+                active.append(i)
+        return active
+
+    def scan(self, text: str, text_lower: Optional[str] = None) -> List[List[Tuple[int, int]]]:
+        """
+        Scan text for every pattern that passes the literal prefilter.
+
+        Args:
+            text: Content to scan
+            text_lower: Lowercased text, if the caller already has it (used by the prefilter)
+
+        Returns:
+            List (parallel to patterns) of (start, end) spans in input order
+        """
+        spans = [[] for _ in self.patterns]
+        for i in self.active_patterns(text, text_lower):
+            spans[i] = [m.span() for m in self.patterns[i].finditer(text)]
+        return spans
+
+
+# Keyword automata whose dense transition table (states x alphabet size) would be larger
+# than this many entries (4 bytes each) follow failure links instead
+_DENSE_TABLE_MAX_ENTRIES = 1 << 24
+
+# Characters outside the keyword alphabet remembered per automaton (see _CharCodes)
+_MAX_OTHER_CHAR_CODES = 4096
+
+# Text is translated to transition codes this many characters at a time
+_KEYWORD_SCAN_WINDOW = 65536
+
+
+class _CharCodes(dict):
+    """str.translate table: keyword alphabet characters -> 1..n, any other character -> 0"""
+
+    __slots__ = ()
+
+    def __missing__(self, ordinal: int) -> int:
+        # Remember a bounded number of other characters so they are translated in C next time
+        if len(self) < _MAX_OTHER_CHAR_CODES:
+            self[ordinal] = 0
+        return 0
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton for multi-keyword matching.
+
+    Reports every occurrence (including overlapping ones) of every keyword in a
+    single linear pass over the text. Keywords and text are expected to be
+    lowercased by the caller.
+
+    The automaton is completed into a DFA over the keyword alphabet when built:
+    one flat table holds, for every state and alphabet character, the next
+    state's row offset (negated if keywords end there), and every character
+    outside the alphabet leads back to the root. Scanning translates the text
+    to character codes in C and then does one table read per character, so no
+    memory is allocated per input and the per-character cost only grows with
+    the table's memory footprint (cache misses), not with the failure chain.
+    Automata too large for the table fall back to following failure links.
+
+    Args:
+        entries: List of (keyword, tag) pairs; the tag is reported with each match
+    """
+
+    def __init__(self, entries: List[Tuple[str, Any]]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for keyword, tag in entries:
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + ((len(keyword), tag),)
+
+        # Breadth-first construction of failure links; outputs inherit from their fail state
+        order = [0]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0) if state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        alphabet = sorted({ch for transitions in self._goto for ch in transitions})
+        self._width = len(alphabet) + 1  # code 0: any character outside the alphabet
+        self._codes = _CharCodes((ord(ch), code) for code, ch in enumerate(alphabet, 1))
+        self._delta = None
+        if len(self._goto) * self._width <= _DENSE_TABLE_MAX_ENTRIES:
+            self._delta = self._build_table(order)
+
+    def _build_table(self, order: List[int]) -> array:
+        # A state's row starts as a copy of its fail state's row (rows are filled in BFS order,
+        # so the fail state's row is complete), then its own trie edges override it
+        width, codes, out = self._width, self._codes, self._out
+        delta = array("i", bytes(4 * len(self._goto) * width))
+        for state in order:
+            row = state * width
+            if state:
+                fail_row = self._fail[state] * width
+                delta[row:row + width] = delta[fail_row:fail_row + width]
+            for ch, next_state in self._goto[state].items():
+                delta[row + codes[ord(ch)]] = -next_state * width if out[next_state] else next_state * width
+        return delta
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yield (start, end, tag) for every keyword occurrence in text, ordered by end position.
+        """
+        if self._delta is None:
+            yield from self._iter_matches_sparse(text)
+            return
+        delta, out, width, codes = self._delta, self._out, self._width, self._codes
+        narrow = width <= 256
+        row = 0
+        for window_start in range(0, len(text), _KEYWORD_SCAN_WINDOW):
+            translated = text[window_start:window_start + _KEYWORD_SCAN_WINDOW].translate(codes)
+            window = translated.encode("latin-1") if narrow else array("I", translated.encode("utf-32-le"))
+            for i, code in enumerate(window, window_start):
+                row = delta[row + code]
+                if row < 0:
+                    row = -row
+                    for length, tag in out[row // width]:
+                        yield (i - length + 1, i + 1, tag)
+
+    def _iter_matches_sparse(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while True:
+                next_state = goto[state].get(ch)
+                if next_state is not None or not state:
+                    break
+                state = fail[state]
+            state = next_state or 0
+            if out[state]:
+                for length, tag in out[state]:
+                    yield (i - length + 1, i + 1, tag)
+
+    def find_tags(self, text: str) -> set:
+        """Return the set of tags with at least one keyword occurring in text"""
+        return {tag for _, _, tag in self.iter_matches(text)}
+
+
+def resolve_overlaps(matches: list, content: str) -> list:
+    """
+    Resolve overlapping matches by action priority (BLOCK > REVIEW > REDACT).
+
+    Levels are resolved from highest to lowest priority with an interval sweep
+    over value spans: a match is kept only if it does not overlap a match kept at
+    a higher level. Within BLOCK/REVIEW the earliest match wins (as before);
+    overlapping, nested or adjacent REDACT spans are merged into one redaction so
+    no part of a sensitive value is left unredacted. O(n log n) overall.
+
+    Args:
+        matches: Match tuples
+            (match_start, match_end, matched_text, value_start, value_end, value_span, policy, action)
+        content: The content the offsets refer to (used to rebuild merged spans)
+
+    Returns:
+        Non-overlapping match tuples sorted by value span
+    """
+    by_level = {}
+    for match in matches:
+        by_level.setdefault(ACTION_PRIORITY.get(match[7], 0), []).append(match)
+
+    selected = []  # kept matches, sorted by value_start and non-overlapping
+    for level in sorted(by_level, reverse=True):
+        merge_adjacent = level == ACTION_PRIORITY["REDACT"]
+        clusters = []  # groups of matches accepted at this level (merged REDACT spans share a cluster)
+        cluster_end = -1
+        j = 0
+        for match in sorted(by_level[level], key=lambda x: (x[3], x[4])):
+            value_start, value_end = match[3], match[4]
+            # Skip kept intervals that end before this one starts
+            while j < len(selected) and selected[j][4] <= value_start:
+                j += 1
+            if j < len(selected) and selected[j][3] < value_end:
+                continue  # overlaps a higher-priority match
+            if clusters and (value_start < cluster_end or (merge_adjacent and value_start == cluster_end)):
+                if not merge_adjacent:
+                    continue
+                clusters[-1].append(match)
+                cluster_end = max(cluster_end, value_end)
+                continue
+            clusters.append([match])
+            cluster_end = value_end
+
+        accepted = []
+        for cluster in clusters:
+            if len(cluster) == 1:
+                accepted.append(cluster[0])
+                continue
+            # Merged redaction: union of the full and value spans, attributed to the first match
+            first = cluster[0]
+            match_start = min(m[0] for m in cluster)
+            match_end = max(m[1] for m in cluster)
+            value_start = first[3]
+            value_end = max(m[4] for m in cluster)
+            accepted.append((
+                match_start, match_end, content[match_start:match_end],
+                value_start, value_end, content[value_start:value_end],
+                first[6], first[7],
+            ))
+        selected = list(heapq.merge(selected, accepted, key=lambda x: (x[3], x[4])))
+    return selected
+
+
+class CompiledPolicy:
+    """A single policy with its conditions pre-processed for evaluation"""
+
+    def __init__(self, policy: dict):
+        self.policy = policy
+        self.id = policy["id"]
+        self.name = policy["name"]
+        self.action = policy["action"]
+        self.conditions = policy.get("conditions") or {}
+
+        # Scope may be stored as a string or a list
+        scope = policy.get("scope", [])
+        if isinstance(scope, str):
+            scope = [scope]
+        self.scope = list(scope)
+
+        # Keywords and phrases are matched the same way in free text;
+        # structured (copilot) fields only use conditions.keywords
+        self.structured_keywords = list(self.conditions.get("keywords", []))
+        self.keywords = self.structured_keywords + list(self.conditions.get("phrases", []))
+
+        # Compile regex patterns once; invalid patterns are logged and skipped
+        self.patterns: List[Tuple[str, Pattern]] = []
+        for pattern_str in self.conditions.get("patterns", []):
+            try:
+                self.patterns.append((pattern_str, re.compile(pattern_str, re.IGNORECASE)))
+            except re.error as e:
+                print(f"Warning: Invalid regex pattern in policy {self.name}: {pattern_str} - {e}")
+        # Required literals per pattern for the prefilter (None = always scanned)
+        self.pattern_literals = [extract_required_literals(regex) for _, regex in self.patterns]
+
+
+class StructuredConditionIndex:
+    """
+    Inverted indexes over the structured (copilot) conditions of a set of policies.
+
+    Evaluating a payload is a few automaton passes over its short fields and dict
+    lookups on its compliance flags, independent of the number of policies:
+    - labels / sensitivity_label_contains: substring automaton over sensitivity_label
+    - workloads: substring automaton over workload
+    - compliance_flags_include / keywords: exact (case-insensitive) flag -> policies
+    - keywords: substring automaton over user.department, user.role, action.request
+      and content_preview
+
+    Args:
+        compiled: Compiled policies, in evaluation order
+        keyword_automaton: Automaton over the policies' conditions.keywords (tagged (policy id, index))
+    """
+
+    def __init__(self, compiled: List["CompiledPolicy"], keyword_automaton: "KeywordAutomaton"):
+        self.compiled = compiled
+        self._position = {cp.id: index for index, cp in enumerate(compiled)}
+        label_entries = []
+        workload_entries = []
+        # Empty substrings match any non-empty field value but cannot be put in an automaton
+        self._always_label = {"labels": set(), "sensitivity_label_contains": set()}
+        self._always_workload = set()
+        self._flag_includes = {}  # lowercased flag -> [(policy index, condition order)]
+        self._flag_keywords = {}  # lowercased flag -> [(policy index, keyword order)]
+        for index, cp in enumerate(compiled):
+            for kind in ("labels", "sensitivity_label_contains"):
+                for label in cp.conditions.get(kind, []):
+                    if label:
+                        label_entries.append((label.lower(), (index, kind)))
+                    else:
+                        self._always_label[kind].add(index)
+            for workload in cp.conditions.get("workloads", []):
+                if workload:
+                    workload_entries.append((workload.lower(), index))
+                else:
+                    self._always_workload.add(index)
+            for order, flag in enumerate(cp.conditions.get("compliance_flags_include", [])):
+                self._flag_includes.setdefault(flag.lower(), []).append((index, order))
+            for order, keyword in enumerate(cp.structured_keywords):
+                self._flag_keywords.setdefault(keyword.lower(), []).append((index, order))
+        self._label_automaton = KeywordAutomaton(label_entries)
+        self._workload_automaton = KeywordAutomaton(workload_entries)
+        self._keyword_automaton = keyword_automaton
+
+    def _keyword_hits(self, text: str) -> set:
+        if not text:
+            return set()
+        return {self._position[policy_id] for policy_id, _ in self._keyword_automaton.find_tags(text.lower())}
+
+    def evaluate(self, sensitivity_label: str, workload: str, compliance_flags: List[str], department: str, role: str, request: str, content_preview: str) -> List[Tuple["CompiledPolicy", List[str]]]:
+        """
+        Find the policies whose structured conditions match a copilot payload.
+
+        Returns:
+            List of (compiled policy, matched field paths) in policy order; field paths
+            ("sensitivity_label", "compliance_flags.N", "user.department", ...) are listed
+            in the order their matches are reported
+        """
+        fired = {}  # policy index -> {condition: value}
+
+        def hit(index: int, condition: str, value=True):
+            fired.setdefault(index, {})[condition] = value
+
+        if sensitivity_label:
+            for kind, indexes in self._always_label.items():
+                for index in indexes:
+                    hit(index, kind)
+            for index, kind in self._label_automaton.find_tags(sensitivity_label.lower()):
+                hit(index, kind)
+        if workload:
+            for index in self._always_workload | self._workload_automaton.find_tags(workload.lower()):
+                hit(index, "workloads")
+
+        flags_lower = [flag.lower() for flag in compliance_flags]
+        for flag in set(flags_lower):
+            for index, order in self._flag_includes.get(flag, ()):
+                fired.setdefault(index, {}).setdefault("compliance_flags_include", []).append(order)
+            for index, order in self._flag_keywords.get(flag, ()):
+                fired.setdefault(index, {}).setdefault("flag_keywords", []).append(order)
+
+        for path, text in (("user.department", department), ("user.role", role), ("action.request", request), ("content_preview", content_preview)):
+            for index in self._keyword_hits(text):
+                hit(index, path)
+
+        def flag_path(needle: str) -> Optional[str]:
+            # Annotate the first flag containing the matched condition value (empty flags are not annotated)
+            position = next((i for i, flag in enumerate(flags_lower) if needle in flag), None)
+            return f"compliance_flags.{position}" if position is not None and compliance_flags[position] else None
+
+        results = []
+        for index in sorted(fired):
+            cp = self.compiled[index]
+            conditions = fired[index]
+            paths = []
+            if "labels" in conditions:
+                paths.append("sensitivity_label")
+            if "sensitivity_label_contains" in conditions:
+                paths.append("sensitivity_label")
+            # Only the first listed flag (with an annotatable element) is reported for compliance_flags_include
+            include_paths = (
+                flag_path(cp.conditions["compliance_flags_include"][order].lower())
+                for order in sorted(conditions.get("compliance_flags_include", ()))
+            )
+            paths.append(next((path for path in include_paths if path is not None), None))
+            if "workloads" in conditions:
+                paths.append("workload")
+            for order in sorted(conditions.get("flag_keywords", ())):
+                paths.append(flag_path(cp.structured_keywords[order].lower()))
+            for path in ("user.department", "user.role", "action.request", "content_preview"):
+                if path in conditions:
+                    paths.append(path)
+            results.append((cp, [path for path in paths if path is not None]))
+        return results
+
+
+class CompiledPolicyPack:
+    """
+    Immutable snapshot of the enabled policies for a policy pack version.
+
+    Args:
+        policy_pack_version: Policy pack version the snapshot was loaded for
+        policies: List of policy dictionaries (as returned by load_policies)
+        fingerprint: Opaque value used to detect changes to the policies table
+    """
+
+    def __init__(self, policy_pack_version: str, policies: List[dict], fingerprint=None):
+        self.policy_pack_version = policy_pack_version
+        self.policies = policies
+        self.fingerprint = fingerprint
+        # Hash of the policy contents: changes whenever any policy does (keys evaluation caches)
+        self.content_hash = hashlib.sha256(
+            json.dumps(policies, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self.compiled_at = time.time()
+        self.compiled = [CompiledPolicy(p) for p in policies]
+        self._by_id = {cp.id: cp for cp in self.compiled}
+        self._scanners = {}
+        self._automata = {}
+        self._structured_indexes = {}
+
+        # Policies in scope for each input type, with their matchers built up front
+        # so requests go straight to the right engine without filtering by scope
+        self._by_input_type = {
+            input_type: [cp.policy for cp in self.compiled if input_type in cp.scope]
+            for input_type in INPUT_TYPES
+        }
+        for input_type, scoped in self._by_input_type.items():
+            if input_type == "copilot":
+                self.structured_index(scoped)
+            else:
+                self._scanner_for(tuple(p["id"] for p in scoped))
+                if input_type == "chat":
+                    self.keyword_automaton(scoped)
+
+    def get(self, policy_id: str) -> Optional[CompiledPolicy]:
+        """Get the compiled form of a policy by id"""
+        return self._by_id.get(policy_id)
+
+    def policies_for(self, input_type: str) -> List[dict]:
+        """Get the policies whose scope includes input_type, in pack order"""
+        scoped = self._by_input_type.get(input_type)
+        if scoped is None:
+            scoped = [cp.policy for cp in self.compiled if input_type in cp.scope]
+        return scoped
+
+    def _scanner_for(self, key: tuple) -> PatternScanner:
+        scanner = self._scanners.get(key)
+        if scanner is None:
+            compiled = [self._by_id[policy_id] for policy_id in key]
+            scanner = PatternScanner(
+                [regex for cp in compiled for _, regex in cp.patterns],
+                [literals for cp in compiled for literals in cp.pattern_literals],
+            )
+            self._scanners[key] = scanner
+        return scanner
+
+    def scan_patterns(self, policies: List[dict], text: str, text_lower: Optional[str] = None, stats=None) -> dict:
+        """
+        Scan text for the regex patterns of all the given policies (behind the literal prefilter).
+
+        Args:
+            policies: Applicable policy dictionaries (any subset of this pack)
+            text: Content to scan
+            text_lower: Lowercased content, if already computed (used by the literal prefilter)
+            stats: Optional PolicyStats; when given, the time of each pattern scan is
+                recorded per policy (same spans as the untimed scan)
+
+        Returns:
+            Dict of policy id -> list (parallel to the policy's compiled patterns)
+            of (start, end) match spans
+        """
+        key = tuple(p["id"] for p in policies)
+        if stats is not None:
+            return {policy_id: self._scan_policy_timed(policy_id, text, text_lower, stats) for policy_id in key}
+
+        spans = self._scanner_for(key).scan(text, text_lower)
+        hits = {}
+        offset = 0
+        for policy_id in key:
+            count = len(self._by_id[policy_id].patterns)
+            hits[policy_id] = spans[offset:offset + count]
+            offset += count
+        return hits
+
+    def _scan_policy_timed(self, policy_id: str, text: str, text_lower: Optional[str], stats) -> List[List[Tuple[int, int]]]:
+        """Scan one policy's patterns individually, recording the time and outcome of each"""
+        compiled = self._by_id[policy_id]
+        active = set(self._scanner_for((policy_id,)).active_patterns(text, text_lower))
+        spans = []
+        timings = []
+        for i, (pattern_str, regex) in enumerate(compiled.patterns):
+            started = time.perf_counter()
+            pattern_spans = [m.span() for m in regex.finditer(text)] if i in active else []
+            timings.append((pattern_str, time.perf_counter() - started, bool(pattern_spans)))
+            spans.append(pattern_spans)
+        stats.record_timing(policy_id, timings)
+        return spans
+
+    def keyword_automaton(self, policies: List[dict], include_phrases: bool = True) -> KeywordAutomaton:
+        """
+        Get the keyword automaton for a set of policies (built once per pack).
+        Each keyword is tagged with (policy id, keyword index within the policy).
+        """
+        policy_ids = tuple(p["id"] for p in policies)
+        key = (policy_ids, include_phrases)
+        automaton = self._automata.get(key)
+        if automaton is None:
+            automaton = KeywordAutomaton([
+                (keyword.lower(), (policy_id, index))
+                for policy_id in policy_ids
+                for index, keyword in enumerate(
+                    self._by_id[policy_id].keywords if include_phrases else self._by_id[policy_id].structured_keywords
+                )
+            ])
+            self._automata[key] = automaton
+        return automaton
+
+    def scan_keywords(self, policies: List[dict], text_lower: str) -> dict:
+        """
+        Find every keyword/phrase occurrence for the given policies in one pass.
+
+        Args:
+            policies: Applicable policy dictionaries (any subset of this pack)
+            text_lower: Lowercased content to scan
+
+        Returns:
+            Dict of policy id -> list (parallel to the policy's keywords) of match start offsets
+        """
+        hits = {p["id"]: [[] for _ in self._by_id[p["id"]].keywords] for p in policies}
+        for start, _, (policy_id, index) in self.keyword_automaton(policies).iter_matches(text_lower):
+            hits[policy_id][index].append(start)
+        # Automaton reports by end offset; keep each keyword's hits in start order
+        for keyword_starts in hits.values():
+            for starts in keyword_starts:
+                starts.sort()
+        return hits
+
+    def structured_index(self, policies: List[dict]) -> StructuredConditionIndex:
+        """Get the structured (copilot) condition index for a set of policies (built once per pack)"""
+        key = tuple(p["id"] for p in policies)
+        index = self._structured_indexes.get(key)
+        if index is None:
+            index = StructuredConditionIndex(
+                [self._by_id[policy_id] for policy_id in key],
+                self.keyword_automaton(policies, include_phrases=False),
+            )
+            self._structured_indexes[key] = index
+        return index
+
+    def keyword_policies(self, policies: List[dict], text: str) -> set:
+        """Return ids of the given policies with any conditions.keywords entry in text (case-insensitive)"""
+        if not text or not isinstance(text, str):
+            return set()
+        automaton = self.keyword_automaton(policies, include_phrases=False)
+        return {policy_id for policy_id, _ in automaton.find_tags(text.lower())}
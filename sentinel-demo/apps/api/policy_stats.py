@@ -0,0 +1,116 @@
+"""
+In-process runtime statistics for policy evaluation.
+
+Every evaluated policy records whether it matched (hit rate). Evaluation time
+is recorded per pattern whenever patterns are scanned one policy at a time:
+always for short-circuited BLOCK policies, and for a sample of regular runs
+(unsampled runs skip the per-pattern timer and statistics bookkeeping).
+
+The statistics drive the evaluation order: high-severity policies first, then
+the lowest expected cost per hit (mean scan time / smoothed hit rate).
+Policies without timing samples yet are tried first so they get measured.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from verdict_mapping import ACTION_PRIORITY
+
+
+def _new_counter() -> dict:
+    return {"evaluations": 0, "hits": 0, "timed": 0, "seconds": 0.0}
+
+
+def _summarize(counter: dict) -> dict:
+    return {
+        "evaluations": counter["evaluations"],
+        "hits": counter["hits"],
+        "hit_rate": round(counter["hits"] / counter["evaluations"], 4) if counter["evaluations"] else None,
+        "timed_samples": counter["timed"],
+        "mean_ms": round(counter["seconds"] * 1000 / counter["timed"], 4) if counter["timed"] else None,
+    }
+
+
+class PolicyStats:
+    """
+    Thread-safe per-policy and per-pattern evaluation statistics.
+
+    Args:
+        sample_every: Time a full evaluation once every N runs (0 disables sampling)
+    """
+
+    def __init__(self, sample_every: int = 50):
+        self.sample_every = sample_every
+        self._runs = 0
+        self._policies: Dict[str, dict] = {}
+        self._patterns: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        """Count a run and return True if its patterns should be scanned per policy and timed"""
+        with self._lock:
+            self._runs += 1
+            return self.sample_every > 0 and self._runs % self.sample_every == 0
+
+    def record_outcome(self, policy_id: str, matched: bool):
+        """Record that a policy was evaluated and whether it produced any match"""
+        with self._lock:
+            counter = self._policies.setdefault(policy_id, _new_counter())
+            counter["evaluations"] += 1
+            if matched:
+                counter["hits"] += 1
+
+    def record_timing(self, policy_id: str, pattern_timings: List[Tuple[str, float, bool]]):
+        """
+        Record the scan time of one policy's patterns.
+
+        Args:
+            policy_id: Policy the patterns belong to
+            pattern_timings: List of (pattern, seconds, matched) for each pattern of the policy
+        """
+        with self._lock:
+            counter = self._policies.setdefault(policy_id, _new_counter())
+            counter["timed"] += 1
+            counter["seconds"] += sum(seconds for _, seconds, _ in pattern_timings)
+            for pattern, seconds, matched in pattern_timings:
+                pattern_counter = self._patterns.setdefault((policy_id, pattern), _new_counter())
+                pattern_counter["evaluations"] += 1
+                pattern_counter["timed"] += 1
+                pattern_counter["seconds"] += seconds
+                if matched:
+                    pattern_counter["hits"] += 1
+
+    def cost_per_hit(self, policy_id: str) -> Optional[float]:
+        """Expected seconds spent per hit, or None if the policy has not been timed yet"""
+        with self._lock:
+            counter = self._policies.get(policy_id)
+            if counter is None or not counter["timed"]:
+                return None
+            mean_seconds = counter["seconds"] / counter["timed"]
+            # Laplace smoothing keeps rarely-hit policies from dividing by zero
+            hit_rate = (counter["hits"] + 1) / (counter["evaluations"] + 2)
+            return mean_seconds / hit_rate
+
+    def order(self, policies: List[dict]) -> List[dict]:
+        """Order policies by severity, then untimed policies, then lowest cost per hit"""
+        def sort_key(policy):
+            cost = self.cost_per_hit(policy["id"])
+            return (-ACTION_PRIORITY.get(policy["action"], 0), cost is not None, cost or 0.0)
+        return sorted(policies, key=sort_key)
+
+    def policy_summary(self, policy_id: str) -> dict:
+        """Statistics for one policy, including a per-pattern breakdown"""
+        with self._lock:
+            summary = _summarize(self._policies.get(policy_id) or _new_counter())
+            summary["patterns"] = [
+                dict(pattern=pattern, **_summarize(counter))
+                for (pattern_policy_id, pattern), counter in self._patterns.items()
+                if pattern_policy_id == policy_id
+            ]
+        cost = self.cost_per_hit(policy_id)
+        summary["cost_per_hit_ms"] = round(cost * 1000, 4) if cost is not None else None
+        return summary
+
+    def status(self) -> dict:
+        """Describe sampling configuration for debugging"""
+        with self._lock:
+            return {"sample_every": self.sample_every, "runs": self._runs}
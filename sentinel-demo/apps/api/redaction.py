@@ -0,0 +1,142 @@
+"""
+Redaction helpers shared by the API evaluation paths.
+Annotations record only the VALUE portion of KEY=VALUE / Header: Value matches,
+while redaction preserves the key name and replaces the value.
+"""
+from typing import List, Tuple
+
+
+def extract_value_span(matched_text: str, match_start: int, match_end: int):
+    """
+    Extract the value portion span from a KEY=VALUE or Header: Value match.
+    Annotations should record only the VALUE portion, not the key name.
+
+    Args:
+        matched_text: The full matched text
+        match_start: Start position of the full match
+        match_end: End position of the full match
+
+    Returns:
+        Tuple of (value_start, value_end, value_span) representing just the value portion.
+        If no delimiter found, returns original (match_start, match_end, matched_text).
+    """
+    # Check if matched text contains '=' (preferred) or ':' delimiter
+    if '=' in matched_text:
+        delimiter_idx = matched_text.find('=')
+        value_start_in_match = delimiter_idx + 1
+        # Skip any whitespace after '='
+        while value_start_in_match < len(matched_text) and matched_text[value_start_in_match] in ' \t':
+            value_start_in_match += 1
+        value_span = matched_text[value_start_in_match:]
+        value_start = match_start + value_start_in_match
+        value_end = match_end
+        return (value_start, value_end, value_span)
+    elif ':' in matched_text:
+        delimiter_idx = matched_text.find(':')
+        value_start_in_match = delimiter_idx + 1
+        # Skip any whitespace after ':'
+        while value_start_in_match < len(matched_text) and matched_text[value_start_in_match] in ' \t':
+            value_start_in_match += 1
+        value_span = matched_text[value_start_in_match:]
+        value_start = match_start + value_start_in_match
+        value_end = match_end
+        return (value_start, value_end, value_span)
+    else:
+        # No delimiter found, entire match is the value
+        return (match_start, match_end, matched_text)
+
+
+def redaction_replacement(matched_text: str) -> str:
+    """
+    Build the replacement for a matched span, preserving variable names for KEY=VALUE or KEY: VALUE formats.
+
+    Args:
+        matched_text: The matched text span (full match including key)
+
+    Returns:
+        The replacement text (key name and delimiter kept, value replaced with [REDACTED])
+    """
+    # Check if matched text contains '=' (preferred) or ':' delimiter
+    if '=' in matched_text:
+        delimiter_idx = matched_text.find('=')
+        # Keep variable name and delimiter, replace value
+        return matched_text[:delimiter_idx + 1] + "[REDACTED]"
+    elif ':' in matched_text:
+        delimiter_idx = matched_text.find(':')
+        # Keep variable name and delimiter, replace value
+        # Handle optional space after colon
+        space_after_colon = 0
+        if delimiter_idx + 1 < len(matched_text) and matched_text[delimiter_idx + 1] == ' ':
+            space_after_colon = 1
+        return matched_text[:delimiter_idx + 1 + space_after_colon] + "[REDACTED]"
+    else:
+        # No delimiter found, replace entire span
+        return "[REDACTED]"
+
+
+def apply_redaction(content: str, start: int, end: int, matched_text: str) -> str:
+    """
+    Apply redaction to content, preserving variable names for KEY=VALUE or KEY: VALUE formats.
+
+    Args:
+        content: The full content string
+        start: Start position of the match (full match including key)
+        end: End position of the match (full match including key)
+        matched_text: The matched text span (full match including key)
+
+    Returns:
+        The content with redaction applied (preserves key name, redacts value)
+    """
+    return content[:start] + redaction_replacement(matched_text) + content[end:]
+
+
+def splice_replacements(content: str, edits: List[Tuple[int, int, str]]) -> str:
+    """
+    Apply many span replacements in one pass with a single join (O(n + m)).
+
+    Args:
+        content: The full content string
+        edits: List of (start, end, replacement) in original content offsets
+
+    Returns:
+        The content with every replacement applied. Edits are applied in start order;
+        an edit that starts inside an earlier edit is skipped.
+    """
+    parts = []
+    cursor = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[0]):
+        if start < cursor:
+            continue
+        parts.append(content[cursor:start])
+        parts.append(replacement)
+        cursor = end
+    parts.append(content[cursor:])
+    return "".join(parts)
+
+
+def build_redacted_output(content: str, matches: list) -> str:
+    """
+    Build governed output for REDACT matches in a single pass.
+
+    Args:
+        content: The full content string
+        matches: De-overlapped match tuples
+            (match_start, match_end, matched_text, value_start, value_end, value_span, policy, action)
+
+    Returns:
+        The content with KEY=[REDACTED] / Header: [REDACTED] / [REDACTED] replacements applied
+    """
+    edits = []
+    cursor = 0
+    for match_start, match_end, matched_text, value_start, value_end, value_span, policy, action in sorted(matches, key=lambda x: x[0]):
+        if action != "REDACT":
+            continue
+        if match_start >= cursor:
+            # Preserve variable names for KEY=VALUE or KEY: VALUE formats
+            edits.append((match_start, match_end, redaction_replacement(matched_text)))
+            cursor = match_end
+        elif value_end > cursor:
+            # Full match overlaps the previous redaction (its key was already consumed); redact the rest of the value
+            edits.append((max(value_start, cursor), value_end, "[REDACTED]"))
+            cursor = value_end
+    return splice_replacements(content, edits)
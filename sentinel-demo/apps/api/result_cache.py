@@ -0,0 +1,130 @@
+"""
+Process-wide cache of evaluation results for repeated inputs.
+
+Much of the traffic is identical content (templated prompts, the same
+snippet pasted again, client retries). Results are cached under
+(sha256(input_content), input_type, scenario_id, policy_pack_version,
+pack content hash):
+- Entries expire after ttl_seconds and the least recently used entries are
+  evicted beyond max_entries or beyond max_bytes, the approximate size of
+  the cached results (their JSON length), since one result for a large input
+  carries several copies of its text (baseline, governed output, annotations)
+- A new pack content hash for a version drops that version's older entries,
+  so a policy change never serves results from the previous pack
+- Only inputs up to max_input_chars are cached (large documents rarely repeat)
+
+Cached results are copied on the way in and out; callers still build a fresh
+run row (id, timestamps, events) from them.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of generate_demo_run results.
+
+    Args:
+        max_entries: Maximum number of cached results (0 disables the cache)
+        ttl_seconds: How long a result is served after it was computed
+        max_input_chars: Longer inputs are not cached
+        max_bytes: Approximate memory budget for cached results
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, max_input_chars: int = 65536, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_input_chars = max_input_chars
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (stored_at, result, size)
+        self._bytes = 0
+        self._pack_hashes: Dict[str, str] = {}  # policy_pack_version -> latest content hash seen
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "skipped": 0}
+
+    def key(self, input_content: str, input_type: str, scenario_id: Optional[str], policy_pack_version: str, pack_hash: str) -> Optional[tuple]:
+        """Build the cache key for an evaluation, or None if it should not be cached"""
+        if self.max_entries <= 0 or len(input_content) > self.max_input_chars:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return None
+        content_hash = hashlib.sha256(input_content.encode("utf-8")).hexdigest()
+        return (content_hash, input_type, scenario_id, policy_pack_version, pack_hash)
+
+    def _observe_pack(self, policy_pack_version: str, pack_hash: str):
+        # Called with the lock held: drop entries computed with an older pack of this version
+        previous = self._pack_hashes.get(policy_pack_version)
+        if previous == pack_hash:
+            return
+        self._pack_hashes[policy_pack_version] = pack_hash
+        if previous is None:
+            return
+        stale = [key for key in self._entries if key[3] == policy_pack_version and key[4] != pack_hash]
+        for key in stale:
+            self._remove(key)
+        self.stats["invalidations"] += len(stale)
+
+    def _remove(self, key: tuple):
+        # Called with the lock held
+        self._bytes -= self._entries.pop(key)[2]
+
+    def get(self, key: Optional[tuple]) -> Optional[dict]:
+        """Return a copy of the cached result for key, or None on a miss"""
+        if key is None:
+            return None
+        with self._lock:
+            self._observe_pack(key[3], key[4])
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] >= self.ttl_seconds:
+                self._remove(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            result = entry[1]
+        return copy.deepcopy(result)
+
+    def put(self, key: Optional[tuple], result: dict):
+        """Store a copy of an evaluation result"""
+        if key is None:
+            return
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return
+        stored = copy.deepcopy(result)
+        with self._lock:
+            latest = self._pack_hashes.setdefault(key[3], key[4])
+            if latest != key[4]:
+                return  # computed with a pack that has since been replaced
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), stored, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def status(self) -> dict:
+        """Describe cache configuration and hit/miss metrics for debugging"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_input_chars": self.max_input_chars,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                "stats": dict(self.stats),
+            }
@@ -0,0 +1,111 @@
+"""
+In-process cache of runs for the read endpoints.
+
+Runs are write-once (annotations are frozen in meta), so a run and its events
+can be served from memory once created or read from Supabase:
+- Entries are kept in LRU order and bounded by the approximate size of their
+  JSON representation (max_bytes), not by count, since runs range from one
+  chat line to whole documents
+- Each entry carries a strong ETag (a digest of the stored rows), so
+  conditional requests can be answered with 304 without touching Supabase
+
+Newly created runs are cached as built, so their rows must already be in the
+form Supabase returns them (timestamps as PostgREST formats timestamptz, every
+column and event id filled in); otherwise the same run would get a second
+ETag once it is evicted and read back.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class CachedRun:
+    """A run row, its event rows ordered by seq, and the ETag of that pair"""
+
+    __slots__ = ("run", "events", "etag", "size")
+
+    def __init__(self, run: dict, events: List[dict], etag: str, size: int):
+        self.run = run
+        self.events = events
+        self.etag = etag
+        self.size = size
+
+
+def make_etag(*parts: str) -> str:
+    """Build a strong ETag (quoted) from digest inputs"""
+    return '"' + hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison, as RFC 9110 requires for If-None-Match)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class RunCache:
+    """
+    Size-bounded LRU cache of immutable runs.
+
+    Args:
+        max_bytes: Approximate memory budget (serialized size of cached rows; 0 disables the cache)
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedRun]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, run_id: str) -> Optional[CachedRun]:
+        """Return the cached run, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(run_id)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(run_id)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, run_id: str, run: dict, events: List[dict]) -> CachedRun:
+        """
+        Cache a run read from Supabase or just created (in its stored form).
+
+        Returns:
+            The entry with its ETag (also when it is too large to be kept)
+        """
+        serialized = json.dumps({"run": run, "events": events}, sort_keys=True, separators=(",", ":"), default=str)
+        entry = CachedRun(run, events, make_etag(serialized), len(serialized))
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(run_id, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[run_id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats["evictions"] += 1
+        return entry
+
+    def status(self) -> dict:
+        """Describe cache size and hit/miss metrics for debugging"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "max_bytes": self.max_bytes,
+                "bytes": self._bytes,
+                "entries": len(self._entries),
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                "stats": dict(self.stats),
+            }
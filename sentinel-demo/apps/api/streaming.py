@@ -0,0 +1,313 @@
+"""
+Incremental policy evaluation for streamed text (e.g. LLM token streams)
+and for large inputs scanned in fixed-size windows.
+
+StreamScanner accepts text chunks as they arrive and releases governed
+segments as soon as no future text can change them:
+- Every pattern resumes where its last final match ended. A match is final
+  once no match attempt at or before its start reaches the end of the text
+  received so far; each pattern's partial_match_regex finds the leftmost
+  position where an attempt is still in progress (e.g. inside a token that
+  could still become a secret value), and text before it is not held back
+- Keyword occurrences are final as soon as their last character arrives
+- Matches are grouped into clusters of overlapping/adjacent spans; a cluster
+  is resolved (resolve_overlaps) and released once all text before the next
+  possible match has been scanned
+
+Released matches are identical to a whole-string scan, except that lookbehinds
+see at most _CONTEXT_CHARS of earlier text. max_carry_chars optionally bounds
+the buffer and the work per chunk: a match attempt still in progress after that
+many characters is given up on and its text released, so a longer match (e.g. a
+multi-kilobyte [^\\s]+ token) can be missed or cut short. The scanner records
+this in `abandoned` so callers can fail closed; with max_carry_chars=None
+(scan_in_chunks) nothing is given up on.
+Zero-width matches are ignored (they cannot redact anything).
+"""
+from typing import List, Optional, Tuple
+
+from policy_engine import CompiledPolicyPack, max_match_width, partial_match_regex, resolve_overlaps
+from redaction import extract_value_span
+
+# Characters kept before the scan position (lookbehind, \b) and added to the fallback carry window (lookahead)
+_CONTEXT_CHARS = 64
+
+
+def _shift(matches: list, offset: int) -> list:
+    """Move match tuples by offset characters"""
+    return [
+        (m[0] + offset, m[1] + offset, m[2], m[3] + offset, m[4] + offset, m[5], m[6], m[7])
+        for m in matches
+    ]
+
+
+class StreamSegment:
+    """
+    A released part of the stream.
+
+    Attributes:
+        start: Offset of the segment in the full input
+        text: Original text of the segment
+        matches: Resolved match tuples in full-input offsets
+            (match_start, match_end, matched_text, value_start, value_end, value_span, policy, action)
+    """
+
+    def __init__(self, start: int, text: str, matches: list):
+        self.start = start
+        self.text = text
+        self.matches = matches
+
+    def relative_matches(self) -> list:
+        """Matches with offsets relative to the segment text (for build_redacted_output)"""
+        return _shift(self.matches, -self.start)
+
+
+class StreamScanner:
+    """
+    Incremental scanner over the patterns and keywords of a set of policies.
+
+    Args:
+        pack: Compiled policy pack snapshot
+        policies: Applicable policy dictionaries (any subset of the pack)
+        match_keywords: Whether keywords/phrases are matched (chat inputs)
+        max_carry_chars: Longest match attempt held back while it is in progress, None for no limit (see module docstring)
+        skip_patterns: Optional set of (policy id, pattern index) known not to match the input
+    """
+
+    def __init__(self, pack: CompiledPolicyPack, policies: List[dict], match_keywords: bool, max_carry_chars: Optional[int] = 4096, skip_patterns: Optional[set] = None):
+        # Each match source has a rank reproducing the whole-input evaluation order
+        # (policy order; a policy's keywords before its patterns) so ties resolve identically
+        self.patterns = []  # (rank, regex, policy name, action, required literals)
+        self.partials = []  # per pattern: partial_match_regex, or None to hold back a fixed carry window
+        self.carry = []  # per pattern: carry window used when there is no partial match regex (None: hold everything)
+        self.automaton = None
+        self.keywords = {}  # (policy id, index) -> (rank, policy name, action)
+        self.max_keyword = 0
+        for policy_index, policy in enumerate(policies):
+            compiled = pack.get(policy["id"])
+            for index, (_, regex) in enumerate(compiled.patterns):
+                if skip_patterns and (compiled.id, index) in skip_patterns:
+                    continue
+                self.patterns.append(((policy_index, 1, index), regex, compiled.name, compiled.action, compiled.pattern_literals[index]))
+                self.partials.append(partial_match_regex(regex))
+                width = max_match_width(regex)
+                if width is None:
+                    self.carry.append(max_carry_chars)
+                elif max_carry_chars is None:
+                    self.carry.append(width + _CONTEXT_CHARS)
+                else:
+                    self.carry.append(min(max_carry_chars, width + _CONTEXT_CHARS))
+            if match_keywords:
+                for index, keyword in enumerate(compiled.keywords):
+                    self.keywords[(compiled.id, index)] = ((policy_index, 0, index), compiled.name, compiled.action)
+                    self.max_keyword = max(self.max_keyword, len(keyword))
+        if self.keywords:
+            self.automaton = pack.keyword_automaton(policies)
+
+        self.max_carry_chars = max_carry_chars
+        self.abandoned = False  # a match attempt was given up on at max_carry_chars (its text may be released unredacted)
+
+        self.text = ""  # buffered input, starting at offset self.base
+        self.base = 0
+        self.length = 0  # characters received so far
+        self.next_pos = [0] * len(self.patterns)  # where each pattern resumes scanning
+        self.keywords_done = 0  # keyword occurrences ending at or before this offset were reported
+        self.pending = []  # (rank, match) found but not yet released
+        self.released = 0  # text before this offset has been released
+        self.resolved = []  # all released matches (for the final run record)
+
+    def feed(self, chunk: str) -> Tuple[List[StreamSegment], list]:
+        """
+        Add a chunk of text.
+
+        Returns:
+            Tuple of (released segments, newly found matches). New matches are
+            reported before they are final so callers can stop on BLOCK/REVIEW.
+        """
+        self.text += chunk
+        self.length += len(chunk)
+        return self._advance(final=False)
+
+    def finish(self) -> Tuple[List[StreamSegment], list]:
+        """Mark the end of the stream and release everything that is left"""
+        return self._advance(final=True)
+
+    def unreleased_matches(self) -> list:
+        """Matches found but not yet released (e.g. when the stream is aborted)"""
+        return [match for _, match in self.pending]
+
+    def _advance(self, final: bool) -> Tuple[List[StreamSegment], list]:
+        n = self.length
+        found = self._scan_patterns(n, final) + self._scan_keywords(n)
+        self.pending.extend(found)
+        found = [match for _, match in found]
+
+        # Text before `safe` can no longer gain new matches (a keyword may still end after n)
+        keyword_hold = n - self.max_keyword + 1 if self.automaton is not None else n
+        safe = n if final else max(self.released, min([keyword_hold] + self.next_pos))
+        segments = self._release(safe, final)
+
+        # Drop buffered text that is no longer needed for scanning or release
+        keep_from = min([self.released, self.keywords_done - self.max_keyword] + self.next_pos) - _CONTEXT_CHARS
+        if keep_from > self.base:
+            self.text = self.text[keep_from - self.base:]
+            self.base = keep_from
+        return segments, found
+
+    def _hold(self, i: int, pos: int, n: int) -> int:
+        """Leftmost offset >= pos where a match attempt of pattern i is still in progress at offset n"""
+        partial = self.partials[i]
+        if partial is not None:
+            # Always matches, at the latest with the empty suffix at the end of the buffer
+            in_progress = partial.search(self.text, pos - self.base).start() + self.base
+        elif self.carry[i] is not None:
+            in_progress = n - self.carry[i]
+        else:
+            in_progress = pos
+        if self.max_carry_chars is None or in_progress >= n - self.max_carry_chars:
+            return max(pos, in_progress)
+        # Attempts in progress for longer than max_carry_chars are given up on
+        self.abandoned = True
+        return n - self.max_carry_chars
+
+    def _scan_patterns(self, n: int, final: bool) -> list:
+        found = []
+        # Lowercased buffer for the required-literal prefilter (ASCII only, see PatternScanner)
+        text_lower = self.text.lower() if self.text.isascii() else None
+        for i, (rank, regex, policy_name, action, literals) in enumerate(self.patterns):
+            pos = self.next_pos[i]
+            if literals is not None and text_lower is not None and not any(
+                text_lower.find(literal, pos - self.base) != -1 for literal in literals
+            ):
+                # No match can be completed in the buffer without one of its literals
+                self.next_pos[i] = n if final else self._hold(i, pos, n)
+                continue
+            resume = pos
+            hold = pos - 1  # not computed yet
+            for m in regex.finditer(self.text, pos - self.base):
+                start, end = m.start() + self.base, m.end() + self.base
+                if not final:
+                    # Attempts between resume and the first one still in progress can no longer change
+                    if hold < resume:
+                        hold = self._hold(i, resume, n)
+                    if start >= hold:
+                        break  # more text could still extend or change this match
+                resume = end
+                if end == start:
+                    continue
+                matched_text = m.group(0)
+                value_start, value_end, value_span = extract_value_span(matched_text, start, end)
+                found.append((rank, (start, end, matched_text, value_start, value_end, value_span, policy_name, action)))
+            if final:
+                self.next_pos[i] = n
+            else:
+                # No match can start in [resume, hold) whatever text follows
+                self.next_pos[i] = hold if hold >= resume else self._hold(i, resume, n)
+        return found
+
+    def _scan_keywords(self, n: int) -> list:
+        found = []
+        if self.automaton is None:
+            return found
+        scan_from = max(self.base, self.keywords_done - self.max_keyword + 1)
+        window = self.text[scan_from - self.base:n - self.base]
+        for start, end, tag in self.automaton.iter_matches(window.lower()):
+            start, end = start + scan_from, end + scan_from
+            if end <= self.keywords_done:
+                continue  # reported by an earlier chunk
+            rank, policy_name, action = self.keywords[tag]
+            matched_text = self.text[start - self.base:end - self.base]
+            found.append((rank, (start, end, matched_text, start, end, matched_text, policy_name, action)))
+        self.keywords_done = n
+        return found
+
+    def _release(self, safe: int, final: bool) -> List[StreamSegment]:
+        # Group pending matches into clusters of overlapping/adjacent full spans
+        clusters = []
+        for rank, match in sorted(self.pending, key=lambda item: min(item[1][0], item[1][3])):
+            start, end = min(match[0], match[3]), max(match[1], match[4])
+            if clusters and start <= clusters[-1][1]:
+                clusters[-1][1] = max(clusters[-1][1], end)
+                clusters[-1][2].append((rank, match))
+            else:
+                clusters.append([start, end, [(rank, match)]])
+
+        # A cluster is final if it ends before `safe` (a future match could otherwise touch it)
+        release_to = safe
+        ready = []
+        self.pending = []
+        for start, end, cluster in clusters:
+            if final or end < safe:
+                ready.extend(cluster)
+            else:
+                release_to = min(release_to, start)
+                self.pending.extend(cluster)
+        if release_to <= self.released and not ready:
+            return []
+
+        segment_start = self.released
+        segment_text = self.text[segment_start - self.base:release_to - self.base]
+        # Resolve in whole-input evaluation order on segment-relative offsets
+        ready = [match for _, match in sorted(ready, key=lambda item: (item[0], item[1][0]))]
+        resolved = resolve_overlaps(_shift(ready, -segment_start), segment_text)
+        segment = StreamSegment(segment_start, segment_text, _shift(resolved, segment_start))
+        self.resolved.extend(segment.matches)
+        self.released = release_to
+        return [segment]
+
+
+def _present_literals(text: str, literals: set, chunk_chars: int) -> set:
+    """Return the lowercase literals that occur in text (case-insensitively), lowercasing one window at a time"""
+    present = set()
+    if not literals:
+        return present
+    overlap = max(len(literal) for literal in literals) - 1
+    for offset in range(0, len(text), chunk_chars):
+        window = text[max(0, offset - overlap):offset + chunk_chars].lower()
+        present.update(literal for literal in literals - present if literal in window)
+        if len(present) == len(literals):
+            break
+    return present
+
+
+def scan_in_chunks(pack: CompiledPolicyPack, policies: List[dict], text: str, match_keywords: bool, chunk_chars: int, stop_on_block: bool = False) -> Tuple[list, bool]:
+    """
+    Evaluate a large input in fixed-size windows (no lowercased copy of the input is made).
+    The scanner holds back text only while a match attempt is in progress, without a
+    carry limit, so a match crossing a window boundary is found whole and the result is
+    identical to a whole-string scan. Working memory is bounded by the window size plus
+    the longest match attempt in progress.
+
+    Args:
+        pack: Compiled policy pack snapshot
+        policies: Applicable policy dictionaries
+        text: Full input content
+        match_keywords: Whether keywords/phrases are matched (chat inputs)
+        chunk_chars: Window size in characters
+        stop_on_block: Stop scanning as soon as a BLOCK match is found
+
+    Returns:
+        Tuple of (resolved match tuples, whether scanning stopped early on BLOCK)
+    """
+    # Whole-input literal prefilter (as in PatternScanner), computed one lowercased window at a time
+    skip_patterns = set()
+    if text.isascii():
+        literals = {
+            literal
+            for policy in policies
+            for pattern_literals in pack.get(policy["id"]).pattern_literals if pattern_literals
+            for literal in pattern_literals
+        }
+        present = _present_literals(text, literals, chunk_chars)
+        for policy in policies:
+            compiled = pack.get(policy["id"])
+            for index, pattern_literals in enumerate(compiled.pattern_literals):
+                if pattern_literals and not (pattern_literals & present):
+                    skip_patterns.add((compiled.id, index))
+
+    scanner = StreamScanner(pack, policies, match_keywords, max_carry_chars=None, skip_patterns=skip_patterns)
+    for offset in range(0, len(text), chunk_chars):
+        _, found = scanner.feed(text[offset:offset + chunk_chars])
+        if stop_on_block and any(match[7] == "BLOCK" for match in found):
+            return resolve_overlaps(scanner.resolved + scanner.unreleased_matches(), text), True
+    scanner.finish()
+    return scanner.resolved, False
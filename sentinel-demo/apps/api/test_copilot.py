@@ -0,0 +1,67 @@
+"""
+Unit tests for the copilot payload envelope
+"""
+import json
+
+from pydantic import ValidationError
+
+from copilot import copilot_platform_metadata, describe_payload_error, parse_copilot_payload
+
+
+PAYLOAD = {
+    "platform": "Microsoft 365 Copilot",
+    "user": {"id": "u_1", "email": "sarah@contoso.com", "displayName": "Sarah", "department": "Finance", "role": "Analyst"},
+    "workload": "Microsoft Teams",
+    "sensitivity_label": "Confidential - Internal",
+    "action": {"type": "generate_summary", "request": "Summarize", "context": {"conversation_id": "c1", "topic": "Q4", "message_count": 47}},
+    "compliance_flags": ["financial_data"],
+    "content_preview": "Budget numbers",
+}
+
+
+def test_parse_keeps_typed_and_extra_fields():
+    """Test: Typed fields are validated and unknown fields are preserved"""
+    envelope = parse_copilot_payload(json.dumps(PAYLOAD))
+    assert envelope.user.department == "Finance"
+    assert envelope.action.context["message_count"] == 47
+    assert envelope.user.model_extra == {"displayName": "Sarah"}
+    print("✓ test_parse_keeps_typed_and_extra_fields passed")
+
+
+def test_platform_metadata():
+    """Test: Platform metadata matches the SIEM export format, with defaults for missing fields"""
+    metadata = copilot_platform_metadata(parse_copilot_payload(json.dumps(PAYLOAD)))
+    assert metadata == {
+        "platform": "Microsoft 365 Copilot",
+        "workload": "Microsoft Teams",
+        "sensitivity_label": "Confidential - Internal",
+        "user": {"id": "u_1", "email": "sarah@contoso.com", "department": "Finance", "role": "Analyst"},
+        "action_type": "generate_summary",
+        "compliance_flags": ["financial_data"],
+        "action_context": {"conversation_id": "c1", "topic": "Q4"},
+    }
+    minimal = copilot_platform_metadata(parse_copilot_payload("{}"))
+    assert minimal["platform"] == "Unknown"
+    assert minimal["compliance_flags"] == [] and minimal["action_context"] is None
+    print("✓ test_platform_metadata passed")
+
+
+def test_invalid_payloads_rejected():
+    """Test: Malformed JSON and payloads with the wrong shape raise ValidationError"""
+    for content, expected in [("{", "Invalid JSON"), ("[]", "object"), ('{"compliance_flags": [1]}', "compliance_flags.0")]:
+        try:
+            parse_copilot_payload(content)
+            raise AssertionError(f"ValidationError was not raised for {content!r}")
+        except ValidationError as e:
+            assert expected in describe_payload_error(e), describe_payload_error(e)
+    print("✓ test_invalid_payloads_rejected passed")
+
+
+if __name__ == "__main__":
+    print("Running copilot envelope unit tests...\n")
+
+    test_parse_keeps_typed_and_extra_fields()
+    test_platform_metadata()
+    test_invalid_payloads_rejected()
+
+    print("\n✓ All tests passed!")
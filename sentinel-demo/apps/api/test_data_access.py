@@ -0,0 +1,96 @@
+"""
+Unit tests for the Supabase query executor
+"""
+import asyncio
+import threading
+import time
+
+from data_access import QueryExecutor
+
+
+class FakeQuery:
+    """Stand-in for a supabase query builder whose execute() blocks like a PostgREST round trip"""
+
+    def __init__(self, value, delay=0.05, error=None, barrier=None, release=None):
+        self.value = value
+        self.delay = delay
+        self.error = error
+        self.barrier = barrier
+        self.release = release
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread().name
+        if self.barrier is not None:
+            # Raises BrokenBarrierError unless every party is in flight at the same time
+            self.barrier.wait(timeout=5)
+        if self.release is not None:
+            assert self.release.wait(timeout=5), "The event loop never released the query"
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def test_queries_do_not_block_event_loop():
+    """Test: Independent queries run concurrently off the event loop and keep argument order"""
+    db = QueryExecutor(max_workers=4)
+
+    # All four queries must reach the barrier together, then wait for the loop to release them
+    barrier, release = threading.Barrier(4), threading.Event()
+    queries = [FakeQuery(i, delay=0, barrier=barrier, release=release) for i in range(4)]
+
+    async def scenario():
+        pending = asyncio.gather(*(db.execute(query) for query in queries))
+        # A query running on the loop thread would never let this coroutine set the event
+        while db.status()["in_flight"] < 4 and not pending.done():
+            await asyncio.sleep(0.001)
+        release.set()
+        return await pending
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3]
+    assert db.status()["max_in_flight"] == 4
+    assert all(q.thread.startswith("supabase") for q in queries)
+    db.shutdown()
+    print("✓ test_queries_do_not_block_event_loop passed")
+
+
+def test_concurrency_is_bounded():
+    """Test: No more than max_workers queries are in flight at once"""
+    db = QueryExecutor(max_workers=2)
+
+    async def scenario():
+        return await asyncio.gather(*(db.execute(FakeQuery(i, delay=0.02)) for i in range(6)))
+
+    assert asyncio.run(scenario()) == list(range(6))
+    status = db.status()
+    assert status["max_in_flight"] == 2 and status["queries"] == 6 and status["in_flight"] == 0
+    db.shutdown()
+    print("✓ test_concurrency_is_bounded passed")
+
+
+def test_errors_propagate():
+    """Test: A failing query raises in the awaiting handler and is counted"""
+    db = QueryExecutor(max_workers=2)
+
+    async def scenario():
+        try:
+            await db.execute(FakeQuery(None, delay=0, error=RuntimeError("connection reset")))
+            raise AssertionError("RuntimeError was not raised")
+        except RuntimeError as e:
+            assert str(e) == "connection reset"
+
+    asyncio.run(scenario())
+    assert db.status()["errors"] == 1
+    db.shutdown()
+    print("✓ test_errors_propagate passed")
+
+
+if __name__ == "__main__":
+    print("Running Supabase query executor unit tests...\n")
+
+    test_queries_do_not_block_event_loop()
+    test_concurrency_is_bounded()
+    test_errors_propagate()
+
+    print("\n✓ All tests passed!")
@@ -0,0 +1,143 @@
+"""
+Unit tests for the background job queue
+"""
+import asyncio
+
+from jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, QueueFull
+
+
+async def _settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_job_succeeds_with_result():
+    """Test: A job runs in the background and records its result and progress"""
+    async def handler(job):
+        job.progress = 0.5
+        await asyncio.sleep(0)
+        return f"run-{job.payload}"
+
+    async def scenario():
+        queue = JobQueue(handler, max_queued=5, concurrency=1)
+        job = queue.submit("a")
+        assert job.status == QUEUED
+        await _settle()
+        assert job.status == SUCCEEDED and job.result == "run-a" and job.progress == 1.0
+        await queue.shutdown()
+
+    asyncio.run(scenario())
+    print("✓ test_job_succeeds_with_result passed")
+
+
+def test_queue_bound_and_concurrency():
+    """Test: At most `concurrency` jobs run at once and a full queue rejects new jobs"""
+    release = None
+
+    async def handler(job):
+        await release.wait()
+        return job.payload
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        queue = JobQueue(handler, max_queued=2, concurrency=1)
+        jobs = [queue.submit(i) for i in range(2)]
+        await _settle()
+        assert [j.status for j in jobs] == [RUNNING, QUEUED]
+        queue.submit(2)
+        try:
+            queue.submit(3)
+            raise AssertionError("QueueFull was not raised")
+        except QueueFull:
+            pass
+        release.set()
+        await _settle()
+        assert all(j.status == SUCCEEDED for j in jobs)
+        assert queue.status()["stats"]["rejected"] == 1
+        await queue.shutdown()
+
+    asyncio.run(scenario())
+    print("✓ test_queue_bound_and_concurrency passed")
+
+
+def test_cancel_queued_and_running_jobs():
+    """Test: Cancelled jobs never produce a result, whether queued or already running"""
+    finished = []
+
+    async def handler(job):
+        await asyncio.sleep(10)
+        finished.append(job.payload)
+
+    async def scenario():
+        queue = JobQueue(handler, max_queued=5, concurrency=1)
+        running, queued = queue.submit("running"), queue.submit("queued")
+        await _settle()
+        assert running.status == RUNNING
+        queue.cancel(queued.id)
+        queue.cancel(running.id)
+        await _settle()
+        assert running.status == CANCELLED and queued.status == CANCELLED
+        assert finished == [] and running.result is None
+        await queue.shutdown()
+
+    asyncio.run(scenario())
+    print("✓ test_cancel_queued_and_running_jobs passed")
+
+
+def test_job_not_cancellable_while_persisting():
+    """Test: Once a handler clears job.cancellable, cancel and shutdown let it run to completion"""
+    release = None
+    persisted = []
+
+    async def handler(job):
+        job.cancellable = False
+        await release.wait()
+        persisted.append(job.payload)
+        return job.payload
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        queue = JobQueue(handler, max_queued=5, concurrency=1)
+        job = queue.submit("a")
+        await _settle()
+        queue.cancel(job.id)
+        await _settle()
+        assert job.status == RUNNING
+        asyncio.get_running_loop().call_soon(release.set)
+        await queue.shutdown()
+        assert job.status == SUCCEEDED and persisted == ["a"]
+
+    asyncio.run(scenario())
+    print("✓ test_job_not_cancellable_while_persisting passed")
+
+
+def test_failures_and_retention():
+    """Test: Handler errors mark the job failed, and only `retain` finished jobs are kept"""
+    async def handler(job):
+        raise ValueError("boom")
+
+    async def scenario():
+        queue = JobQueue(handler, max_queued=5, concurrency=1, retain=2)
+        jobs = [queue.submit(i) for i in range(3)]
+        await _settle()
+        assert all(j.status == FAILED and j.error == "boom" for j in jobs)
+        assert queue.get(jobs[0].id) is None
+        assert queue.get(jobs[2].id) is jobs[2]
+        await queue.shutdown()
+
+    asyncio.run(scenario())
+    print("✓ test_failures_and_retention passed")
+
+
+if __name__ == "__main__":
+    print("Running job queue unit tests...\n")
+
+    test_job_succeeds_with_result()
+    test_queue_bound_and_concurrency()
+    test_cancel_queued_and_running_jobs()
+    test_job_not_cancellable_while_persisting()
+    test_failures_and_retention()
+
+    print("\n✓ All tests passed!")
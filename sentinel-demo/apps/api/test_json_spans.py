@@ -0,0 +1,75 @@
+"""
+Unit tests for the single-pass JSON span index
+"""
+import json
+
+from json_spans import index_json_spans
+
+
+PAYLOAD = """{
+  "event_id": "evt_001",
+  "user": {"id": "u_1", "department": "Finance", "role": "Analyst \\"Lead\\""},
+  "sensitivity_label": "Confidential - Internal",
+  "compliance_flags": ["pii", "financial_data", {"nested": [1, -2.5e3, true, null]}],
+  "workload" : "Teams",
+  "empty_object": {}, "empty_array": [],
+  "content_preview": "caf\\u00e9 \\\\ \\"quoted\\" déjà vu"
+}"""
+
+
+def _value_at(data, path):
+    for part in path.split("."):
+        data = data[int(part)] if isinstance(data, list) else data[part]
+    return data
+
+
+def test_every_value_is_indexed():
+    """Test: Each indexed span parses back to the value at its path, including nested arrays"""
+    data = json.loads(PAYLOAD)
+    spans = index_json_spans(PAYLOAD)
+    for path, (start, end) in spans.items():
+        expected = data if path == "" else _value_at(data, path)
+        assert json.loads(PAYLOAD[start:end]) == expected, path
+    for path in ["user.department", "compliance_flags.1", "compliance_flags.2.nested.3", "empty_object", "empty_array", "content_preview"]:
+        assert path in spans, path
+    start, end = spans["compliance_flags.1"]
+    assert PAYLOAD[start:end] == '"financial_data"'
+    print("✓ test_every_value_is_indexed passed")
+
+
+def test_top_level_key_not_confused_with_nested_key():
+    """Test: A nested key with the same name does not shadow the top-level value"""
+    doc = '{"meta": {"workload": "Nested"}, "workload": "Top"}'
+    start, end = index_json_spans(doc)["workload"]
+    assert doc[start:end] == '"Top"'
+    print("✓ test_top_level_key_not_confused_with_nested_key passed")
+
+
+def test_duplicate_keys_keep_last_value():
+    """Test: Duplicate keys resolve to the last occurrence, like json.loads"""
+    doc = '{"a": 1, "a": 22}'
+    start, end = index_json_spans(doc)["a"]
+    assert doc[start:end] == "22"
+    print("✓ test_duplicate_keys_keep_last_value passed")
+
+
+def test_invalid_json_rejected():
+    """Test: Malformed documents raise ValueError"""
+    for doc in ['{"a": }', '{"a" 1}', '[1, 2', '{"a": 1,}', '']:
+        try:
+            index_json_spans(doc)
+            raise AssertionError(f"ValueError was not raised for {doc!r}")
+        except ValueError:
+            pass
+    print("✓ test_invalid_json_rejected passed")
+
+
+if __name__ == "__main__":
+    print("Running JSON span index unit tests...\n")
+
+    test_every_value_is_indexed()
+    test_top_level_key_not_confused_with_nested_key()
+    test_duplicate_keys_keep_last_value()
+    test_invalid_json_rejected()
+
+    print("\n✓ All tests passed!")
@@ -0,0 +1,146 @@
+"""
+Unit tests for the compiled policy pack cache
+"""
+import time
+
+from policy_cache import PolicyPackCache
+
+
+POLICIES = [
+    {
+        "id": "secrets-detection",
+        "name": "Secrets Policy",
+        "scope": ["code", "chat"],
+        "status": "ENABLED",
+        "version": 1,
+        "conditions": {"patterns": ["\\bAKIA[0-9A-Z]{16}\\b"]},
+        "action": "REDACT",
+    }
+]
+
+
+class FakePolicyStore:
+    """Counts calls so tests can assert when Supabase would be hit"""
+
+    def __init__(self):
+        self.fingerprint = (1, "2026-01-01T00:00:00", 1)
+        self.loads = 0
+        self.probes = 0
+        self.fail = False
+
+    def load(self, policy_pack_version):
+        self.loads += 1
+        if self.fail:
+            raise ConnectionError("supabase unavailable")
+        return list(POLICIES)
+
+    def probe(self, policy_pack_version):
+        self.probes += 1
+        if self.fail:
+            raise ConnectionError("supabase unavailable")
+        return self.fingerprint
+
+
+def test_fresh_entry_served_from_memory():
+    """Test: Repeated lookups within the TTL do not touch the store"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=60, stale_seconds=60)
+    pack = cache.get("v1")
+    for _ in range(10):
+        assert cache.get("v1") is pack
+    assert store.loads == 1 and store.probes == 1
+    assert pack.get("secrets-detection").patterns, "Patterns should be compiled with the pack"
+    print("✓ test_fresh_entry_served_from_memory passed")
+
+
+def test_unchanged_fingerprint_keeps_pack():
+    """Test: An expired entry whose fingerprint is unchanged is revalidated without reloading"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=0, stale_seconds=0)
+    pack = cache.get("v1")
+    assert cache.get("v1") is pack
+    assert store.loads == 1 and store.probes == 2
+    print("✓ test_unchanged_fingerprint_keeps_pack passed")
+
+
+def test_changed_fingerprint_reloads():
+    """Test: A policy edit (new fingerprint) produces a new compiled pack"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=0, stale_seconds=0)
+    pack = cache.get("v1")
+    store.fingerprint = (1, "2026-01-02T00:00:00", 2)
+    new_pack = cache.get("v1")
+    assert new_pack is not pack
+    assert new_pack.fingerprint == store.fingerprint
+    assert store.loads == 2
+    print("✓ test_changed_fingerprint_reloads passed")
+
+
+def test_stale_while_revalidate():
+    """Test: A stale entry is served immediately and refreshed in the background"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=0, stale_seconds=60)
+    pack = cache.get("v1")
+    assert cache.get("v1") is pack
+    # Wait for the background refresh to run
+    deadline = time.time() + 2
+    while store.probes < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.probes == 2
+    assert cache.status()["stats"]["stale_hits"] == 1
+    print("✓ test_stale_while_revalidate passed")
+
+
+def test_get_cached_never_touches_store():
+    """Test: get_cached() serves fresh and stale packs from memory and returns None instead of loading"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=60, stale_seconds=60)
+    assert cache.get_cached("v1") is None
+    assert store.loads == 0 and store.probes == 0
+    pack = cache.get("v1")
+    assert cache.get_cached("v1") is pack
+    assert store.probes == 1
+
+    expired = PolicyPackCache(store.load, store.probe, ttl_seconds=0, stale_seconds=0)
+    expired.get("v1")
+    probes = store.probes
+    assert expired.get_cached("v1") is None
+    assert store.probes == probes
+    print("✓ test_get_cached_never_touches_store passed")
+
+
+def test_stale_if_error():
+    """Test: Supabase errors during revalidation fall back to the last known pack"""
+    store = FakePolicyStore()
+    cache = PolicyPackCache(store.load, store.probe, ttl_seconds=0, stale_seconds=0)
+    pack = cache.get("v1")
+    store.fail = True
+    assert cache.get("v1") is pack
+    print("✓ test_stale_if_error passed")
+
+
+def test_error_without_cached_pack_raises():
+    """Test: The first load still surfaces Supabase errors"""
+    store = FakePolicyStore()
+    store.fail = True
+    cache = PolicyPackCache(store.load, store.probe)
+    try:
+        cache.get("v1")
+    except ConnectionError:
+        print("✓ test_error_without_cached_pack_raises passed")
+        return
+    raise AssertionError("Expected ConnectionError when no pack is cached")
+
+
+if __name__ == "__main__":
+    print("Running policy cache unit tests...\n")
+
+    test_fresh_entry_served_from_memory()
+    test_unchanged_fingerprint_keeps_pack()
+    test_changed_fingerprint_reloads()
+    test_stale_while_revalidate()
+    test_get_cached_never_touches_store()
+    test_stale_if_error()
+    test_error_without_cached_pack_raises()
+
+    print("\n✓ All tests passed!")
@@ -1,6 +1,7 @@
 """
 Unit tests for redaction logic
 """
+from redaction import build_redacted_output, splice_replacements
 
 
 def extract_value_span(matched_text: str, match_start: int, match_end: int):
@@ -144,6 +145,51 @@ def test_multiple_matches():
     print("✓ test_multiple_matches passed")
 
 
+def test_build_redacted_output_preserves_keys():
+    """Test: Single-pass builder keeps KEY=[REDACTED] / Header: [REDACTED] semantics"""
+    content = "JWT_SIGNING_KEY=abc123\nAPI_KEY: my_secret\ncontact jane@contoso.com today"
+    matches = []
+    for matched in ["JWT_SIGNING_KEY=abc123", "API_KEY: my_secret", "jane@contoso.com"]:
+        start = content.find(matched)
+        end = start + len(matched)
+        value_start, value_end, value_span = extract_value_span(matched, start, end)
+        matches.append((start, end, matched, value_start, value_end, value_span, "Secrets Policy", "REDACT"))
+    
+    result = build_redacted_output(content, matches)
+    assert result == "JWT_SIGNING_KEY=[REDACTED]\nAPI_KEY: [REDACTED]\ncontact [REDACTED] today", f"Unexpected output '{result}'"
+    
+    # Same result as applying redactions one by one from end -> start
+    expected = content
+    for start, end, matched, *_ in sorted(matches, key=lambda m: m[0], reverse=True):
+        expected = apply_redaction(expected, start, end, matched)
+    assert result == expected, "Builder should match sequential redaction"
+    print("✓ test_build_redacted_output_preserves_keys passed")
+
+
+def test_build_redacted_output_many_matches():
+    """Test: Thousands of redactions are applied in one pass"""
+    lines = [f"user{i}@example.com" for i in range(5000)]
+    content = "\n".join(lines)
+    matches = []
+    start = 0
+    for line in lines:
+        matches.append((start, start + len(line), line, start, start + len(line), line, "Sensitive Data Policy", "REDACT"))
+        start += len(line) + 1
+    result = build_redacted_output(content, matches)
+    assert result == "\n".join(["[REDACTED]"] * 5000)
+    print("✓ test_build_redacted_output_many_matches passed")
+
+
+def test_splice_replacements_skips_duplicate_spans():
+    """Test: Duplicate spans (same field flagged by several policies) are replaced once"""
+    content = '{"sensitivity_label": "Confidential - Internal", "workload": "Teams"}'
+    start = content.find('"Confidential')
+    end = start + len('"Confidential - Internal"')
+    result = splice_replacements(content, [(start, end, '"[REDACTED]"'), (start, end, '"[REDACTED]"')])
+    assert result == '{"sensitivity_label": "[REDACTED]", "workload": "Teams"}', f"Unexpected output '{result}'"
+    print("✓ test_splice_replacements_skips_duplicate_spans passed")
+
+
 if __name__ == "__main__":
     print("Running redaction unit tests...\n")
     
@@ -153,5 +199,8 @@ if __name__ == "__main__":
     test_bare_token_redaction()
     test_colon_delimiter_redaction()
     test_multiple_matches()
+    test_build_redacted_output_preserves_keys()
+    test_build_redacted_output_many_matches()
+    test_splice_replacements_skips_duplicate_spans()
     
     print("\n✓ All tests passed!")
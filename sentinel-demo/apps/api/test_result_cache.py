@@ -0,0 +1,95 @@
+"""
+Unit tests for the evaluation result cache
+"""
+import json
+import time
+
+from result_cache import ResultCache
+
+
+RESULT = {"verdict": "REDACTED", "annotations": [{"span": "123-45-6789"}], "events": [{"event_type": "Policy Evaluated"}]}
+
+
+def test_hit_returns_independent_copy():
+    """Test: A repeated input hits the cache and callers cannot mutate the cached result"""
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    key = cache.key("ssn 123-45-6789", "chat", None, "v1", "hash-1")
+    assert cache.get(key) is None
+    cache.put(key, RESULT)
+    hit = cache.get(key)
+    assert hit == RESULT
+    hit["annotations"].clear()
+    assert cache.get(key) == RESULT
+    assert cache.status()["stats"]["hits"] == 2 and cache.status()["stats"]["misses"] == 1
+    assert cache.key("ssn 123-45-6789", "file", None, "v1", "hash-1") != key
+    print("✓ test_hit_returns_independent_copy passed")
+
+
+def test_lru_eviction_and_ttl():
+    """Test: The least recently used entry is evicted at capacity and entries expire after the TTL"""
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    keys = [cache.key(f"input {i}", "chat", None, "v1", "hash-1") for i in range(3)]
+    cache.put(keys[0], RESULT)
+    cache.put(keys[1], RESULT)
+    cache.get(keys[0])
+    cache.put(keys[2], RESULT)
+    assert cache.get(keys[1]) is None and cache.get(keys[0]) is not None
+    assert cache.status()["stats"]["evictions"] == 1
+
+    short = ResultCache(max_entries=2, ttl_seconds=0.01)
+    key = short.key("input", "chat", None, "v1", "hash-1")
+    short.put(key, RESULT)
+    time.sleep(0.02)
+    assert short.get(key) is None and short.status()["stats"]["expired"] == 1
+    print("✓ test_lru_eviction_and_ttl passed")
+
+
+def test_size_bound_evicts_by_bytes():
+    """Test: Entries are evicted once their total size exceeds max_bytes, and oversized results are not kept"""
+    big = {"baseline_output": "x" * 1000, "governed_output": "x" * 1000, "annotations": []}
+    size = len(json.dumps(big))
+    cache = ResultCache(max_entries=100, ttl_seconds=60, max_bytes=size * 3)
+    keys = [cache.key(f"input {i}", "chat", None, "v1", "hash-1") for i in range(5)]
+    for key in keys:
+        cache.put(key, big)
+    assert cache.status()["entries"] == 3 and cache.status()["bytes"] <= size * 3
+    assert cache.get(keys[0]) is None and cache.get(keys[4]) is not None
+    assert cache.status()["stats"]["evictions"] == 2
+
+    tiny = ResultCache(max_entries=100, ttl_seconds=60, max_bytes=size - 1)
+    tiny.put(keys[0], big)
+    assert tiny.status()["entries"] == 0 and tiny.status()["bytes"] == 0
+    print("✓ test_size_bound_evicts_by_bytes passed")
+
+
+def test_pack_change_invalidates_entries():
+    """Test: Seeing a new pack content hash drops results computed with the previous pack"""
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    old_key = cache.key("input", "chat", None, "v1", "hash-1")
+    cache.put(old_key, RESULT)
+    new_key = cache.key("input", "chat", None, "v1", "hash-2")
+    assert cache.get(new_key) is None
+    assert cache.status()["entries"] == 0 and cache.status()["stats"]["invalidations"] == 1
+    # A late result from the replaced pack is not stored
+    cache.put(old_key, RESULT)
+    assert cache.status()["entries"] == 0
+    print("✓ test_pack_change_invalidates_entries passed")
+
+
+def test_large_inputs_and_disabled_cache_skipped():
+    """Test: Inputs over max_input_chars, and every input when disabled, are not cached"""
+    assert ResultCache(max_entries=10, max_input_chars=5).key("too long", "chat", None, "v1", "h") is None
+    assert ResultCache(max_entries=0).key("x", "chat", None, "v1", "h") is None
+    print("✓ test_large_inputs_and_disabled_cache_skipped passed")
+
+
+if __name__ == "__main__":
+    print("Running result cache unit tests...\n")
+
+    test_hit_returns_independent_copy()
+    test_lru_eviction_and_ttl()
+    test_size_bound_evicts_by_bytes()
+    test_pack_change_invalidates_entries()
+    test_large_inputs_and_disabled_cache_skipped()
+
+    print("\n✓ All tests passed!")
@@ -0,0 +1,59 @@
+"""
+Unit tests for the immutable run read cache
+"""
+from run_cache import RunCache, etag_matches, make_etag
+
+
+def _run(run_id, content="hello"):
+    run = {"id": run_id, "verdict": "ALLOWED", "input_content": content, "meta": {"annotations": []}}
+    events = [{"id": f"{run_id}-e1", "run_id": run_id, "seq": 1, "event_type": "Run Started", "payload": {}}]
+    return run, events
+
+
+def test_put_and_get_with_stable_etag():
+    """Test: Cached runs are served from memory with an ETag derived from their content"""
+    cache = RunCache(max_bytes=10000)
+    entry = cache.put("a", *_run("a"))
+    assert cache.get("a") is entry and cache.get("b") is None
+    assert entry.etag.startswith('"') and entry.etag.endswith('"')
+    assert RunCache().put("a", *_run("a")).etag == entry.etag
+    assert RunCache().put("a", *_run("a", content="changed")).etag != entry.etag
+    assert cache.status()["stats"] == {"hits": 1, "misses": 1, "evictions": 0}
+    print("✓ test_put_and_get_with_stable_etag passed")
+
+
+def test_size_bound_evicts_least_recently_used():
+    """Test: The cache stays within max_bytes, evicting the least recently read runs first"""
+    size = RunCache().put("a", *_run("a")).size
+    cache = RunCache(max_bytes=size * 2)
+    cache.put("a", *_run("a"))
+    cache.put("b", *_run("b"))
+    cache.get("a")
+    cache.put("c", *_run("c"))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    assert cache.status()["bytes"] <= size * 2
+    # A run larger than the whole budget is not kept, but still gets an ETag
+    big = cache.put("big", *_run("big", content="x" * size * 3))
+    assert big.etag and cache.get("big") is None
+    print("✓ test_size_bound_evicts_least_recently_used passed")
+
+
+def test_if_none_match_parsing():
+    """Test: If-None-Match matches lists, weak validators and the wildcard"""
+    etag = make_etag("run")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    print("✓ test_if_none_match_parsing passed")
+
+
+if __name__ == "__main__":
+    print("Running run cache unit tests...\n")
+
+    test_put_and_get_with_stable_etag()
+    test_size_bound_evicts_least_recently_used()
+    test_if_none_match_parsing()
+
+    print("\n✓ All tests passed!")
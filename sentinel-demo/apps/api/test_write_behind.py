@@ -0,0 +1,152 @@
+"""
+Unit tests for the write-behind persistence queue
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+from write_behind import WriteBehindFull, WriteBehindQueue
+
+
+def _records(run_id, event_count=2):
+    run = {"id": run_id, "verdict": "SHIPPABLE"}
+    events = [{"run_id": run_id, "seq": seq, "event_type": "Run Started"} for seq in range(1, event_count + 1)]
+    return run, events
+
+
+class FakeStore:
+    """Idempotent stand-in for the runs/run_events tables"""
+
+    def __init__(self, failures=0):
+        self.runs = {}
+        self.events = {}
+        self.batches = []
+        self.failures = failures
+
+    async def persist(self, runs, events):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("PostgREST unavailable")
+        self.batches.append(len(runs))
+        for run in runs:
+            self.runs.setdefault(run["id"], run)
+        for event in events:
+            self.events.setdefault(event["id"], event)
+
+
+def test_batched_flush_and_lookup():
+    """Test: Submitted runs are readable while queued and persisted in batches"""
+    store = FakeStore()
+
+    async def scenario():
+        queue = WriteBehindQueue(store.persist, batch_size=2, flush_interval=0.01)
+        await queue.start()
+        for i in range(5):
+            run, events = _records(f"r{i}")
+            queue.submit([run], events)
+        assert queue.lookup("r4")[0]["id"] == "r4" and len(queue.lookup("r4")[1]) == 2
+        assert queue.status()["depth"] == 5
+        await asyncio.sleep(0.05)
+        assert queue.status()["depth"] == 0 and queue.lookup("r4") is None
+        await queue.shutdown()
+
+    asyncio.run(scenario())
+    assert len(store.runs) == 5 and len(store.events) == 10
+    assert store.batches == [2, 2, 1]
+    print("✓ test_batched_flush_and_lookup passed")
+
+
+def test_queue_bound():
+    """Test: Submitting beyond max_queued raises WriteBehindFull without queueing anything"""
+    store = FakeStore()
+
+    async def scenario():
+        queue = WriteBehindQueue(store.persist, max_queued=2, flush_interval=10)
+        await queue.start()
+        run, events = _records("a")
+        queue.submit([run], events)
+        runs = [_records("b")[0], _records("c")[0]]
+        try:
+            queue.submit(runs, [])
+            raise AssertionError("WriteBehindFull was not raised")
+        except WriteBehindFull:
+            pass
+        assert queue.status()["depth"] == 1 and queue.status()["stats"]["rejected"] == 2
+        await queue.shutdown()  # flushes the queued run
+
+    asyncio.run(scenario())
+    assert list(store.runs) == ["a"]
+    print("✓ test_queue_bound passed")
+
+
+def test_spool_replay_after_crash():
+    """Test: Runs that were spooled but never acknowledged are replayed on the next start"""
+    spool_path = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    down = FakeStore(failures=1000)
+    store = FakeStore()
+
+    async def crashed():
+        queue = WriteBehindQueue(down.persist, spool_path=spool_path, flush_interval=10)
+        await queue.start()
+        for run_id in ("a", "b"):
+            run, events = _records(run_id)
+            queue.submit([run], events)
+        # The process dies here without shutdown(); a torn final line is left behind
+        queue._spool.write('{"run": {"id": "torn"')
+        queue._spool.close()
+        queue._task.cancel()
+
+    async def restarted():
+        queue = WriteBehindQueue(store.persist, spool_path=spool_path, flush_interval=0.01)
+        assert await queue.start() == 2
+        await asyncio.sleep(0.05)
+        await queue.shutdown()
+
+    asyncio.run(crashed())
+    asyncio.run(restarted())
+    assert sorted(store.runs) == ["a", "b"] and len(store.events) == 4
+    assert os.path.getsize(spool_path) == 0  # everything acknowledged
+    print("✓ test_spool_replay_after_crash passed")
+
+
+def test_failed_flush_is_retried_and_kept_in_spool():
+    """Test: A failing flush is retried; runs still unpersisted at shutdown remain in the spool"""
+    spool_path = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    flaky = FakeStore(failures=1)
+    down = FakeStore(failures=1000)
+
+    async def retried():
+        queue = WriteBehindQueue(flaky.persist, spool_path=spool_path, flush_interval=0.01)
+        await queue.start()
+        run, events = _records("a")
+        queue.submit([run], events)
+        await asyncio.sleep(0.1)
+        assert queue.status()["stats"]["failures"] == 1
+        await queue.shutdown()
+
+    async def unavailable():
+        queue = WriteBehindQueue(down.persist, spool_path=spool_path, flush_interval=10)
+        await queue.start()
+        run, events = _records("b")
+        queue.submit([run], events)
+        await queue.shutdown()
+
+    asyncio.run(retried())
+    assert list(flaky.runs) == ["a"]
+    asyncio.run(unavailable())
+    with open(spool_path) as spool:
+        spooled = [json.loads(line) for line in spool]
+    assert [entry["run"]["id"] for entry in spooled if "run" in entry] == ["b"]
+    print("✓ test_failed_flush_is_retried_and_kept_in_spool passed")
+
+
+if __name__ == "__main__":
+    print("Running write-behind queue unit tests...\n")
+
+    test_batched_flush_and_lookup()
+    test_queue_bound()
+    test_spool_replay_after_crash()
+    test_failed_flush_is_retried_and_kept_in_spool()
+
+    print("\n✓ All tests passed!")
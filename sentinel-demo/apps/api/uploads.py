@@ -0,0 +1,79 @@
+"""
+Spooling and reading of uploaded documents.
+
+Uploaded bodies are written to a temporary file as they arrive (so a large
+document never sits in memory as request bytes, a JSON string and a parsed
+model at the same time) and read back through a memory-mapped buffer.
+Decoding the mapped file yields the same text a JSON client would have sent,
+so match offsets stay compatible with Annotation.start/end.
+"""
+import mmap
+import os
+import tempfile
+from typing import AsyncIterator
+
+
+# Allowance for multipart boundaries and part headers when limiting a whole multipart body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+async def limit_body(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Pass request body chunks through, stopping as soon as more than max_bytes have arrived.
+
+    Raises:
+        UploadTooLarge: If the body exceeds max_bytes (before the rest of it is read)
+    """
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the maximum of {max_bytes} bytes")
+        yield chunk
+
+
+async def spool_to_tempfile(chunks: AsyncIterator[bytes], max_bytes: int) -> str:
+    """
+    Write an uploaded body to a temporary file.
+
+    Args:
+        chunks: Body chunks as they arrive
+        max_bytes: Maximum accepted size in bytes
+
+    Returns:
+        Path of the temporary file (the caller removes it)
+
+    Raises:
+        UploadTooLarge: If the body exceeds max_bytes (the partial file is removed)
+    """
+    fd, path = tempfile.mkstemp(prefix="sentinel-upload-", suffix=".bin")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as spool:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds the maximum of {max_bytes} bytes")
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def read_spooled_text(path: str) -> str:
+    """
+    Decode a spooled upload as UTF-8 through a memory-mapped buffer (no intermediate bytes copy).
+
+    Raises:
+        UnicodeDecodeError: If the upload is not valid UTF-8 text
+    """
+    with open(path, "rb") as spool:
+        if os.fstat(spool.fileno()).st_size == 0:
+            return ""  # empty files cannot be mapped
+        with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return str(buffer, "utf-8")
@@ -6,6 +6,10 @@ Ensures consistent verdict assignment across API and UI.
 # Canonical verdict set (hard requirement)
 CANONICAL_VERDICTS = {"ALLOWED", "REDACTED", "HELD_FOR_REVIEW", "BLOCKED"}
 
+# Action priority used when matches compete for the same span (higher wins)
+# Mirrors the verdict priority below: BLOCK > REVIEW > REDACT
+ACTION_PRIORITY = {"BLOCK": 3, "REVIEW": 2, "REDACT": 1}
+
 def policy_action_to_verdict(actions: list) -> str:
     """
     Map policy actions to canonical verdict.
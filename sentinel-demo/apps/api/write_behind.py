@@ -0,0 +1,221 @@
+"""
+Write-behind persistence for runs and run_events.
+
+In write-behind mode a handler returns the verdict as soon as the records are
+queued; a background task persists them:
+- The queue is bounded (max_queued runs); when it is full submit() raises
+  WriteBehindFull and the caller persists synchronously instead
+- Queued runs are flushed in batches of up to batch_size runs, one bulk
+  write per batch, after waiting up to flush_interval for a batch to fill
+- Every submitted record is appended to a JSONL spool file before submit()
+  returns, and acknowledged there once persisted. Records that were never
+  acknowledged (crash, failed flush at shutdown) are replayed on startup
+- Failed flushes are retried with backoff; the persist callable must be
+  idempotent, because a batch can be written again after a partial failure
+  or a replay (event rows are given ids at submit time for that reason)
+
+Runs that are still queued can be looked up with lookup(), so a run can be
+read back right after it was created.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class WriteBehindFull(Exception):
+    """Raised when runs are submitted while the write-behind queue is at capacity"""
+
+
+class WriteBehindQueue:
+    """
+    Bounded, spooled queue of run records persisted by a background task.
+
+    Args:
+        persist: Async callable taking (runs, events) lists and writing them idempotently
+        spool_path: JSONL file used for durability and replay (None keeps records in memory only)
+        max_queued: Maximum number of runs waiting to be persisted
+        batch_size: Maximum number of runs written per flush
+        flush_interval: Seconds to wait for a batch to fill before flushing a partial one
+        fsync: Also fsync the spool after each append (survives power loss, not just a crash)
+    """
+
+    def __init__(
+        self,
+        persist: Callable[[List[dict], List[dict]], Awaitable[Any]],
+        spool_path: Optional[str] = None,
+        max_queued: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 0.2,
+        fsync: bool = False,
+        max_retry_seconds: float = 30.0,
+    ):
+        self._persist = persist
+        self.spool_path = spool_path
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_retry_seconds = max_retry_seconds
+        self._pending: "OrderedDict[str, Tuple[dict, List[dict], float]]" = OrderedDict()  # run_id -> (run, events, queued_at)
+        self._spool = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"submitted": 0, "persisted": 0, "batches": 0, "failures": 0, "rejected": 0, "replayed": 0}
+
+    async def start(self) -> int:
+        """
+        Replay unacknowledged spooled records and start the background flusher.
+
+        Returns:
+            Number of replayed runs
+        """
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        replayed = self._replay_spool()
+        if replayed:
+            print(f"[WRITE_BEHIND] replaying {replayed} unpersisted runs from {self.spool_path}")
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._flusher())
+        return replayed
+
+    def _replay_spool(self) -> int:
+        if not self.spool_path:
+            return 0
+        records: "OrderedDict[str, Tuple[dict, List[dict]]]" = OrderedDict()
+        if os.path.exists(self.spool_path):
+            with open(self.spool_path, "r", encoding="utf-8") as spool:
+                for line in spool:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line torn by a crash mid-append
+                    if "ack" in entry:
+                        for run_id in entry["ack"]:
+                            records.pop(run_id, None)
+                    else:
+                        records[entry["run"]["id"]] = (entry["run"], entry["events"])
+        # Rewrite the spool with only the records still to be persisted
+        compacted = self.spool_path + ".tmp"
+        with open(compacted, "w", encoding="utf-8") as spool:
+            for run, events in records.values():
+                spool.write(json.dumps({"run": run, "events": events}) + "\n")
+        os.replace(compacted, self.spool_path)
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+        now = time.monotonic()
+        for run_id, (run, events) in records.items():
+            self._pending[run_id] = (run, events, now)
+        self.stats["replayed"] += len(records)
+        return len(records)
+
+    def _append(self, entries: List[dict]):
+        if self._spool is None:
+            return
+        self._spool.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def submit(self, runs: List[dict], events: List[dict]):
+        """
+        Queue runs and their events for persistence (all or nothing).
+
+        Raises:
+            WriteBehindFull: If the runs do not fit in the queue
+        """
+        if self._task is None:
+            raise WriteBehindFull("write-behind queue is not running")
+        if len(self._pending) + len(runs) > self.max_queued:
+            self.stats["rejected"] += len(runs)
+            raise WriteBehindFull(f"write-behind queue is full ({len(self._pending)}/{self.max_queued} runs)")
+        events_by_run: Dict[str, List[dict]] = {run["id"]: [] for run in runs}
+        for event in events:
+            event.setdefault("id", str(uuid.uuid4()))
+            events_by_run[event["run_id"]].append(event)
+        self._append([{"run": run, "events": events_by_run[run["id"]]} for run in runs])
+        now = time.monotonic()
+        for run in runs:
+            self._pending[run["id"]] = (run, events_by_run[run["id"]], now)
+        self.stats["submitted"] += len(runs)
+        self._wakeup.set()
+
+    def lookup(self, run_id: str) -> Optional[Tuple[dict, List[dict]]]:
+        """Return (run, events) for a run that is still queued, or None"""
+        entry = self._pending.get(run_id)
+        return (entry[0], entry[1]) if entry is not None else None
+
+    async def _flusher(self):
+        retry_seconds = self.flush_interval or 0.1
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.batch_size:
+                await asyncio.sleep(self.flush_interval)  # let a batch fill up
+            try:
+                await self.flush()
+                retry_seconds = self.flush_interval or 0.1
+            except Exception as e:
+                print(f"[WRITE_BEHIND] flush failed, {len(self._pending)} runs queued, retrying in {retry_seconds:.2f}s: {e}")
+                await asyncio.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, self.max_retry_seconds)
+                self._wakeup.set()
+
+    async def flush(self):
+        """Persist everything queued so far, one batch at a time (raises if a batch fails)"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = list(islice(self._pending.items(), self.batch_size))
+                runs = [run for _, (run, _, _) in batch]
+                events = [event for _, (_, run_events, _) in batch for event in run_events]
+                try:
+                    await self._persist(runs, events)
+                except Exception:
+                    self.stats["failures"] += 1
+                    raise
+                for run_id, _ in batch:
+                    del self._pending[run_id]
+                self.stats["persisted"] += len(batch)
+                self.stats["batches"] += 1
+                self._acknowledge([run_id for run_id, _ in batch])
+
+    def _acknowledge(self, run_ids: List[str]):
+        if self._spool is None:
+            return
+        if self._pending:
+            self._append([{"ack": run_ids}])
+        else:
+            # Nothing left to replay: start the spool over instead of growing it
+            self._spool.seek(0)
+            self._spool.truncate()
+
+    async def shutdown(self):
+        """Stop the flusher and flush what is still queued; unflushed runs stay in the spool"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[WRITE_BEHIND] {len(self._pending)} runs left in {self.spool_path} for replay: {e}")
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def status(self) -> dict:
+        """Describe queue configuration, depth and metrics for debugging"""
+        oldest = next(iter(self._pending.values()), None)
+        return {
+            "max_queued": self.max_queued,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "spool_path": self.spool_path,
+            "depth": len(self._pending),
+            "oldest_age_seconds": round(time.monotonic() - oldest[2], 3) if oldest else None,
+            "stats": dict(self.stats),
+        }
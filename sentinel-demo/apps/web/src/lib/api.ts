@@ -43,8 +43,14 @@ import type {
     getInsights: (): Promise<{ status: string; generated_at: string; insights: Array<{ id: string; severity: string; title: string; detail: string; is_placeholder: boolean }> }> =>
       fetchAPI('/v1/insights'),
     
-    getInvestigateRuns: (): Promise<{ runs: Array<{ id: string; created_at: string; verdict: string; input_type: string; input_preview: string | null; policy_pack_version: string; meta: Record<string, any> }> }> =>
-      fetchAPI('/v1/investigate/runs'),
+    getInvestigateRuns: (params?: { verdict?: string; cursor?: string; limit?: number }): Promise<{ runs: Array<{ id: string; created_at: string; verdict: string; input_type: string; input_preview: string | null; policy_pack_version: string; meta: Record<string, any> }>; next_cursor: string | null }> => {
+      const query = new URLSearchParams()
+      if (params?.verdict) query.set('verdict', params.verdict)
+      if (params?.cursor) query.set('cursor', params.cursor)
+      if (params?.limit) query.set('limit', String(params.limit))
+      const queryString = query.toString()
+      return fetchAPI(`/v1/investigate/runs${queryString ? `?${queryString}` : ''}`)
+    },
     
     getExceptionsCount: (): Promise<{ count: number }> =>
       fetchAPI('/v1/investigate/count'),
@@ -25,6 +25,8 @@ export default function InvestigateList() {
   const [runs, setRuns] = useState<InvestigateRun[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [cursors, setCursors] = useState<Record<TabType, string | null>>({ BLOCKED: null, HELD_FOR_REVIEW: null })
+  const [loadingMore, setLoadingMore] = useState(false)
   const [activeTab, setActiveTab] = useState<TabType>('BLOCKED')
   const [sortField, setSortField] = useState<SortField>('created_at')
   const [sortDirection, setSortDirection] = useState<SortDirection>('desc')
@@ -32,8 +34,13 @@ export default function InvestigateList() {
   useEffect(() => {
     const fetchRuns = async () => {
       try {
-        const result = await api.getInvestigateRuns()
-        setRuns(result.runs as InvestigateRun[])
+        // First page of each tab; further pages are loaded on demand
+        const [blocked, held] = await Promise.all([
+          api.getInvestigateRuns({ verdict: 'BLOCKED' }),
+          api.getInvestigateRuns({ verdict: 'HELD_FOR_REVIEW' }),
+        ])
+        setRuns([...blocked.runs, ...held.runs] as InvestigateRun[])
+        setCursors({ BLOCKED: blocked.next_cursor, HELD_FOR_REVIEW: held.next_cursor })
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Failed to load runs')
       } finally {
@@ -44,6 +51,21 @@ export default function InvestigateList() {
     fetchRuns()
   }, [])
 
+  const loadMore = async () => {
+    const cursor = cursors[activeTab]
+    if (!cursor) return
+    setLoadingMore(true)
+    try {
+      const result = await api.getInvestigateRuns({ verdict: activeTab, cursor })
+      setRuns(prev => [...prev, ...(result.runs as InvestigateRun[])])
+      setCursors(prev => ({ ...prev, [activeTab]: result.next_cursor }))
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load runs')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleString()
   }
@@ -187,7 +209,7 @@ export default function InvestigateList() {
               Blocked
               {runs.filter(r => r.verdict === 'BLOCKED').length > 0 && (
                 <span className="ml-2 px-2 py-0.5 text-xs font-semibold bg-red-100 text-red-700 rounded-full">
-                  {runs.filter(r => r.verdict === 'BLOCKED').length}
+                  {runs.filter(r => r.verdict === 'BLOCKED').length}{cursors.BLOCKED ? '+' : ''}
                 </span>
               )}
             </button>
@@ -202,7 +224,7 @@ export default function InvestigateList() {
               Held for review
               {runs.filter(r => r.verdict === 'HELD_FOR_REVIEW').length > 0 && (
                 <span className="ml-2 px-2 py-0.5 text-xs font-semibold bg-purple-100 text-purple-700 rounded-full">
-                  {runs.filter(r => r.verdict === 'HELD_FOR_REVIEW').length}
+                  {runs.filter(r => r.verdict === 'HELD_FOR_REVIEW').length}{cursors.HELD_FOR_REVIEW ? '+' : ''}
                 </span>
               )}
             </button>
@@ -307,6 +329,18 @@ export default function InvestigateList() {
             </div>
           </div>
         )}
+
+        {cursors[activeTab] && (
+          <div className="mt-4 text-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-lg hover:bg-gray-50 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </ContentShell>
     </Layout>
   )
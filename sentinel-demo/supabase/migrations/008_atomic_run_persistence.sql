@@ -0,0 +1,57 @@
+-- Atomic persistence of runs with their events
+-- One RPC call inserts run rows and all their run_events rows in a single
+-- transaction (and a single PostgREST round trip), so a run is never stored
+-- without its events.
+--
+-- Runs whose id already exists are skipped together with their events, which
+-- makes a retried call (e.g. after a lost response) a no-op instead of a
+-- duplicate key error or a second copy of the events.
+
+-- Bulk variant: p_runs is a JSON array of runs rows, p_events a JSON array of
+-- run_events rows for those runs. Returns the number of runs inserted.
+CREATE OR REPLACE FUNCTION create_runs_with_events(p_runs jsonb, p_events jsonb DEFAULT '[]'::jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted_count integer;
+BEGIN
+    WITH inserted_runs AS (
+        INSERT INTO runs (
+            id, created_at, input_type, input_preview, input_content, scenario_id, verdict,
+            baseline_output, governed_output, user_message, policy_pack_version, meta
+        )
+        SELECT
+            r.id, COALESCE(r.created_at, now()), r.input_type, r.input_preview, r.input_content, r.scenario_id, r.verdict,
+            r.baseline_output, r.governed_output, r.user_message, COALESCE(r.policy_pack_version, 'v1'), COALESCE(r.meta, '{}'::jsonb)
+        FROM jsonb_populate_recordset(NULL::runs, p_runs) AS r
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    ), inserted_events AS (
+        INSERT INTO run_events (id, run_id, ts, seq, event_type, payload)
+        SELECT
+            COALESCE(e.id, gen_random_uuid()), e.run_id, COALESCE(e.ts, now()), e.seq, e.event_type, COALESCE(e.payload, '{}'::jsonb)
+        FROM jsonb_populate_recordset(NULL::run_events, COALESCE(p_events, '[]'::jsonb)) AS e
+        WHERE e.run_id IN (SELECT id FROM inserted_runs)
+        ON CONFLICT (id) DO NOTHING
+    )
+    SELECT COUNT(*) INTO inserted_count FROM inserted_runs;
+
+    RETURN inserted_count;
+END;
+$$;
+
+-- Single-run variant: p_run is one runs row, p_events its run_events rows.
+-- Returns true if the run was inserted, false if it already existed.
+CREATE OR REPLACE FUNCTION create_run_with_events(p_run jsonb, p_events jsonb DEFAULT '[]'::jsonb)
+RETURNS boolean
+LANGUAGE sql
+AS $$
+    SELECT create_runs_with_events(jsonb_build_array(p_run), p_events) = 1;
+$$;
+
+-- Only the API (service role) writes runs
+REVOKE EXECUTE ON FUNCTION create_runs_with_events(jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION create_run_with_events(jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_runs_with_events(jsonb, jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION create_run_with_events(jsonb, jsonb) TO service_role;
@@ -0,0 +1,11 @@
+-- Index for the investigation list (GET /v1/investigate/runs)
+-- The list pages newest first with a keyset on (created_at, id) over the
+-- high-signal verdicts. A partial index over those verdicts only keeps the
+-- index small (ALLOWED/REDACTED runs are the bulk of the table), and keying
+-- it on (created_at DESC, id DESC) lets each page be read as one index range
+-- scan in list order, with id as the tie-breaker. Filtering on a single
+-- verdict reads the same range and skips rows of the other verdict.
+
+CREATE INDEX IF NOT EXISTS idx_runs_investigate_created_at
+ON runs (created_at DESC, id DESC)
+WHERE verdict IN ('BLOCKED', 'HELD_FOR_REVIEW');
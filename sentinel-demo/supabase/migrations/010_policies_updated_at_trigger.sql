@@ -0,0 +1,23 @@
+-- Keep policies.updated_at current on every update
+-- The API revalidates its cached policy pack against a fingerprint that
+-- includes updated_at. Edits made directly in SQL (conditions, scope,
+-- action, status) often leave updated_at untouched; this trigger bumps it
+-- so every change to a policy row is picked up.
+
+CREATE OR REPLACE FUNCTION set_policies_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+        NEW.updated_at := now();
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS policies_set_updated_at ON policies;
+CREATE TRIGGER policies_set_updated_at
+BEFORE UPDATE ON policies
+FOR EACH ROW
+EXECUTE FUNCTION set_policies_updated_at();